@@ -25,6 +25,8 @@ except Exception:
 # Additional hidden imports for the application
 hidden_imports = [
     'PIL._tkinter_finder',
+    'PIL.ImageTk',
+    'pystray',  # Imported lazily via importlib in main.py
     'pystray._win32',
     'google.generativeai',
     'google.ai.generativelanguage',
@@ -33,6 +35,9 @@ hidden_imports = [
     'google.api_core',
     'grpc',
     'keyboard',
+    'mss',  # Imported lazily as the preferred capture backend
+    'mss.windows',
+    'numpy',  # Optional: zero-copy views of captured frames
     'tkinter',
     'tkinter.scrolledtext',
     'ctypes',
@@ -68,7 +73,6 @@ a = Analysis(
     runtime_hooks=[],
     excludes=[
         'matplotlib',
-        'numpy',
         'pandas',
         'scipy',
         'pytest',
@@ -0,0 +1,740 @@
+"""
+ElAnswer Offline Benchmark
+Runs the real capture pipeline (capture worker, hashing, encoding, streaming,
+history, tracing) against a local stand-in for Gemini - no API key or network.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --resolutions 1920x1080,3840x2160 --captures 30
+    python benchmark.py --latency-ms 1200 --chunks 12 --error-rate 0.05 --json bench.json
+    python benchmark.py --screenshots path/to/recorded/pngs
+    python benchmark.py --transports --captures 50
+    xvfb-run python benchmark.py --hotkeys --captures 200
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import queue
+import random
+import logging
+import argparse
+import tempfile
+import importlib
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image, ImageDraw, ImageFont
+
+import main
+
+STAGES = [
+    "hotkey_received", "dequeued", "capture", "preprocess", "request_sent",
+    "first_byte", "last_byte", "history_write", "popup_visible",
+]
+
+SAMPLE_ANSWER = (
+    "📋 QUESTION:\n"
+    "Which data structure gives O(1) average lookup by key?\n\n"
+    "✅ ANSWER:\n"
+    "B) Hash table\n\n"
+    "💡 EXPLANATION:\n"
+    "A hash table maps keys to buckets with a hash function, so lookups, inserts and "
+    "deletes take constant time on average. Balanced trees need O(log n) and linked "
+    "lists need O(n) for the same operations."
+)
+
+
+class FakeServiceError(Exception):
+    """Stands in for a transient Gemini API error (HTTP 503)."""
+    code = 503
+
+
+class FakeChunk:
+    """A response (or streamed chunk) with a .text attribute, like the SDK's."""
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    In-process stand-in for genai.GenerativeModel with configurable think time,
+    time to first chunk, chunking and error rate.
+    """
+    def __init__(self, model_name, latency_ms=800, first_chunk_ms=300, chunks=8,
+                 jitter_ms=50, error_rate=0.0, seed=1):
+        self.model_name = model_name
+        self.latency_ms = latency_ms
+        self.first_chunk_ms = first_chunk_ms
+        self.chunks = max(1, chunks)
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def _sleep_ms(self, ms):
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, ms + jitter) / 1000)
+
+    def _maybe_fail(self):
+        with self.lock:
+            failed = self.rng.random() < self.error_rate
+        if failed:
+            raise FakeServiceError("503 Service Unavailable (simulated)")
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        # Touch the payload like a real client would (base64/serialisation cost aside)
+        for part in contents:
+            if isinstance(part, dict):
+                len(part["data"])
+        if not stream:
+            self._sleep_ms(self.latency_ms)
+            self._maybe_fail()
+            return FakeChunk(SAMPLE_ANSWER)
+        return self._stream()
+
+    def _stream(self):
+        self._sleep_ms(self.first_chunk_ms)
+        self._maybe_fail()
+        step = -(-len(SAMPLE_ANSWER) // self.chunks)
+        per_chunk_ms = max(0, self.latency_ms - self.first_chunk_ms) / self.chunks
+        for index in range(0, len(SAMPLE_ANSWER), step):
+            if index:
+                self._sleep_ms(per_chunk_ms)
+            yield FakeChunk(SAMPLE_ANSWER[index:index + step])
+
+
+class FakeRoot:
+    """Stands in for the Tk root: runs after() callbacks in order on one thread, like mainloop."""
+    def __init__(self):
+        self.callbacks = queue.Queue()
+        threading.Thread(target=self._run, name="fake-mainloop", daemon=True).start()
+
+    def after(self, ms, callback, *args):
+        self.callbacks.put((time.perf_counter() + ms / 1000, callback, args))
+
+    def _run(self):
+        while True:
+            due, callback, args = self.callbacks.get()
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.getLogger().error(f"Callback failed: {e}")
+
+
+def synthetic_screenshot(width, height, index):
+    """Draw a quiz-like screen (tab bar, question, options, taskbar) at the given size."""
+    image = Image.new("RGB", (width, height), "#f3f4f6")
+    draw = ImageDraw.Draw(image)
+    scale = height / 1080
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", int(22 * scale))
+    except OSError:
+        try:
+            font = ImageFont.truetype("arial.ttf", int(22 * scale))
+        except OSError:
+            font = ImageFont.load_default()
+    # Browser tab bar and taskbar, with text and icons like a real desktop
+    draw.rectangle((0, 0, width, int(40 * scale)), fill="#1f2937")
+    for tab, title in enumerate(("Quiz - Chapter 4", "Notes", "Search results")):
+        draw.text((int((16 + tab * 240) * scale), int(8 * scale)), title, fill="#e5e7eb", font=font)
+    draw.rectangle((0, height - int(48 * scale), width, height), fill="#111827")
+    for icon in range(8):
+        icon_left = int((12 + icon * 48) * scale)
+        draw.rectangle((icon_left, height - int(38 * scale), icon_left + int(28 * scale), height - int(10 * scale)),
+                       fill=("#3b82f6", "#f59e0b", "#10b981", "#ef4444")[icon % 4], outline="#e5e7eb")
+    draw.text((width - int(90 * scale), height - int(36 * scale)), f"10:{index % 60:02d}", fill="#e5e7eb", font=font)
+    left, top = int(width * 0.2), int(height * 0.25)
+    draw.rectangle((left - 40, top - 40, width - left + 40, top + int(420 * scale)), fill="#ffffff")
+    lines = [
+        f"Question {index + 1} of 50",
+        "Which data structure gives O(1) average lookup by key?",
+        "A) Linked list",
+        "B) Hash table",
+        "C) Binary search tree",
+        "D) Sorted array",
+    ]
+    for line_number, line in enumerate(lines):
+        draw.text((left, top + int(line_number * 60 * scale)), line, fill="#111827", font=font)
+    return image
+
+
+def load_screenshots(directory):
+    """Load recorded screenshots (png/jpg) from a directory."""
+    paths = sorted(glob.glob(os.path.join(directory, "*.png")) + glob.glob(os.path.join(directory, "*.jpg")))
+    return [Image.open(path).convert("RGB") for path in paths]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        import ctypes.wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", ctypes.wintypes.DWORD), ("PageFaultCount", ctypes.wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def install_fakes(args, data_dir):
+    """Point main at the fake root/model, a temp data dir, and no-op UI functions."""
+    traces = queue.Queue()
+    real_write_trace_record = main.write_trace_record
+
+    def capture_trace(trace):
+        real_write_trace_record(trace)
+        traces.put(trace)
+
+    main.root = FakeRoot()
+    main.API_KEY = "offline-benchmark"
+    main.TRACE_PATH = os.path.join(data_dir, "trace.jsonl")
+    main.HISTORY_PATH = os.path.join(data_dir, "history.json")
+    main.HISTORY_DB_PATH = os.path.join(data_dir, "history.db")
+    main.ANSWER_CACHE_PATH = os.path.join(data_dir, "answer_cache.json")
+    main.QUESTION_CACHE_PATH = os.path.join(data_dir, "question_cache.json")
+    main.CONFIG_PATH = os.path.join(data_dir, "config.json")
+    main.write_trace_record = capture_trace
+    main.app_config.update({
+        "capture_debounce_ms": 0,
+        "answer_cache_enabled": args.cache,
+        "question_cache_enabled": args.cache,
+        "ocr_mode": "auto" if args.ocr else "off",
+        "auto_crop": not args.no_auto_crop,
+        "stream_responses": not args.no_stream,
+        "hedge_requests": args.hedge,
+        "auto_copy": False,
+    })
+    main.model = FakeGenerativeModel(
+        main.app_config.get("model", "models/gemini-3-flash-preview"),
+        latency_ms=args.latency_ms,
+        first_chunk_ms=args.first_chunk_ms,
+        chunks=args.chunks,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+    )
+    main.warmup_done.set()
+    main.start_grab_thread()
+
+    # Tk is not needed offline - keep the pipeline, drop the widgets
+    for name in ("show_loading_indicator", "hide_loading_indicator", "prepare_answer_popup", "show_answer_popup",
+                 "append_answer_text", "finish_answer_popup", "show_settings_popup", "auto_copy_answer"):
+        setattr(main, name, lambda *a, **k: None)
+    return traces
+
+
+def run_resolution(label, frames, args, traces):
+    """Run captures for one resolution closed-loop (one at a time) and summarise the traces."""
+    records = []
+    frame_index = [0]
+
+    # Like mss, hand out frames backed by a raw BGRX buffer (fresh per grab)
+    buffers = [frame.tobytes("raw", "BGRX") for frame in frames]
+
+    def fake_capture(bbox=None, all_screens=False):
+        index = frame_index[0] % len(frames)
+        if bbox:
+            image = frames[index].crop(bbox)
+            return main.CaptureFrame(image.size, image=image)
+        return main.CaptureFrame(frames[index].size, buffer=bytearray(buffers[index]))
+
+    main.capture_frame = fake_capture
+    started = time.perf_counter()
+    for index in range(args.captures):
+        frame_index[0] = index
+        # The capture chord's handler: the grab thread takes the pixels, then queues the capture
+        main.request_grab("screen")
+        try:
+            records.append(traces.get(timeout=args.timeout))
+        except queue.Empty:
+            print(f"  capture {index + 1} timed out", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    # Per-stage time (since the latest earlier stage) and cumulative time since the hotkey.
+    # popup_visible is marked on the UI thread, so it can land before last_byte/history_write.
+    stage_deltas = {stage: [] for stage in STAGES[1:]}
+    cumulative = {stage: [] for stage in STAGES[1:]}
+    for trace in records:
+        stages = trace["stages"]
+        ordered = sorted((stages[s], STAGES.index(s), s) for s in stages if s in STAGES)
+        previous = 0.0
+        for value, _, stage in ordered:
+            if stage in stage_deltas:
+                stage_deltas[stage].append(value - previous)
+                cumulative[stage].append(value)
+            previous = value
+
+    pixels_ms = [t["fields"]["hotkey_to_pixels_ms"] for t in records if "hotkey_to_pixels_ms" in t["fields"]]
+    crop_ms = [t["fields"]["crop_ms"] for t in records if "crop_ms" in t["fields"]]
+    crop_kept = []
+    for trace in records:
+        fields = trace["fields"]
+        if "crop_box" in fields:
+            left, top, right, bottom = fields["crop_box"]
+            width, height = fields["image_size"]
+            crop_kept.append((right - left) * (bottom - top) / (width * height))
+
+    # Latency and estimated input tokens per request path (OCR text, image, or answered from a cache)
+    request_modes = {}
+    for trace in records:
+        fields = trace["fields"]
+        cached = "hit" in (fields.get("cache"), fields.get("question_cache"))
+        mode = request_modes.setdefault(fields.get("request_mode", "cached" if cached else "none"), {
+            "count": 0, "total_ms": [], "ocr_ms": [], "est_tokens": [], "est_image_tokens": [],
+        })
+        mode["count"] += 1
+        # Cached answers have no request; they are ready once preprocessing is done
+        stages = trace["stages"]
+        mode["total_ms"].append(stages.get("last_byte", stages.get("preprocess", 0.0)))
+        if "ocr_ms" in fields:
+            mode["ocr_ms"].append(fields["ocr_ms"])
+        if "est_image_tokens" in fields:
+            mode["est_image_tokens"].append(fields["est_image_tokens"])
+            if cached:
+                mode["est_tokens"].append(0)
+            elif fields.get("request_mode") == "text":
+                mode["est_tokens"].append(fields.get("est_text_tokens", fields["est_image_tokens"]))
+            else:
+                mode["est_tokens"].append(fields["est_image_tokens"])
+    for mode in request_modes.values():
+        mode["total_ms_p50"] = percentile(mode.pop("total_ms"), 50)
+        mode["ocr_ms_p50"] = percentile(mode.pop("ocr_ms"), 50)
+        tokens, image_tokens = mode.pop("est_tokens"), mode.pop("est_image_tokens")
+        mode["est_tokens_saved"] = sum(image_tokens) - sum(tokens)
+
+    return {
+        "resolution": label,
+        "captures": len(records),
+        "errors": sum(1 for t in records if t["fields"].get("status") != "ok"),
+        "retries": sum(t["fields"].get("retries", 0) for t in records),
+        "hedges": sum(1 for t in records if "hedge_sent_ms" in t["fields"]),
+        "captures_per_sec": len(records) / elapsed if elapsed else 0.0,
+        "upload_kb_mean": (
+            sum(t["fields"].get("upload_bytes", 0) for t in records) / max(1, len(records)) / 1024
+        ),
+        "request_modes": request_modes,
+        "hotkey_to_pixels": {
+            "p50": percentile(pixels_ms, 50),
+            "p95": percentile(pixels_ms, 95),
+            "over_target": sum(1 for ms in pixels_ms if ms > main.HOTKEY_TO_PIXELS_TARGET_MS),
+        },
+        "auto_crop": {
+            "cropped": len(crop_kept),
+            "pixels_kept_mean": sum(crop_kept) / len(crop_kept) if crop_kept else None,
+            "crop_ms_p50": percentile(crop_ms, 50),
+        },
+        "cache_hits": {
+            "image": sum(1 for t in records if t["fields"].get("cache") == "hit"),
+            "question": sum(1 for t in records if t["fields"].get("question_cache") == "hit"),
+        },
+        "stages": {
+            stage: {
+                "p50": percentile(stage_deltas[stage], 50),
+                "p95": percentile(stage_deltas[stage], 95),
+                "p99": percentile(stage_deltas[stage], 99),
+                "since_hotkey_p50": percentile(cumulative[stage], 50),
+                "since_hotkey_p95": percentile(cumulative[stage], 95),
+                "since_hotkey_p99": percentile(cumulative[stage], 99),
+            }
+            for stage in STAGES[1:]
+        },
+    }
+
+
+def print_result(result):
+    """Print one resolution's summary as a table."""
+    def fmt(value):
+        return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+
+    print("")
+    print(f"Resolution {result['resolution']}: {result['captures']} captures, "
+          f"{result['errors']} errors, {result['retries']} retries, {result['hedges']} hedged, "
+          f"{result['captures_per_sec']:.2f} captures/s, "
+          f"{result['upload_kb_mean']:.0f} KB mean upload")
+    for name, mode in result["request_modes"].items():
+        ocr = ""
+        if mode["ocr_ms_p50"] is not None:
+            ocr = f", OCR p50 {mode['ocr_ms_p50']:.0f} ms, ~{mode['est_tokens_saved']} input tokens saved"
+        print(f"  {name} requests: {mode['count']}, answer p50 {mode['total_ms_p50']:.0f} ms{ocr}")
+    pixels = result["hotkey_to_pixels"]
+    print(f"  hotkey to pixels: p50 {fmt(pixels['p50']).strip()} ms, p95 {fmt(pixels['p95']).strip()} ms, "
+          f"{pixels['over_target']} over the {main.HOTKEY_TO_PIXELS_TARGET_MS} ms target")
+    crop = result["auto_crop"]
+    if crop["cropped"]:
+        print(f"  auto-crop: {crop['cropped']} cropped, {100 * crop['pixels_kept_mean']:.0f}% of pixels kept, "
+              f"p50 {crop['crop_ms_p50']:.1f} ms")
+    if any(result["cache_hits"].values()):
+        print(f"  cache hits: {result['cache_hits']['image']} image, {result['cache_hits']['question']} question")
+    print(f"  {'Stage':<16}{'p50':>9}{'p95':>9}{'p99':>9}   {'since hotkey p50/p95/p99 (ms)':>30}")
+    for stage, stats in result["stages"].items():
+        print(f"  {stage:<16}{fmt(stats['p50'])}{fmt(stats['p95'])}{fmt(stats['p99'])}   "
+              f"{fmt(stats['since_hotkey_p50'])}{fmt(stats['since_hotkey_p95'])}{fmt(stats['since_hotkey_p99'])}")
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the Gemini REST endpoints (generateContent, streamGenerateContent
+    with SSE, models list) over keep-alive HTTP/1.1. Timing comes from server.args.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _response(self, text):
+        return json.dumps({"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}).encode("utf-8")
+
+    def do_GET(self):
+        models = [{"name": "models/gemini-stub", "supportedGenerationMethods": ["generateContent"]}]
+        self._send(200, "application/json", json.dumps({"models": models}).encode("utf-8"))
+
+    def do_POST(self):
+        args = self.server.args
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if ":streamGenerateContent" not in self.path:
+            time.sleep(args.latency_ms / 1000)
+            self._send(200, "application/json", self._response(SAMPLE_ANSWER))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(args.first_chunk_ms / 1000)
+        chunks = max(1, args.chunks)
+        step = -(-len(SAMPLE_ANSWER) // chunks)
+        per_chunk_ms = max(0, args.latency_ms - args.first_chunk_ms) / chunks
+        try:
+            for index in range(0, len(SAMPLE_ANSWER), step):
+                if index:
+                    time.sleep(per_chunk_ms / 1000)
+                event = b"data: " + self._response(SAMPLE_ANSWER[index:index + step]) + b"\r\n\r\n"
+                self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client abandoned the stream (like a cancelled capture)
+            self.close_connection = True
+
+
+# Imports each client needs, timed in a fresh interpreter
+IMPORT_PROBE = """
+import sys, time
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed_ms = (time.perf_counter() - started) * 1000
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+except ImportError:
+    rss_mb = None
+print(elapsed_ms, rss_mb)
+"""
+TRANSPORT_IMPORTS = {
+    "baseline": [],
+    "rest": ["http.client", "ssl", "json", "base64", "urllib.parse"],
+    "sdk": ["google.generativeai"],
+}
+
+
+def probe_imports(modules):
+    """Import time (ms) and peak RSS (MB) of importing modules in a fresh interpreter."""
+    result = subprocess.run([sys.executable, "-c", IMPORT_PROBE, *modules], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    elapsed_ms, rss_mb = result.stdout.split()
+    return {"import_ms": float(elapsed_ms), "rss_mb": None if rss_mb == "None" else float(rss_mb)}
+
+
+def time_client(client, contents, requests):
+    """Cold first request, then warm plain and streamed request latency (ms) for one client."""
+    started = time.perf_counter()
+    client.generate_content(contents).text
+    cold_ms = (time.perf_counter() - started) * 1000
+    plain, first_chunk = [], []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.generate_content(contents).text
+        plain.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        for index, chunk in enumerate(client.generate_content(contents, stream=True)):
+            if index == 0:
+                first_chunk.append((time.perf_counter() - started) * 1000)
+    return {
+        "cold_ms": cold_ms,
+        "request_p50": percentile(plain, 50),
+        "request_p95": percentile(plain, 95),
+        "first_chunk_p50": percentile(first_chunk, 50),
+        "first_chunk_p95": percentile(first_chunk, 95),
+    }
+
+
+def run_transport_benchmark(args):
+    """Compare the built-in REST client with genai.GenerativeModel: import cost, RSS and request latency."""
+    logging.getLogger().setLevel(logging.WARNING)
+    imports = {name: probe_imports(modules) for name, modules in TRANSPORT_IMPORTS.items()}
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGeminiHandler)
+    server.daemon_threads = True
+    server.args = args
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    image = synthetic_screenshot(1920, 1080, 0)
+    contents = [main.build_prompt("explain"), {"mime_type": "image/jpeg", "data": main._encode_image(image, "JPEG", 85)}]
+    latency = {"rest": time_client(main.RestGenerativeModel("models/gemini-stub", "offline-benchmark", base_url),
+                                   contents, args.captures)}
+    if imports["sdk"] is not None:
+        try:
+            genai = importlib.import_module("google.generativeai")
+            # The stub speaks HTTP/JSON, so the SDK is pointed at it with its REST transport
+            genai.configure(api_key="offline-benchmark", transport="rest", client_options={"api_endpoint": base_url})
+            latency["sdk"] = time_client(genai.GenerativeModel("models/gemini-stub"), contents, args.captures)
+        except Exception as e:
+            latency["sdk"] = {"error": str(e)}
+    server.shutdown()
+
+    def fmt(value):
+        return f"{value:10.1f}" if value is not None else f"{'-':>10}"
+
+    baseline = imports["baseline"]
+    print("")
+    print(f"{'Client':<8}{'import ms':>10}{'+RSS MB':>10}{'cold ms':>10}{'req p50':>10}{'req p95':>10}"
+          f"{'1st p50':>10}{'1st p95':>10}")
+    for name in ("rest", "sdk"):
+        probe = imports[name]
+        if probe is None:
+            print(f"{name:<8}  not installed")
+            continue
+        rss = probe["rss_mb"] - baseline["rss_mb"] if probe["rss_mb"] is not None and baseline else None
+        row = f"{name:<8}{fmt(probe['import_ms'])}{fmt(rss)}"
+        stats = latency.get(name, {})
+        if "error" in stats:
+            print(f"{row}  request failed: {stats['error']}")
+            continue
+        print(row + "".join(fmt(stats.get(key)) for key in
+                            ("cold_ms", "request_p50", "request_p95", "first_chunk_p50", "first_chunk_p95")))
+    print(f"(local stub at {base_url}: plain HTTP, so the cold request has no TLS handshake)")
+    return {"imports": imports, "latency": latency}
+
+
+HOTKEY_BENCH_CHORD = "ctrl+alt+f9"
+HOTKEY_FILLER_KEYS = "qwertyuiopasdfghjklzxcvbnm"
+WIN_MODIFIER_VKS = {"ctrl": 0x11, "alt": 0x12, "shift": 0x10, "win": 0x5B}
+X11_MODIFIER_KEYSYMS = {"ctrl": "Control_L", "alt": "Alt_L", "shift": "Shift_L", "win": "Super_L"}
+
+
+def key_injector(backend_name):
+    """Return send(chord) that synthesises key presses the given backend can see."""
+    if backend_name == "keyboard":
+        # The keyboard hook reads /dev/input on Linux, so XTest events never reach it
+        keyboard = importlib.import_module("keyboard")
+        return keyboard.send
+    if main.IS_WINDOWS:
+        user32 = main.ctypes.windll.user32
+
+        def send(chord):
+            modifiers, key = main.parse_hotkey(chord)
+            codes = [WIN_MODIFIER_VKS[m] for m in sorted(modifiers)] + [main.windows_virtual_key(key)]
+            for code in codes:
+                user32.keybd_event(code, 0, 0, 0)
+            for code in reversed(codes):
+                user32.keybd_event(code, 0, 0x0002, 0)  # KEYEVENTF_KEYUP
+        return send
+
+    X = importlib.import_module("Xlib.X")
+    XK = importlib.import_module("Xlib.XK")
+    xtest = importlib.import_module("Xlib.ext.xtest")
+    display = importlib.import_module("Xlib.display").Display()
+
+    def send(chord):
+        modifiers, key = main.parse_hotkey(chord)
+        names = [X11_MODIFIER_KEYSYMS[m] for m in sorted(modifiers)] + [main.x11_keysym_name(key)]
+        codes = [display.keysym_to_keycode(XK.string_to_keysym(name)) for name in names]
+        for code in codes:
+            xtest.fake_input(display, X.KeyPress, code)
+        for code in reversed(codes):
+            xtest.fake_input(display, X.KeyRelease, code)
+        display.sync()
+    return send
+
+
+def inject_cpu_ms(send, keystrokes):
+    """Process CPU time (all threads) spent while typing unbound keys, after the backend settles."""
+    started = time.process_time()
+    for index in range(keystrokes):
+        send(HOTKEY_FILLER_KEYS[index % len(HOTKEY_FILLER_KEYS)])
+    time.sleep(0.5)  # Let a hook thread catch up; sleeping costs no CPU
+    return (time.process_time() - started) * 1000
+
+
+def time_hotkey_backend(name, args):
+    """Chord-to-callback latency and per-keystroke CPU overhead of one hotkey backend."""
+    try:
+        send = key_injector(name)
+        backend = main.HOTKEY_BACKENDS[name]()
+    except Exception as e:
+        return {"error": str(e)}
+
+    baseline_ms = inject_cpu_ms(send, args.keystrokes)
+    fired = threading.Event()
+    latencies, missed = [], 0
+    try:
+        backend.register({HOTKEY_BENCH_CHORD: fired.set})
+        for _ in range(args.captures):
+            fired.clear()
+            started = time.perf_counter()
+            send(HOTKEY_BENCH_CHORD)
+            if fired.wait(1.0):
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                missed += 1
+            time.sleep(0.02)
+        hooked_ms = inject_cpu_ms(send, args.keystrokes)
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        backend.stop()
+    return {
+        "chord_p50": percentile(latencies, 50),
+        "chord_p95": percentile(latencies, 95),
+        "missed": missed,
+        "per_key_us": max(0.0, hooked_ms - baseline_ms) * 1000 / args.keystrokes,
+    }
+
+
+def run_hotkey_benchmark(args):
+    """Compare the native hotkey backend with the keyboard hook on synthetic key presses."""
+    logging.getLogger().setLevel(logging.WARNING)
+    names = ["win32" if main.IS_WINDOWS else "xlib", "keyboard"]
+    results = {name: time_hotkey_backend(name, args) for name in names}
+
+    def fmt(value):
+        return f"{value:10.2f}" if value is not None else f"{'-':>10}"
+
+    print("")
+    print(f"{'Backend':<10}{'chord p50':>10}{'chord p95':>10}{'missed':>8}{'us/key':>10}")
+    for name, stats in results.items():
+        if "error" in stats:
+            print(f"{name:<10}  unavailable: {stats['error']}")
+            continue
+        print(f"{name:<10}{fmt(stats['chord_p50'])}{fmt(stats['chord_p95'])}{stats['missed']:>8}"
+              f"{fmt(stats['per_key_us'])}")
+    print(f"({args.captures} presses of {HOTKEY_BENCH_CHORD}; us/key is extra process CPU per unbound "
+          f"keystroke over {args.keystrokes} keys)")
+    return {"hotkeys": results}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ElAnswer pipeline benchmark (no network)")
+    parser.add_argument("--resolutions", default="1280x720,1920x1080,2560x1440,3840x2160",
+                        help="Comma-separated WxH list for synthetic screenshots")
+    parser.add_argument("--screenshots", help="Directory of recorded screenshots to use instead")
+    parser.add_argument("--captures", type=int, default=20, help="Captures per resolution")
+    parser.add_argument("--latency-ms", type=float, default=800, help="Simulated total model time")
+    parser.add_argument("--first-chunk-ms", type=float, default=300, help="Simulated time to first chunk")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Random +/- jitter per delay")
+    parser.add_argument("--chunks", type=int, default=8, help="Streamed chunks per answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Hedge requests slower than the observed p95 (after 20 captures of history)")
+    parser.add_argument("--no-stream", action="store_true", help="Benchmark the non-streaming path")
+    parser.add_argument("--cache", action="store_true", help="Leave the answer and question caches enabled")
+    parser.add_argument("--ocr", action="store_true", help="Enable OCR text mode (needs Tesseract)")
+    parser.add_argument("--no-auto-crop", action="store_true", help="Send full frames instead of auto-cropping")
+    parser.add_argument("--transports", action="store_true",
+                        help="Compare the SDK and built-in REST clients against a local stub server instead")
+    parser.add_argument("--hotkeys", action="store_true",
+                        help="Compare hotkey backends with synthetic key presses instead (run under Xvfb on Linux)")
+    parser.add_argument("--keystrokes", type=int, default=2000,
+                        help="Unbound keystrokes typed to measure per-key overhead (--hotkeys)")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-capture timeout in seconds")
+    parser.add_argument("--json", help="Write results as JSON to this path (for CI)")
+    return parser.parse_args(argv)
+
+
+def run_pipeline_benchmark(args):
+    """Run the pipeline benchmark for every resolution and return the results."""
+    logging.getLogger().setLevel(logging.WARNING)
+    data_dir = tempfile.mkdtemp(prefix="elanswer-bench-")
+    traces = install_fakes(args, data_dir)
+
+    if args.screenshots:
+        frames = load_screenshots(args.screenshots)
+        if not frames:
+            sys.exit(f"No screenshots found in {args.screenshots}")
+        groups = [(f"recorded ({len(frames)} files)", frames)]
+    else:
+        groups = []
+        for spec in args.resolutions.split(","):
+            width, height = (int(v) for v in spec.lower().split("x"))
+            # A few distinct screens per resolution so hashes/encodes aren't identical
+            groups.append((spec, [synthetic_screenshot(width, height, i) for i in range(4)]))
+
+    results = []
+    for label, frames in groups:
+        result = run_resolution(label, frames, args, traces)
+        print_result(result)
+        results.append(result)
+
+    rss = peak_rss_mb()
+    summary = {"results": results, "peak_rss_mb": rss}
+    print("")
+    print(f"Peak RSS: {rss:.1f} MB" if rss is not None else "Peak RSS: unavailable")
+    return summary
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    if arguments.transports:
+        summary = run_transport_benchmark(arguments)
+    elif arguments.hotkeys:
+        summary = run_hotkey_benchmark(arguments)
+    else:
+        summary = run_pipeline_benchmark(arguments)
+    if arguments.json:
+        with open(arguments.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
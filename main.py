@@ -28,21 +28,74 @@
 ╚═══════════════════════════════════════════════════════════════════════════════╝
 """
 
+import time
+PROCESS_STARTED = time.perf_counter()  # Reference point for the startup report
+
+import io
 import os
 import sys
+import re
 import json
+import base64
+import shutil
+import hashlib
+import sqlite3
 import logging
 import platform
+import importlib
 import subprocess
+import http.client
+import urllib.parse
+import unicodedata
 import webbrowser
+from contextlib import contextmanager
 from datetime import datetime
-import keyboard  # For detecting key presses
-import google.generativeai as genai
-from PIL import Image, ImageTk  # For image handling
+from collections import OrderedDict, deque
+from types import SimpleNamespace
+from PIL import Image, ImageFilter  # For image handling
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
 import threading
-import pystray  # For system tray icon
+import queue
+import random
+import select
+
+# Heavy modules (google.generativeai, keyboard, pystray, PIL.ImageTk) are
+# imported lazily - on first use or by the background warm-up thread - so the
+# hotkeys and tray icon come up before the genai/grpc import chain finishes.
+genai = None
+
+# Startup timings collected for --startup-report
+startup_timings = {"phases": [], "imports": []}
+_import_lock = threading.Lock()
+warmup_done = threading.Event()
+
+def timed_import(module_name):
+    """Import a module, recording how long it took for the startup report."""
+    started = time.perf_counter()
+    already_loaded = module_name in sys.modules
+    module = importlib.import_module(module_name)
+    if not already_loaded:
+        startup_timings["imports"].append((module_name, (time.perf_counter() - started) * 1000))
+    return module
+
+@contextmanager
+def startup_phase(name):
+    """Record the duration of a startup phase for the startup report."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ended = time.perf_counter()
+        startup_timings["phases"].append((name, (ended - started) * 1000, (ended - PROCESS_STARTED) * 1000))
+
+def load_genai():
+    """Import google.generativeai on first use (shared by capture and warm-up)."""
+    global genai
+    with _import_lock:
+        if genai is None:
+            genai = timed_import("google.generativeai")
+    return genai
 
 # Platform detection
 IS_WINDOWS = sys.platform == 'win32'
@@ -71,25 +124,767 @@ GWL_EXSTYLE = -20
 LWA_ALPHA = 0x00000002
 LWA_COLORKEY = 0x00000001
 
-# Cross-platform screenshot capture
-def capture_screenshot():
-    """Capture screenshot in a cross-platform manner."""
-    try:
-        # Try PIL ImageGrab first (works on Windows and macOS)
-        from PIL import ImageGrab
-        return ImageGrab.grab()
-    except Exception as e:
-        logger.warning(f"ImageGrab failed: {e}")
-        # Fallback for Linux - try pyscreenshot
+# Cross-platform screenshot capture: pluggable backends, fastest one picked by a probe
+CAPTURE_BACKEND_ORDER = ("mss", "imagegrab", "pyscreenshot")  # Fallback order before a probe has run
+CAPTURE_PROBE_GRABS = 3  # Grabs timed per backend by the probe (median wins)
+numpy = None  # Optional; imported on first use by load_numpy()
+
+
+def load_numpy():
+    """Import numpy on first use; returns None when it isn't installed."""
+    global numpy
+    if numpy is None:
         try:
-            import pyscreenshot as ImageGrab
-            return ImageGrab.grab()
+            numpy = timed_import("numpy")
         except ImportError:
-            logger.error("pyscreenshot not installed. Install with: pip install pyscreenshot")
             return None
-        except Exception as e2:
-            logger.error(f"Screenshot capture failed: {e2}")
+    return numpy
+
+
+class CaptureFrame:
+    """
+    A captured frame, handed through the capture pipeline. Backends that grab
+    into their own buffer (mss: XShm segment / DIB section) hand it over as-is:
+    hashing and auto-crop read the zero-copy NumPy view, and the PIL image is
+    only built (from the cropped pixels) for OCR and encoding.
+    """
+    def __init__(self, size, buffer=None, raw_mode="BGRX", image=None):
+        self.size = size
+        self.buffer = buffer  # Row-major 4-byte pixels in raw_mode order, or None
+        self.raw_mode = raw_mode
+        self._image = image
+
+    @property
+    def image(self):
+        """RGB PIL image (one BGRA -> RGB pass for buffer-backed frames)."""
+        if self._image is None:
+            self._image = Image.frombuffer("RGB", self.size, self.buffer, "raw", self.raw_mode, 0, 1)
+        return self._image
+
+    def array(self):
+        """
+        Pixels as a NumPy array of shape (height, width, channels), or None without numpy.
+        Buffer-backed frames return a zero-copy BGRA view; image-backed frames an RGB copy.
+        """
+        np = load_numpy()
+        if np is None:
+            return None
+        if self.buffer is not None:
+            width, height = self.size
+            return np.frombuffer(self.buffer, dtype=np.uint8).reshape(height, width, 4)
+        return np.asarray(self.image)
+
+    def crop(self, box):
+        """Frame of the (left, top, right, bottom) box; buffer-backed frames copy only the box's pixels."""
+        left, top, right, bottom = box
+        if self.buffer is not None and load_numpy() is not None:
+            pixels = numpy.ascontiguousarray(self.array()[top:bottom, left:right])
+            return CaptureFrame((right - left, bottom - top), buffer=pixels, raw_mode=self.raw_mode)
+        return CaptureFrame((right - left, bottom - top), image=self.image.crop(box))
+
+
+class MssCaptureBackend:
+    """mss: XShm (MIT-SHM) on X11, BitBlt into a DIB section on Windows, no temp files."""
+    name = "mss"
+
+    def __init__(self):
+        self.mss = timed_import("mss")
+        self.local = threading.local()  # mss handles are bound to the thread that opened them
+
+    def grab(self, bbox=None, all_screens=False):
+        sct = getattr(self.local, "sct", None)
+        if sct is None:
+            sct = self.local.sct = self.mss.mss()
+        if bbox:
+            left, top, right, bottom = bbox
+            region = {"left": left, "top": top, "width": right - left, "height": bottom - top}
+        else:
+            region = sct.monitors[0 if all_screens else 1]
+        shot = sct.grab(region)
+        return CaptureFrame(shot.size, buffer=shot.raw, raw_mode="BGRX")
+
+
+class ImageGrabCaptureBackend:
+    """PIL.ImageGrab: GDI on Windows, CoreGraphics on macOS, XCB on Linux."""
+    name = "imagegrab"
+
+    def __init__(self):
+        self.image_grab = timed_import("PIL.ImageGrab")
+
+    def grab(self, bbox=None, all_screens=False):
+        image = self.image_grab.grab(bbox=bbox, all_screens=all_screens or bbox is not None)
+        return CaptureFrame(image.size, image=image)
+
+
+class PyscreenshotCaptureBackend:
+    """pyscreenshot: last resort on Linux; often shells out to a tool and reads back a PNG."""
+    name = "pyscreenshot"
+
+    def __init__(self):
+        self.pyscreenshot = timed_import("pyscreenshot")
+
+    def grab(self, bbox=None, all_screens=False):
+        image = self.pyscreenshot.grab(bbox=bbox)
+        return CaptureFrame(image.size, image=image)
+
+
+CAPTURE_BACKENDS = {"mss": MssCaptureBackend, "imagegrab": ImageGrabCaptureBackend,
+                    "pyscreenshot": PyscreenshotCaptureBackend}
+capture_backends = {}  # name -> backend instance, or None if it failed to load
+capture_backend_lock = threading.Lock()
+
+
+def get_capture_backend(name):
+    """Return the named capture backend, loading it on first use; None if unavailable."""
+    with capture_backend_lock:
+        if name not in capture_backends:
+            try:
+                capture_backends[name] = CAPTURE_BACKENDS[name]()
+            except Exception as e:
+                logger.info(f"Capture backend {name} unavailable: {e}")
+                capture_backends[name] = None
+        return capture_backends[name]
+
+
+def capture_backend_order():
+    """Backends to try in order: the configured or probed one first, then the fallbacks."""
+    preferred = app_config.get("capture_backend", "auto")
+    if preferred not in CAPTURE_BACKENDS:
+        preferred = app_config.get("capture_backend_probed")
+    order = [preferred] if preferred in CAPTURE_BACKENDS else []
+    return order + [name for name in CAPTURE_BACKEND_ORDER if name not in order]
+
+
+def capture_frame(bbox=None, all_screens=False):
+    """
+    Capture a CaptureFrame with the preferred backend, falling back to the others.
+    bbox: optional (left, top, right, bottom) region in virtual-desktop pixels
+    all_screens: capture every monitor instead of the primary one
+    """
+    failed = []
+    for name in capture_backend_order():
+        backend = get_capture_backend(name)
+        if backend is None:
+            continue
+        try:
+            frame = backend.grab(bbox=bbox, all_screens=all_screens)
+        except Exception as e:
+            logger.warning(f"{name} capture failed: {e}")
+            failed.append(name)
+            continue
+        if failed:
+            retire_capture_backends(failed)
+        return frame
+    logger.error("Screenshot capture failed with every backend. Install one with: pip install mss")
+    return None
+
+
+def retire_capture_backends(names):
+    """
+    Skip backends that failed while another one worked for the rest of the
+    session, and forget a failed probe result so the probe runs again on the
+    next start (e.g. after switching from X11 to Wayland).
+    """
+    with capture_backend_lock:
+        for name in names:
+            capture_backends[name] = None
+    logger.info(f"Capture backend {', '.join(names)} disabled for this session")
+    if app_config.get("capture_backend_probed") in names:
+        app_config["capture_backend_probed"] = None
+        save_config(app_config)
+
+
+def capture_screenshot(bbox=None, all_screens=False):
+    """Capture a screenshot as a PIL image (see capture_frame)."""
+    frame = capture_frame(bbox=bbox, all_screens=all_screens)
+    return frame.image if frame is not None else None
+
+
+def probe_capture_backends(force=False):
+    """
+    Time each available backend grabbing the primary monitor (including the
+    conversion to a PIL image) and remember the fastest in config.json.
+    Runs once, from warm-up, while capture_backend is "auto".
+    """
+    if app_config.get("capture_backend", "auto") != "auto":
+        return
+    if app_config.get("capture_backend_probed") in CAPTURE_BACKENDS and not force:
+        return
+    timings = {}
+    for name in CAPTURE_BACKEND_ORDER:
+        backend = get_capture_backend(name)
+        if backend is None:
+            continue
+        samples = []
+        try:
+            for _ in range(CAPTURE_PROBE_GRABS):
+                started = time.perf_counter()
+                backend.grab().image
+                samples.append((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            logger.info(f"Capture backend {name} failed the probe: {e}")
+            continue
+        timings[name] = sorted(samples)[len(samples) // 2]
+    if not timings:
+        logger.warning("No capture backend passed the probe")
+        return
+    fastest = min(timings, key=timings.get)
+    app_config["capture_backend_probed"] = fastest
+    save_config(app_config)
+    summary = ", ".join(f"{name} {ms:.1f} ms" for name, ms in sorted(timings.items(), key=lambda item: item[1]))
+    logger.info(f"Capture backend probe: {summary} - using {fastest}")
+
+# Monitor geometry cache - re-enumerated when the display layout changes
+monitor_cache = {"signature": None, "monitors": [], "checked_at": 0.0, "refreshing": False}
+MONITOR_CACHE_TTL = 30  # Seconds between re-checks where no cheap layout signature exists
+x11_local = threading.local()  # Per-thread python-xlib connection (Xlib displays aren't thread-safe)
+
+def get_x11_display():
+    """Return this thread's python-xlib display for cursor and monitor queries, or None."""
+    if not IS_LINUX or not os.environ.get("DISPLAY"):
+        return None
+    display = getattr(x11_local, "display", False)
+    if display is False:
+        try:
+            display = timed_import("Xlib.display").Display()
+        except Exception as e:
+            logger.debug(f"python-xlib display unavailable: {e}")
+            display = None
+        x11_local.display = display
+    return display
+
+def _display_layout_signature():
+    """Cheap fingerprint of the display layout, or None if unavailable on this platform."""
+    if IS_WINDOWS and ctypes:
+        metrics = ctypes.windll.user32.GetSystemMetrics
+        # SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN, SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN, SM_CMONITORS
+        return tuple(metrics(index) for index in (76, 77, 78, 79, 80))
+    return None
+
+def _enumerate_monitors():
+    """Enumerate monitors as dicts with left/top/right/bottom/primary in desktop pixels."""
+    monitors = []
+    if IS_WINDOWS and ctypes:
+        class MONITORINFO(ctypes.Structure):
+            _fields_ = [
+                ("cbSize", ctypes.wintypes.DWORD),
+                ("rcMonitor", ctypes.wintypes.RECT),
+                ("rcWork", ctypes.wintypes.RECT),
+                ("dwFlags", ctypes.wintypes.DWORD),
+            ]
+        
+        MONITORENUMPROC = ctypes.WINFUNCTYPE(
+            ctypes.c_int, ctypes.wintypes.HMONITOR, ctypes.wintypes.HDC,
+            ctypes.POINTER(ctypes.wintypes.RECT), ctypes.wintypes.LPARAM
+        )
+        
+        def callback(hmonitor, hdc, rect, lparam):
+            info = MONITORINFO()
+            info.cbSize = ctypes.sizeof(MONITORINFO)
+            if ctypes.windll.user32.GetMonitorInfoW(hmonitor, ctypes.byref(info)):
+                r = info.rcMonitor
+                monitors.append({
+                    "left": r.left, "top": r.top, "right": r.right, "bottom": r.bottom,
+                    "primary": bool(info.dwFlags & 1)  # MONITORINFOF_PRIMARY
+                })
+            return 1
+        
+        ctypes.windll.user32.EnumDisplayMonitors(None, None, MONITORENUMPROC(callback), 0)
+    elif IS_LINUX and not _enumerate_x11_monitors(monitors):
+        # Without python-xlib, ask xrandr, e.g. " 0: +*DP-1 2560/597x1440/336+0+0  DP-1"
+        output = subprocess.run(
+            ["xrandr", "--listmonitors"], capture_output=True, text=True, timeout=2
+        ).stdout
+        for line in output.splitlines()[1:]:
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            try:
+                size, x, y = parts[2].split("+")
+                width, height = (int(v.split("/")[0]) for v in size.split("x"))
+            except ValueError:
+                continue
+            monitors.append({
+                "left": int(x), "top": int(y), "right": int(x) + width, "bottom": int(y) + height,
+                "primary": "*" in parts[1]
+            })
+    return monitors
+
+def _enumerate_x11_monitors(monitors):
+    """Fill monitors from the RandR extension over python-xlib (one round trip); False if unavailable."""
+    display = get_x11_display()
+    if display is None:
+        return False
+    try:
+        reply = display.screen().root.xrandr_get_monitors()
+    except Exception as e:
+        logger.debug(f"RandR monitor query failed: {e}")
+        return False
+    for monitor in reply.monitors:
+        monitors.append({
+            "left": monitor.x, "top": monitor.y,
+            "right": monitor.x + monitor.width_in_pixels, "bottom": monitor.y + monitor.height_in_pixels,
+            "primary": bool(monitor.primary)
+        })
+    return True
+
+def _refresh_monitors(signature):
+    """Re-enumerate the monitors into the cache."""
+    try:
+        monitors = _enumerate_monitors()
+    except Exception as e:
+        logger.debug(f"Could not enumerate monitors: {e}")
+        monitors = []
+    monitor_cache["monitors"] = monitors
+    monitor_cache["signature"] = signature
+    monitor_cache["checked_at"] = time.monotonic()
+    monitor_cache["refreshing"] = False
+    logger.debug(f"Monitors: {monitors}")
+
+def get_monitors(refresh=False):
+    """
+    Return cached monitor geometry, re-enumerating if the display layout changed.
+    A cache that only expired is refreshed in the background, so a capture press
+    never waits on the enumeration (e.g. the xrandr fallback on Linux).
+    """
+    signature = _display_layout_signature()
+    if refresh or not monitor_cache["checked_at"] or monitor_cache["signature"] != signature:
+        _refresh_monitors(signature)
+    elif signature is None and time.monotonic() - monitor_cache["checked_at"] > MONITOR_CACHE_TTL:
+        if not monitor_cache["refreshing"]:
+            monitor_cache["refreshing"] = True
+            threading.Thread(target=_refresh_monitors, args=(signature,), name="monitors", daemon=True).start()
+    return monitor_cache["monitors"]
+
+def get_cursor_position():
+    """Return the mouse cursor position in desktop pixels, or None. Safe off the Tk thread."""
+    try:
+        if IS_WINDOWS and ctypes:
+            point = ctypes.wintypes.POINT()
+            ctypes.windll.user32.GetCursorPos(ctypes.byref(point))
+            return point.x, point.y
+        display = get_x11_display()
+        if display is None:
             return None
+        pointer = display.screen().root.query_pointer()
+        return pointer.root_x, pointer.root_y
+    except Exception:
+        return None
+
+def get_focused_window_center():
+    """Return the center of the focused window in desktop pixels, or None."""
+    if not (IS_WINDOWS and ctypes):
+        return None
+    try:
+        hwnd = ctypes.windll.user32.GetForegroundWindow()
+        rect = ctypes.wintypes.RECT()
+        if hwnd and ctypes.windll.user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+            return (rect.left + rect.right) // 2, (rect.top + rect.bottom) // 2
+    except Exception:
+        pass
+    return None
+
+def resolve_capture_bbox():
+    """
+    Return the bbox of the monitor selected by the capture_target setting:
+    "all" (whole desktop), "cursor", "focused" or "fixed" (capture_monitor index).
+    Returns None to capture the whole desktop.
+    """
+    target = app_config.get("capture_target", "cursor")
+    if target == "all":
+        return None
+    monitors = get_monitors()
+    if len(monitors) < 2:
+        return None
+    
+    def bbox_of(monitor):
+        return (monitor["left"], monitor["top"], monitor["right"], monitor["bottom"])
+    
+    if target == "fixed":
+        index = max(0, min(len(monitors) - 1, int(app_config.get("capture_monitor", 0))))
+        return bbox_of(monitors[index])
+    
+    point = get_focused_window_center() if target == "focused" else None
+    if point is None:
+        point = get_cursor_position()
+    if point is not None:
+        x, y = point
+        for monitor in monitors:
+            if monitor["left"] <= x < monitor["right"] and monitor["top"] <= y < monitor["bottom"]:
+                return bbox_of(monitor)
+    primary = next((m for m in monitors if m["primary"]), monitors[0])
+    return bbox_of(primary)
+
+# Upload formats for captured screenshots: config name -> (PIL format, MIME type)
+UPLOAD_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+
+def _encode_image(image, pil_format, quality):
+    """Encode a PIL image to bytes in the given format."""
+    buffer = io.BytesIO()
+    if pil_format == "JPEG":
+        image.save(buffer, format="JPEG", quality=quality)
+    elif pil_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=1)
+    else:
+        image.save(buffer, format="PNG", compress_level=6)
+    return buffer.getvalue()
+
+def encode_screenshot(image):
+    """
+    Encode a screenshot for upload using the upload_* settings.
+    Returns an inline blob ({"mime_type", "data"}) accepted by generate_content.
+    Falls back to the original PIL image if encoding fails.
+    """
+    started = time.perf_counter()
+    format_name = str(app_config.get("upload_format", "jpeg")).lower()
+    pil_format, mime_type = UPLOAD_FORMATS.get(format_name, UPLOAD_FORMATS["jpeg"])
+    quality = max(10, min(95, int(app_config.get("upload_quality", 85))))
+    color_mode = app_config.get("upload_color_mode", "color")
+    max_bytes = int(app_config.get("upload_max_bytes", 0) or 0)
+    raw_bytes = image.width * image.height * len(image.getbands())
+    
+    try:
+        # Optional color reduction for text-heavy screens
+        if color_mode == "grayscale":
+            image = image.convert("L")
+        elif color_mode == "palette":
+            colors = max(2, min(256, int(app_config.get("upload_palette_colors", 64))))
+            image = image.convert("RGB").quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+            if pil_format != "PNG":
+                # JPEG/WebP have no palette mode - keep the reduced colors in RGB
+                image = image.convert("RGB")
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        
+        data = _encode_image(image, pil_format, quality)
+        
+        # Step quality down, then resolution, until we fit the byte budget
+        while max_bytes and len(data) > max_bytes:
+            if pil_format != "PNG" and quality > 40:
+                quality -= 15
+            elif min(image.size) > 480:
+                new_size = (int(image.width * 0.75), int(image.height * 0.75))
+                resample = Image.Resampling.NEAREST if image.mode == "P" else Image.Resampling.LANCZOS
+                image = image.resize(new_size, resample)
+            else:
+                break
+            data = _encode_image(image, pil_format, quality)
+    except Exception as e:
+        logger.warning(f"Screenshot encoding failed, sending raw image: {e}")
+        return image
+    
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"Encoded screenshot: {raw_bytes / 1024:.0f} KB raw -> {len(data) / 1024:.0f} KB "
+        f"{pil_format} (q={quality}, {image.width}x{image.height}, {color_mode}) in {elapsed_ms:.1f} ms"
+    )
+    return {"mime_type": mime_type, "data": data}
+
+# Content-aware auto-crop: trim empty desktop, sidebars and taskbar before OCR and upload
+AUTO_CROP_WORK_SIZE = 1280  # Longest side the edge and variance maps are computed at
+AUTO_CROP_BLOCK = 16  # Block size (work pixels) of the edge and variance maps
+AUTO_CROP_EDGE_THRESHOLD = 32  # Gray-level step between neighbours counted as an edge
+AUTO_CROP_MIN_EDGE_DENSITY = 0.04  # Share of edge pixels, in both directions, for a block to count as content
+AUTO_CROP_MIN_VARIANCE = 150  # Gray-level variance for a block to count as content
+AUTO_CROP_BAR_SHARE = 0.1  # Content bands within this share of the height from the top or bottom are bars
+AUTO_CROP_SIDEBAR_SHARE = 0.15  # Content bands within this share of the width from either side are sidebars
+AUTO_CROP_JOIN_BLOCKS = 2  # Gap (blocks) bridged when joining words and lines into one region
+AUTO_CROP_PADDING = 24  # Padding (screen pixels) around the crop
+AUTO_CROP_MIN_GAIN = 0.15  # Crop only when it removes at least this share of the pixels
+
+
+def edge_bands(occupied, limit):
+    """Mask of the runs of occupied rows (or columns) that lie entirely within limit of either end."""
+    count = len(occupied)
+    bands = numpy.zeros(count, dtype=bool)
+    start = 0
+    while start < count:
+        if not occupied[start]:
+            start += 1
+            continue
+        end = start
+        while end + 1 < count and occupied[end + 1]:
+            end += 1
+        if end < limit or start >= count - limit:
+            bands[start:end + 1] = True
+        start = end + 1
+    return bands
+
+
+def auto_crop_box(frame, min_confidence=0.6):
+    """
+    Find the main text column of a CaptureFrame from block edge-density and variance maps,
+    leaving out bars and sidebars along the screen edges. Returns (box, confidence, reason):
+    box is (left, top, right, bottom) in frame pixels, or None to keep the full frame;
+    confidence is the share of the page's edge mass inside the box.
+    """
+    pixels = frame.array()
+    if pixels is None:
+        return None, 0.0, "no_numpy"
+    np = numpy
+    
+    # Gray of every scale-th pixel, read through the frame's view
+    width, height = frame.size
+    scale = max(1, -(-max(width, height) // AUTO_CROP_WORK_SIZE))
+    block = AUTO_CROP_BLOCK
+    rows, cols = (-(-height // scale)) // block, (-(-width // scale)) // block
+    if rows < 2 or cols < 2:
+        return None, 0.0, "too_small"
+    gray = gray_pixels(pixels[:rows * block * scale, :cols * block * scale], scale)
+    
+    # Per-block edge density and variance. Text has strong edges in both directions and high
+    # contrast; window borders, bars and gradients only have edges in one direction
+    edges_x = np.zeros(gray.shape, dtype=bool)
+    edges_y = np.zeros(gray.shape, dtype=bool)
+    edges_x[:, 1:] = np.abs(np.diff(gray, axis=1)) > AUTO_CROP_EDGE_THRESHOLD
+    edges_y[1:, :] = np.abs(np.diff(gray, axis=0)) > AUTO_CROP_EDGE_THRESHOLD
+    density_x = edges_x.reshape(rows, block, cols, block).mean(axis=(1, 3))
+    density_y = edges_y.reshape(rows, block, cols, block).mean(axis=(1, 3))
+    edge_density = density_x + density_y
+    variance = gray.reshape(rows, block, cols, block).astype(np.float32).var(axis=(1, 3))
+    content = (
+        (np.minimum(density_x, density_y) >= AUTO_CROP_MIN_EDGE_DENSITY)
+        & (variance >= AUTO_CROP_MIN_VARIANCE)
+    )
+    
+    # Screen chrome: content bands that lie along a screen edge, such as the taskbar, a tab bar
+    # or a sidebar, separated from the page by empty blocks
+    bars = edge_bands(content.any(axis=1), max(1, int(rows * AUTO_CROP_BAR_SHARE)))
+    page = content & ~bars[:, None]
+    sidebars = edge_bands(page.any(axis=0), max(1, int(cols * AUTO_CROP_SIDEBAR_SHARE)))
+    page &= ~sidebars[None, :]
+    if not page.any():
+        return None, 0.0, "no_content"
+    
+    # Grow content blocks so the words and lines of one paragraph or dialog form one region
+    grown = page.copy()
+    for shift in range(1, AUTO_CROP_JOIN_BLOCKS + 1):
+        grown[:, shift:] |= page[:, :-shift]
+        grown[:, :-shift] |= page[:, shift:]
+    spread = grown.copy()
+    for shift in range(1, AUTO_CROP_JOIN_BLOCKS + 1):
+        spread[shift:, :] |= grown[:-shift, :]
+        spread[:-shift, :] |= grown[shift:, :]
+    
+    # Connected regions (4-neighbour flood fill over the small block grid)
+    labels = np.zeros((rows, cols), dtype=np.int32)
+    label = 0
+    for start in zip(*np.nonzero(spread)):
+        if labels[start]:
+            continue
+        label += 1
+        labels[start] = label
+        stack = [start]
+        while stack:
+            r, c = stack.pop()
+            for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                if 0 <= nr < rows and 0 <= nc < cols and spread[nr, nc] and not labels[nr, nc]:
+                    labels[nr, nc] = label
+                    stack.append((nr, nc))
+    
+    # Start from the region with the most edge mass and add every region stacked above or
+    # below it (stem and options) or beside it (passage and question), until none is left
+    mass = np.bincount(labels[page], weights=edge_density[page], minlength=label + 1)
+    spans = {}
+    for region in range(1, label + 1):
+        region_rows, region_cols = np.nonzero((labels == region) & page)
+        spans[region] = (region_cols.min(), region_rows.min(), region_cols.max(), region_rows.max())
+    group = {int(mass.argmax())}
+    left, top, right, bottom = spans[int(mass.argmax())]
+    joined = True
+    while joined:
+        joined = False
+        for region, (l, t, r, b) in spans.items():
+            if region not in group and ((l <= right and r >= left) or (t <= bottom and b >= top)):
+                group.add(region)
+                left, top, right, bottom = min(left, l), min(top, t), max(right, r), max(bottom, b)
+                joined = True
+    selected = np.isin(labels, list(group)) & page
+    page_mass = float(edge_density[~bars][:, ~sidebars].sum())
+    confidence = float(edge_density[selected].sum()) / page_mass
+    if confidence < min_confidence:
+        return None, confidence, "low_confidence"
+    
+    hit_rows, hit_cols = np.nonzero(selected)
+    pixel = block * scale
+    pad = AUTO_CROP_PADDING
+    box = (
+        max(0, int(hit_cols.min()) * pixel - pad),
+        max(0, int(hit_rows.min()) * pixel - pad),
+        min(width, (int(hit_cols.max()) + 1) * pixel + pad),
+        min(height, (int(hit_rows.max()) + 1) * pixel + pad),
+    )
+    kept = (box[2] - box[0]) * (box[3] - box[1]) / (width * height)
+    if kept > 1 - AUTO_CROP_MIN_GAIN:
+        return None, confidence, "no_gain"
+    return box, confidence, "cropped"
+
+
+def auto_crop_frame(job, frame):
+    """Crop a CaptureFrame to its main text column (see auto_crop_box), tracing the box and confidence."""
+    started = time.perf_counter()
+    try:
+        box, confidence, reason = auto_crop_box(
+            frame, float(app_config.get("auto_crop_min_confidence", 0.6))
+        )
+    except Exception as e:
+        logger.warning(f"Auto-crop failed, keeping the full frame: {e}")
+        box, confidence, reason = None, 0.0, "error"
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    trace_set(job, crop_result=reason, crop_confidence=round(confidence, 3), crop_ms=round(elapsed_ms, 1))
+    if box is None:
+        logger.debug(f"Auto-crop kept the full frame ({reason}, confidence {confidence:.2f})")
+        return frame
+    cropped = frame.crop(box)
+    trace_set(job, crop_box=list(box))
+    (width, height), (crop_width, crop_height) = frame.size, cropped.size
+    logger.info(
+        f"Auto-crop: {width}x{height} -> {crop_width}x{crop_height} "
+        f"({100 * crop_width * crop_height / (width * height):.0f}% of pixels, "
+        f"confidence {confidence:.2f}) in {elapsed_ms:.1f} ms"
+    )
+    return cropped
+
+# Local OCR (Tesseract) for text-only requests
+OCR_TIMEOUT_S = 10  # Give up on OCR (and send the image) after this long
+OCR_MIN_WORDS = 4  # Fewer recognized words than this is not worth a text request
+OCR_MAX_CODE_RATIO = 0.3  # More code-like lines than this: indentation/layout matters, send the image
+OCR_MAX_NOISE_RATIO = 0.25  # More junk tokens than this: likely a diagram or chart, send the image
+IMAGE_TILE_SIZE = 768  # Gemini bills images per 768x768 tile...
+IMAGE_TILE_TOKENS = 258  # ...at 258 tokens each (one tile if both sides are <= 384 px)
+OPTION_LINE_PATTERN = re.compile(r"\s*(\(?[A-Ha-h1-8][.)]|[○●◯◉•□☐])\s+\S")  # "A) ...", "(b) ...", "3. ...", "○ ..."
+CODE_LINE_PATTERN = re.compile(
+    r"[{};]\s*$|^\s*(def|class|import|from|return|if|elif|for|while|function|public|private|"
+    r"static|void|int|var|let|const|#include)\b|[=!<>]=|=>|::|->|\w\(.*\)\s*[{:]\s*$"
+)
+
+tesseract_command = None  # Resolved tesseract executable ("" if not found)
+
+def find_tesseract():
+    """Locate the tesseract executable: tesseract_path setting, PATH, then the default Windows install."""
+    global tesseract_command
+    if tesseract_command is None:
+        configured = app_config.get("tesseract_path", "")
+        candidates = [configured] if configured else [shutil.which("tesseract") or ""]
+        if not configured and IS_WINDOWS:
+            program_files = os.environ.get("ProgramFiles", r"C:\Program Files")
+            candidates.append(os.path.join(program_files, "Tesseract-OCR", "tesseract.exe"))
+        tesseract_command = next((c for c in candidates if c and os.path.exists(c)), "")
+        if not tesseract_command:
+            logger.warning("Tesseract not found - OCR text mode will send images instead")
+    return tesseract_command
+
+def parse_tesseract_tsv(tsv):
+    """
+    Parse Tesseract TSV output into text lines plus the signals used to decide
+    whether the text can stand in for the image.
+    """
+    lines = {}  # (block, paragraph, line) -> words, in reading order
+    word_confidences = []  # (confidence, characters)
+    noise_words = 0
+    for row in tsv.splitlines()[1:]:
+        columns = row.split("\t")
+        if len(columns) < 12 or columns[0] != "5":  # level 5 = word
+            continue
+        word = columns[11].strip()
+        confidence = float(columns[10])
+        if not word or confidence < 0:
+            continue
+        lines.setdefault((columns[2], columns[3], columns[4]), []).append(word)
+        word_confidences.append((confidence, len(word)))
+        if confidence < 50 or not any(ch.isalnum() for ch in word):
+            noise_words += 1
+    
+    text_lines = [" ".join(words) for words in lines.values()]
+    paragraphs = [key[:2] for key in lines]
+    characters = sum(length for _, length in word_confidences)
+    code_lines = sum(1 for line in text_lines if CODE_LINE_PATTERN.search(line))
+    return {
+        "text": "\n".join(text_lines),
+        "lines": list(zip(paragraphs, text_lines)),  # ((block, paragraph), text) in reading order
+        "words": len(word_confidences),
+        "confidence": sum(c * n for c, n in word_confidences) / characters if characters else 0.0,
+        "code_ratio": code_lines / len(text_lines) if text_lines else 0.0,
+        "noise_ratio": noise_words / len(word_confidences) if word_confidences else 1.0,
+    }
+
+def extract_question_block(lines):
+    """
+    Return the question stem and its options from OCR lines (see parse_tesseract_tsv), or None.
+    The stem is the paragraph just before the first run of option lines, or without options the
+    paragraph of the last line ending in "?". The rest of the screen (clock, tabs, page) is left out.
+    """
+    texts = [text for _, text in lines]
+    first_option = next((i for i, text in enumerate(texts) if OPTION_LINE_PATTERN.match(text)), None)
+    if first_option is not None and first_option > 0:
+        stem_paragraph = lines[first_option - 1][0]
+        options_end = first_option
+        while options_end < len(lines) and (
+            OPTION_LINE_PATTERN.match(texts[options_end])
+            or lines[options_end][0] == lines[options_end - 1][0]  # wrapped option text
+        ):
+            options_end += 1
+        stem = [text for paragraph, text in lines[:first_option] if paragraph == stem_paragraph]
+        return "\n".join(stem + texts[first_option:options_end])
+    questions = [i for i, text in enumerate(texts) if text.rstrip().endswith("?")]
+    if questions:
+        stem_paragraph = lines[questions[-1]][0]
+        return "\n".join(text for paragraph, text in lines if paragraph == stem_paragraph)
+    return None
+
+def run_ocr(image):
+    """Run Tesseract on a screenshot. Returns parse_tesseract_tsv() output plus "ms", or None."""
+    command = find_tesseract()
+    if not command:
+        return None
+    started = time.perf_counter()
+    buffer = io.BytesIO()
+    image.convert("L").save(buffer, format="PNG", compress_level=1)
+    try:
+        result = subprocess.run(
+            [command, "stdin", "stdout", "--psm", "3", "tsv"],
+            input=buffer.getvalue(),
+            capture_output=True,
+            timeout=OCR_TIMEOUT_S,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"OCR failed: {e}")
+        return None
+    if result.returncode != 0:
+        logger.warning(f"OCR failed: {result.stderr.decode('utf-8', errors='replace').strip()[:200]}")
+        return None
+    ocr = parse_tesseract_tsv(result.stdout.decode("utf-8", errors="replace"))
+    ocr["ms"] = (time.perf_counter() - started) * 1000
+    return ocr
+
+def choose_ocr_text(ocr):
+    """Decide whether OCR text can replace the image. Returns (use_text, reason)."""
+    if ocr is None:
+        return False, "ocr_unavailable"
+    if ocr["words"] < OCR_MIN_WORDS:
+        return False, "too_little_text"
+    if ocr["confidence"] < app_config.get("ocr_min_confidence", 80):
+        return False, "low_confidence"
+    if ocr["code_ratio"] > OCR_MAX_CODE_RATIO:
+        return False, "code"
+    if ocr["noise_ratio"] > OCR_MAX_NOISE_RATIO:
+        return False, "diagram"
+    return True, "text"
+
+def estimate_image_tokens(width, height):
+    """Estimate Gemini input tokens for an image of this size."""
+    if width <= IMAGE_TILE_SIZE // 2 and height <= IMAGE_TILE_SIZE // 2:
+        return IMAGE_TILE_TOKENS
+    return -(-width // IMAGE_TILE_SIZE) * -(-height // IMAGE_TILE_SIZE) * IMAGE_TILE_TOKENS
+
+def estimate_text_tokens(text):
+    """Estimate Gemini input tokens for text (about 4 characters per token)."""
+    return max(1, len(text) // 4)
 
 # Cross-platform URL opener
 def open_url(url):
@@ -352,6 +1147,9 @@ API_KEY = None  # Will be loaded from config
 # The Hotkey combination to trigger the capture
 HOTKEY = "ctrl+alt+s"
 
+# The Hotkey combination to capture a selected region of the screen
+REGION_HOTKEY = "ctrl+alt+r"
+
 # The Hotkey combination to quit the application
 QUIT_HOTKEY = "ctrl+alt+q"
 
@@ -367,28 +1165,112 @@ HISTORY_HOTKEY = "ctrl+alt+h"
 # The Hotkey combination to open settings
 SETTINGS_HOTKEY = "ctrl+alt+p"
 
-# Maximum number of history items to keep
-MAX_HISTORY_ITEMS = 10
+# Maximum number of history items to keep (overridden by "max_history" in config.json)
+MAX_HISTORY_ITEMS = 1000
 
 # ----------------------------------------------- #
 
 # Global variable for the popup window
-popup_window = None
+popup_window = None  # Reusable answer popup (built once, withdrawn when closed)
+history_window = None  # Reusable history popup
 popup_hidden = False  # Track if popup is hidden
 loading_indicator = None  # Loading indicator window
-logo_image = None  # Store logo image reference
 tray_icon = None  # System tray icon
 settings_window = None  # Settings window
+region_selector = None  # Drag-to-select region overlay
 available_models = []  # Available Gemini models
+models_cache_meta = {}  # fetched_at and key fingerprint of the cached model list
+models_refresh_lock = threading.Lock()
+models_refresh_callbacks = None  # Callbacks waiting on the model list refresh in flight (None = idle)
 model = None  # Current Gemini model instance
 
 # Get paths using the helper functions for proper executable support
 LOGO_PATH = get_resource_path(os.path.join("assets", "logo.png"))
 CONFIG_PATH = get_data_path("config.json")
 HISTORY_PATH = get_data_path("history.json")
+ANSWER_CACHE_PATH = os.path.join(os.path.dirname(HISTORY_PATH), "answer_cache.json")
+QUESTION_CACHE_PATH = os.path.join(os.path.dirname(HISTORY_PATH), "question_cache.json")
+MODELS_CACHE_PATH = os.path.join(os.path.dirname(HISTORY_PATH), "models_cache.json")
+RACE_STATS_PATH = os.path.join(os.path.dirname(HISTORY_PATH), "race_stats.json")
+TRACE_PATH = get_data_path("elanswer_trace.jsonl")  # One latency record per capture
+
+# History storage: SQLite (WAL) written by one writer thread, read with paged queries
+HISTORY_DB_PATH = os.path.join(os.path.dirname(HISTORY_PATH), "history.db")
+HISTORY_PAGE_SIZE = 50  # Entries fetched per query by the history popup
+HISTORY_PRUNE_INTERVAL = 100  # Inserts between retention prunes
+HISTORY_JSON_IMPORTED = 1  # history.db user_version once history.json has been imported
+HISTORY_SEARCH_DEBOUNCE_MS = 120  # Pause in typing before the history search runs
+HISTORY_ROW_HEIGHT = 58  # Height of one row in the history popup list
+HISTORY_ROW_GAP = 8  # Space between rows
+history_queue = None
+history_writer_thread = None
+history_writer_lock = threading.Lock()
+history_local = threading.local()  # One connection per thread
+history_schema_lock = threading.Lock()
+history_fts_available = False  # Set once the FTS5 search index is ready
+
+# UI image assets, decoded and resized once per (path, size, background)
+image_assets = {}  # PIL images (any thread)
+photo_assets = {}  # Tk PhotoImages (Tk thread only); also keeps them from being garbage-collected
+asset_lock = threading.Lock()
+
+# Answer cache (perceptual image hash -> answer), kept in LRU order
+answer_cache = OrderedDict()
+answer_cache_stats = {"hits": 0, "misses": 0}
+answer_cache_lock = threading.Lock()
+
+# Cache files are rewritten on a background timer, not on the capture worker
+CACHE_SAVE_DELAY_S = 5  # Changes within this window are written together
+cache_save_timers = {}  # save function -> pending threading.Timer
+cache_save_lock = threading.Lock()
+cache_write_lock = threading.Lock()  # One writer at a time (timer thread or exit flush)
 
-# History storage
-answer_history = []
+# Question cache (normalized question text -> answer), kept in LRU order with a trigram index
+QUESTION_MIN_CHARS = 12  # Shorter questions are too ambiguous to match on
+QUESTION_MIN_WORD_PAIRS = 0.7  # Share of adjacent word pairs the screen and cached text must have in common (both ways)
+QUESTION_CACHE_VERSION = 3  # Entries are keyed on the OCR'd question block (stem and options)
+NEGATION_WORDS = {"not", "no", "never", "except", "false", "incorrect", "least", "without"}
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+question_cache = OrderedDict()
+question_index = {}  # trigram -> keys of the cached questions containing it
+question_cache_stats = {"hits": 0, "misses": 0}
+question_cache_lock = threading.Lock()
+
+# Race mode: each capture goes to the selected model and "race_model" at once
+RACE_LATENCY_SAMPLES = 200  # Latencies kept per model in race_stats.json
+race_client = None  # Client for race_model, rebuilt when it changes
+race_stats = {}  # model -> races, wins, errors and recent first-token/total latencies
+race_stats_lock = threading.Lock()
+
+hotkey_backend = None  # Hotkey backend in use (see start_hotkeys)
+
+# UI command queue: hotkey and tray actions are posted here and run by the Tk mainloop,
+# which a waker thread rouses with a <<UICommand>> event (no polling while idle)
+UI_DISPATCH_WARN_MS = 50  # Post-to-run latency above this is logged as a warning
+UI_WAKE_RETRY_S = 0.1  # Retry delay while the mainloop isn't running yet
+ui_commands = queue.SimpleQueue()
+ui_wake = threading.Event()
+
+# Per-capture latency traces
+trace_lock = threading.Lock()
+LATENCY_HISTORY_SAMPLES = 200  # Recent requests kept per (model, streaming) for deadlines and hedging
+LATENCY_MIN_SAMPLES = 20  # History needed before it replaces the configured defaults
+latency_history = {}  # (model, streaming) -> deque of (first byte ms, complete ms) since request sent
+latency_lock = threading.Lock()
+
+# Capture worker: one long-lived thread fed by a bounded queue of hotkey presses
+capture_queue = None
+capture_worker_thread = None
+capture_lock = threading.Lock()
+last_capture_press = float('-inf')
+capture_stats = {"pressed": 0, "coalesced": 0, "dropped": 0, "joined": 0, "cancelled": 0}
+
+# Capture-first hotkey path: the capture chords only timestamp the press and wake
+# the grab thread, so the screen is grabbed before any UI or model work
+HOTKEY_TO_PIXELS_TARGET_MS = 50  # Press-to-pixels time above this is logged as a warning
+grab_requests = deque()  # (kind, pressed_at) presses waiting for the grab thread
+grab_requested = threading.Event()
+grab_thread = None
 
 # Theme definitions
 THEMES = {
@@ -427,11 +1309,48 @@ def load_config():
         "popup_y": 80,
         "theme": "light",
         "model": "models/gemini-3-flash-preview",
-        "max_history": 10,
+        "api_transport": "sdk",  # "sdk" (google-generativeai) or "rest" (built-in pooled client, no SDK import)
+        "api_base_url": "https://generativelanguage.googleapis.com",  # Endpoint used by the REST client
+        "models_cache_ttl_hours": 24,  # Age at which the cached model list is refreshed in the background
+        "max_history": 1000,
         "auto_copy": False,
         "show_explanation": True,
         "compact_mode": False,
-        "stealth_mode": True  # Hide from screen capture/sharing by default
+        "stealth_mode": True,  # Hide from screen capture/sharing by default
+        "upload_format": "jpeg",  # jpeg, webp or png
+        "upload_quality": 85,  # 10-95, ignored for png
+        "upload_color_mode": "color",  # color, grayscale or palette
+        "upload_palette_colors": 64,  # Colors kept in palette mode
+        "upload_max_bytes": 1500000,  # Byte budget per upload (0 = unlimited)
+        "answer_cache_enabled": True,  # Reuse answers for near-identical screens
+        "answer_cache_distance": 2,  # Max Hamming distance (of 2304 hash bits) for a hit
+        "answer_cache_max_bytes": 2000000,  # Size limit of answer_cache.json entries
+        "question_cache_enabled": True,  # Reuse answers for a question recognized again by OCR
+        "question_cache_similarity": 0.9,  # Share of trigrams the question blocks must share, in both directions
+        "question_cache_max_entries": 500,  # Questions kept in question_cache.json
+        "stream_responses": True,  # Show the answer as it is generated
+        "request_timeout_s": 60,  # Longest a request may take; shortened to 3x the observed p99 once known
+        "request_retries": 2,  # Retries for timeouts, 429 and 5xx errors before the first chunk
+        "retry_base_ms": 500,  # First retry delay, doubled (with jitter) for each further retry
+        "circuit_breaker_failures": 5,  # Failed requests in a row before failing fast (0 = off)
+        "circuit_breaker_cooldown_s": 30,  # How long to fail fast before trying Gemini again
+        "hedge_requests": False,  # Send a duplicate request when the first byte is later than the observed p95
+        "race_mode": "off",  # "cancel" or "upgrade" sends each capture to race_model too; the first answer is shown
+        "race_model": "models/gemini-2.5-pro",  # Model raced against the selected one
+        "hotkey_backend": "auto",  # "auto" (native RegisterHotKey/XGrabKey, else keyboard), "native" or "keyboard"
+        "capture_queue_size": 4,  # Max capture presses waiting for the worker
+        "capture_debounce_ms": 300,  # Presses closer together than this are coalesced
+        "remember_region": False,  # Reuse the last selected region for region captures
+        "last_region": None,  # [left, top, right, bottom] of the last selected region
+        "capture_target": "cursor",  # all, cursor, focused or fixed
+        "capture_monitor": 0,  # Monitor index used by the "fixed" capture target
+        "capture_backend": "auto",  # "auto" (fastest found by the probe), "mss", "imagegrab" or "pyscreenshot"
+        "capture_backend_probed": None,  # Backend picked by the startup probe (cleared if it stops working)
+        "auto_crop": True,  # Crop captures to their main text column before OCR and upload
+        "auto_crop_min_confidence": 0.6,  # Share of the page's text-like edges the crop must hold, else send the full frame
+        "ocr_mode": "off",  # "auto" sends OCR text instead of the image when the screen is plain text
+        "ocr_min_confidence": 80,  # Mean Tesseract word confidence (0-100) needed for text mode
+        "tesseract_path": ""  # Path to tesseract(.exe); empty = search PATH and the default install
     }
     try:
         if os.path.exists(CONFIG_PATH):
@@ -451,50 +1370,257 @@ def save_config(config):
     except Exception as e:
         logger.error(f"Could not save config: {e}")
 
+def get_history_connection():
+    """Get this thread's SQLite connection to the history database (WAL mode)."""
+    conn = getattr(history_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(HISTORY_DB_PATH, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with history_schema_lock:
+            init_history_schema(conn)
+        history_local.conn = conn
+    return conn
+
+def init_history_schema(conn):
+    """Create the history table and its FTS5 search index (with sync triggers) if missing."""
+    global history_fts_available
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "timestamp TEXT NOT NULL, "
+            "preview TEXT NOT NULL, "
+            "answer TEXT NOT NULL, "
+            "question TEXT NOT NULL DEFAULT '')"
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(history)")]
+        if "question" not in columns:
+            # Databases from before search was added: add and backfill the question column
+            conn.execute("ALTER TABLE history ADD COLUMN question TEXT NOT NULL DEFAULT ''")
+            rows = conn.execute("SELECT id, answer FROM history").fetchall()
+            conn.executemany("UPDATE history SET question = ? WHERE id = ?",
+                             [(extract_question(answer), entry_id) for entry_id, answer in rows])
+
+    try:
+        with conn:
+            index_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'history_fts'"
+            ).fetchone()
+            # External-content index: stores only the index, the text stays in history
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+                "question, answer, preview, content='history', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN "
+                "INSERT INTO history_fts(rowid, question, answer, preview) "
+                "VALUES (new.id, new.question, new.answer, new.preview); END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN "
+                "INSERT INTO history_fts(history_fts, rowid, question, answer, preview) "
+                "VALUES ('delete', old.id, old.question, old.answer, old.preview); END"
+            )
+            if not index_exists:
+                conn.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+        history_fts_available = True
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5 - search falls back to LIKE
+        logger.warning(f"Full-text search unavailable, using slower search: {e}")
+        history_fts_available = False
+
 def load_history():
-    """Load answer history from file."""
-    global answer_history
+    """Open the history database, migrating history.json on first run, and start the writer."""
     try:
+        conn = get_history_connection()
         if os.path.exists(HISTORY_PATH):
-            with open(HISTORY_PATH, 'r', encoding='utf-8') as f:
-                answer_history = json.load(f)
-                # Trim to max items
-                answer_history = answer_history[:MAX_HISTORY_ITEMS]
+            # The import is recorded in user_version in the same transaction as the rows, so a
+            # failed rename (or a crash before it) never imports the entries twice
+            if conn.execute("PRAGMA user_version").fetchone()[0] < HISTORY_JSON_IMPORTED:
+                with open(HISTORY_PATH, 'r', encoding='utf-8') as f:
+                    legacy_history = json.load(f)
+                # history.json is newest-first; insert oldest-first so ids keep the order
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO history (timestamp, preview, answer, question) VALUES (?, ?, ?, ?)",
+                        [(e.get("timestamp", ""), e.get("preview", ""), e.get("answer", ""),
+                          extract_question(e.get("answer", ""))) for e in reversed(legacy_history)]
+                    )
+                    conn.execute(f"PRAGMA user_version = {HISTORY_JSON_IMPORTED}")
+                logger.info(f"Migrated {len(legacy_history)} history entries to {os.path.basename(HISTORY_DB_PATH)}")
+            os.replace(HISTORY_PATH, HISTORY_PATH + ".migrated")
     except Exception as e:
         logger.warning(f"Could not load history: {e}")
-        answer_history = []
+    start_history_writer()
+    prune_history()
 
-def save_history():
-    """Save answer history to file."""
-    try:
-        with open(HISTORY_PATH, 'w', encoding='utf-8') as f:
-            json.dump(answer_history[:MAX_HISTORY_ITEMS], f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        logger.error(f"Could not save history: {e}")
+def start_history_writer():
+    """Start the history writer thread if it isn't running."""
+    global history_queue, history_writer_thread
+    with history_writer_lock:
+        if history_writer_thread and history_writer_thread.is_alive():
+            return
+        history_queue = queue.Queue()
+        history_writer_thread = threading.Thread(target=history_writer_loop, name="history-writer", daemon=True)
+        history_writer_thread.start()
+
+def history_writer_loop():
+    """Apply queued history writes in batches, one transaction per batch, pruning periodically."""
+    inserts_since_prune = 0
+    while True:
+        operations = [history_queue.get()]
+        while True:
+            try:
+                operations.append(history_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        stop = None in operations
+        try:
+            conn = get_history_connection()
+            with conn:
+                for operation in operations:
+                    if operation is None:
+                        continue
+                    action, value = operation
+                    if action == "add":
+                        conn.execute(
+                            "INSERT INTO history (timestamp, preview, answer, question) VALUES (?, ?, ?, ?)",
+                            (value["timestamp"], value["preview"], value["answer"], value["question"])
+                        )
+                        inserts_since_prune += 1
+                    elif action == "clear":
+                        conn.execute("DELETE FROM history")
+                    if action == "prune" or inserts_since_prune >= HISTORY_PRUNE_INTERVAL:
+                        # Keep the newest MAX_HISTORY_ITEMS rows
+                        conn.execute(
+                            "DELETE FROM history WHERE id <= "
+                            "(SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                            (MAX_HISTORY_ITEMS,)
+                        )
+                        inserts_since_prune = 0
+        except Exception as e:
+            logger.error(f"Could not save history: {e}")
+        if stop:
+            return
+
+def flush_history(timeout=2.0):
+    """Stop the history writer after it has written everything queued (used on quit)."""
+    if history_writer_thread and history_writer_thread.is_alive():
+        history_queue.put(None)
+        history_writer_thread.join(timeout)
 
 def add_to_history(answer_text):
-    """Add a new answer to history."""
-    global answer_history
-    
-    # Create history entry
+    """Add a new answer to history (queued; written by the history writer thread)."""
     entry = {
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "preview": extract_preview(answer_text),
+        "question": extract_question(answer_text),
         "answer": answer_text
     }
-    
-    # Add to beginning of list
-    answer_history.insert(0, entry)
-    
-    # Trim to max items
-    answer_history = answer_history[:MAX_HISTORY_ITEMS]
-    
-    # Save to file
-    save_history()
+    start_history_writer()
+    history_queue.put(("add", entry))
     
     # Update tray menu if available (pystray auto-updates dynamic menus)
     # Note: pystray dynamically rebuilds menu on each click, no explicit update needed
 
+def clear_history():
+    """Delete all history entries."""
+    start_history_writer()
+    history_queue.put(("clear", None))
+
+def prune_history():
+    """Trim history to MAX_HISTORY_ITEMS (e.g. after the limit is lowered)."""
+    start_history_writer()
+    history_queue.put(("prune", None))
+
+def get_history_page(offset=0, limit=HISTORY_PAGE_SIZE, query=""):
+    """Get a page of history entries (newest first) without the answer text, optionally filtered by a search."""
+    try:
+        conn = get_history_connection()
+        if query.strip():
+            return search_history(conn, query, offset, limit)
+        rows = conn.execute(
+            "SELECT id, timestamp, preview FROM history ORDER BY id DESC LIMIT ? OFFSET ?",
+            (limit, offset)
+        ).fetchall()
+        return [{"id": row[0], "timestamp": row[1], "preview": row[2]} for row in rows]
+    except Exception as e:
+        logger.warning(f"Could not read history: {e}")
+        return []
+
+def build_fts_query(query):
+    """Turn typed text into an FTS5 query: every word must match, the last one as a prefix."""
+    words = [word.replace('"', '""') for word in query.split()]
+    terms = [f'"{word}"' for word in words]
+    # Prefix-match the word being typed (single letters would expand to most of the index)
+    if len(words[-1]) > 1:
+        terms[-1] += "*"
+    return " AND ".join(terms)
+
+def search_history(conn, query, offset, limit):
+    """Search question, answer and preview text; newest matches first."""
+    if history_fts_available:
+        rows = conn.execute(
+            "SELECT id, timestamp, preview FROM history WHERE id IN ("
+            "SELECT rowid FROM history_fts WHERE history_fts MATCH ? ORDER BY rowid DESC LIMIT ? OFFSET ?"
+            ") ORDER BY id DESC",
+            (build_fts_query(query), limit, offset)
+        ).fetchall()
+    else:
+        conditions, params = [], []
+        for word in query.split():
+            pattern = "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions.append("(question LIKE ? ESCAPE '\\' OR answer LIKE ? ESCAPE '\\' OR preview LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern, pattern])
+        rows = conn.execute(
+            f"SELECT id, timestamp, preview FROM history WHERE {' AND '.join(conditions)} "
+            "ORDER BY id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+    return [{"id": row[0], "timestamp": row[1], "preview": row[2]} for row in rows]
+
+def get_history_answer(entry_id):
+    """Get the full answer text of a history entry."""
+    try:
+        row = get_history_connection().execute(
+            "SELECT answer FROM history WHERE id = ?", (entry_id,)
+        ).fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        logger.warning(f"Could not read history: {e}")
+        return None
+
+def get_history_count(query=""):
+    """Get the number of stored history entries, or of entries matching a search."""
+    try:
+        conn = get_history_connection()
+        if not query.strip():
+            return conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        if history_fts_available:
+            return conn.execute(
+                "SELECT COUNT(*) FROM history_fts WHERE history_fts MATCH ?", (build_fts_query(query),)
+            ).fetchone()[0]
+        return len(search_history(conn, query, 0, -1))
+    except Exception as e:
+        logger.warning(f"Could not read history: {e}")
+        return 0
+
+def extract_question(answer_text):
+    """Extract the full QUESTION section of an answer (used for search)."""
+    lines = answer_text.split('\n')
+    for i, line in enumerate(lines):
+        if 'QUESTION:' in line:
+            question_lines = []
+            for next_line in lines[i + 1:]:
+                if 'ANSWER:' in next_line or 'EXPLANATION:' in next_line:
+                    break
+                question_lines.append(next_line.strip())
+            return " ".join(l for l in question_lines if l)
+    return ""
+
 def extract_preview(answer_text):
     """Extract a short preview from the answer text."""
     # Try to find the QUESTION section
@@ -520,79 +1646,938 @@ def extract_preview(answer_text):
     
     return "Answer captured"
 
-# Load saved configuration
-app_config = load_config()
+def gray_pixels(pixels, step=1):
+    """
+    Channel-average gray (int16) of every step-th pixel of a frame's NumPy view.
+    The average is the same for RGB and BGRA frames; only this small result is copied.
+    """
+    if pixels.ndim == 2:
+        return pixels[::step, ::step].astype(numpy.int16)
+    view = pixels[::step, ::step]
+    return (view[..., 0].astype(numpy.int16) + view[..., 1] + view[..., 2]) // 3
 
-# Load API key from config or environment
-API_KEY = app_config.get("api_key", "") or os.environ.get("GEMINI_API_KEY", "")
+def _gray_thumbnail(frame, width, height):
+    """
+    Area-averaged grayscale thumbnail of a CaptureFrame, read from its NumPy
+    view (a strided subsample, then block means) when numpy is available.
+    """
+    pixels = frame.array()
+    if pixels is None or pixels.shape[0] < height * 2 or pixels.shape[1] < width * 2:
+        return frame.image.resize((width, height), Image.Resampling.BOX).convert("L")
+    np = numpy
+    step = max(1, min(pixels.shape[0] // height, pixels.shape[1] // width) // 2)
+    gray = gray_pixels(pixels, step)
+    row_starts = np.linspace(0, gray.shape[0], height + 1).astype(np.intp)
+    col_starts = np.linspace(0, gray.shape[1], width + 1).astype(np.intp)
+    sums = np.add.reduceat(gray, row_starts[:-1], axis=0, dtype=np.int32)
+    sums = np.add.reduceat(sums, col_starts[:-1], axis=1)
+    counts = np.outer(np.diff(row_starts), np.diff(col_starts))
+    return Image.fromarray((sums // counts).astype(np.uint8), "L")
 
-# Load answer history
-load_history()
+def compute_image_hash(frame, cols=64, rows=36):
+    """
+    Compute a perceptual hash of a CaptureFrame as an int (cols x rows bits).
+    Each bit marks a grid cell containing edges (text, lines, widgets), so
+    near-identical screens land within a small Hamming distance while a
+    different question on the same layout flips several bits.
+    """
+    small = _gray_thumbnail(frame, cols * 8, rows * 8)
+    edges = small.filter(ImageFilter.FIND_EDGES).resize((cols, rows), Image.Resampling.BOX)
+    value = 0
+    for level in edges.tobytes():
+        value = (value << 1) | (level > 4)
+    return value
 
-def configure_genai():
-    """Configures the Gemini API."""
-    global available_models, API_KEY, model
-    
-    # Reload API key from config in case it was updated
-    API_KEY = app_config.get("api_key", "") or os.environ.get("GEMINI_API_KEY", "")
-    
-    if not API_KEY or API_KEY == "YOUR_GEMINI_API_KEY_HERE":
-        logger.warning("No API key configured. Please set it in Settings (Ctrl+Alt+P).")
-        return None
-    
+def _answer_cache_entry_size(entry):
+    """Approximate on-disk size of a cache entry in bytes."""
+    return len(entry["answer"].encode('utf-8')) + len(entry["model"]) + 300
+
+def load_answer_cache():
+    """Load the answer cache from file."""
+    global answer_cache
     try:
-        genai.configure(api_key=API_KEY)
-        
-        # Fetch available models in background
-        threading.Thread(target=fetch_available_models, daemon=True).start()
-        
-        # Use saved model or default
-        selected_model = app_config.get("model", "models/gemini-3-flash-preview")
-        model = genai.GenerativeModel(selected_model)
-        return model
+        if os.path.exists(ANSWER_CACHE_PATH):
+            with open(ANSWER_CACHE_PATH, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with answer_cache_lock:
+                answer_cache = OrderedDict(
+                    (entry["key"], {**entry, "hash": int(entry["hash"], 16)})
+                    for entry in data.get("entries", [])
+                )
+                answer_cache_stats["hits"] = data.get("hits", 0)
+                answer_cache_stats["misses"] = data.get("misses", 0)
     except Exception as e:
-        logger.error(f"Failed to configure API: {e}")
-        return None
+        logger.warning(f"Could not load answer cache: {e}")
+        answer_cache = OrderedDict()
+
+def schedule_cache_save(save):
+    """Run save() on a background timer, coalescing calls made while one is pending."""
+    with cache_save_lock:
+        if save in cache_save_timers:
+            return
+        timer = threading.Timer(CACHE_SAVE_DELAY_S, run_scheduled_save, args=(save,))
+        timer.daemon = True
+        cache_save_timers[save] = timer
+        timer.start()
 
+def run_scheduled_save(save):
+    """Timer callback: run a scheduled cache save."""
+    with cache_save_lock:
+        cache_save_timers.pop(save, None)
+    with cache_write_lock:
+        save()
 
-def fetch_available_models():
-    """Fetch available models from the API."""
-    global available_models
+def flush_cache_saves():
+    """Run any pending cache saves now (at exit)."""
+    with cache_save_lock:
+        pending = list(cache_save_timers.items())
+        cache_save_timers.clear()
+    for save, timer in pending:
+        timer.cancel()
+        with cache_write_lock:
+            save()
+
+def save_answer_cache():
+    """Save the answer cache to file (least recently used first)."""
     try:
-        models_list = genai.list_models()
-        # Filter for models that support generateContent
-        available_models = []
-        for m in models_list:
-            try:
-                # Check if model supports generateContent
-                if hasattr(m, 'supported_generation_methods'):
-                    methods = [method.name if hasattr(method, 'name') else str(method) 
-                              for method in m.supported_generation_methods]
-                    if 'generateContent' in methods:
-                        model_name = m.name if hasattr(m, 'name') else str(m)
-                        available_models.append(model_name)
-            except Exception:
+        with answer_cache_lock:
+            data = {
+                "hits": answer_cache_stats["hits"],
+                "misses": answer_cache_stats["misses"],
+                "entries": [{**entry, "hash": f"{entry['hash']:x}"} for entry in answer_cache.values()]
+            }
+        with open(ANSWER_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Could not save answer cache: {e}")
+
+def lookup_cached_answer(image_hash, model_name, variant):
+    """Return a cached answer for a near-identical screen, or None."""
+    max_distance = int(app_config.get("answer_cache_distance", 2))
+    with answer_cache_lock:
+        best_key, best_distance = None, max_distance + 1
+        for key, entry in answer_cache.items():
+            if entry["model"] != model_name or entry["variant"] != variant:
                 continue
+            distance = (entry["hash"] ^ image_hash).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
         
-        # Sort with preferred models first
-        preferred_order = ['gemini-2', 'gemini-1.5', 'gemini-pro']
-        def sort_key(name):
-            for i, pref in enumerate(preferred_order):
+        if best_key is None:
+            answer_cache_stats["misses"] += 1
+            logger.info(f"Answer cache miss (hits={answer_cache_stats['hits']}, misses={answer_cache_stats['misses']})")
+            return None
+        
+        answer_cache.move_to_end(best_key)
+        answer_cache_stats["hits"] += 1
+        logger.info(
+            f"Answer cache hit at distance {best_distance} "
+            f"(hits={answer_cache_stats['hits']}, misses={answer_cache_stats['misses']})"
+        )
+        return answer_cache[best_key]["answer"]
+
+def store_cached_answer(image_hash, model_name, variant, answer_text):
+    """Store an answer in the cache, evicting least recently used entries over the size limit."""
+    max_bytes = int(app_config.get("answer_cache_max_bytes", 2000000))
+    key = f"{model_name}|{variant}|{image_hash:x}"
+    entry = {"key": key, "hash": image_hash, "model": model_name, "variant": variant, "answer": answer_text}
+    with answer_cache_lock:
+        answer_cache[key] = entry
+        answer_cache.move_to_end(key)
+        total_size = sum(_answer_cache_entry_size(e) for e in answer_cache.values())
+        while answer_cache and total_size > max_bytes:
+            _, evicted = answer_cache.popitem(last=False)
+            total_size -= _answer_cache_entry_size(evicted)
+    schedule_cache_save(save_answer_cache)
+
+def normalize_question_text(text):
+    """Normalize question text for matching: case, accents, punctuation and whitespace."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    # Keep operators, they tell "2+3" from "2-3"
+    return " ".join(re.findall(r"\w+|[+\-*/=<>^%]", text))
+
+def text_trigrams(text):
+    """Character trigrams of normalized text (robust to OCR slips and reflowed lines)."""
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def word_pairs(text):
+    """Adjacent word pairs of normalized text (keeps scattered common trigrams from matching)."""
+    words = text.split()
+    return set(zip(words, words[1:]))
+
+def question_cache_hit_rate():
+    """Share of question cache lookups answered from the cache."""
+    lookups = question_cache_stats["hits"] + question_cache_stats["misses"]
+    return question_cache_stats["hits"] / lookups if lookups else 0.0
+
+def _index_question(entry):
+    """Add a cache entry's trigrams to the index."""
+    grams = text_trigrams(entry["question"])
+    entry["grams"] = len(grams)
+    for gram in grams:
+        question_index.setdefault(gram, set()).add(entry["key"])
+
+def _unindex_question(entry):
+    """Remove a cache entry's trigrams from the index."""
+    for gram in text_trigrams(entry["question"]):
+        keys = question_index.get(gram)
+        if keys:
+            keys.discard(entry["key"])
+            if not keys:
+                del question_index[gram]
+
+def load_question_cache():
+    """Load the question cache from file and rebuild its trigram index."""
+    try:
+        if os.path.exists(QUESTION_CACHE_PATH):
+            with open(QUESTION_CACHE_PATH, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with question_cache_lock:
+                question_cache.clear()
+                question_index.clear()
+                # Older files keyed entries on the model's restated question or the whole screen's text
+                entries = data.get("entries", []) if data.get("version") == QUESTION_CACHE_VERSION else []
+                for entry in entries:
+                    question_cache[entry["key"]] = entry
+                    _index_question(entry)
+                question_cache_stats["hits"] = data.get("hits", 0)
+                question_cache_stats["misses"] = data.get("misses", 0)
+    except Exception as e:
+        logger.warning(f"Could not load question cache: {e}")
+        with question_cache_lock:
+            question_cache.clear()
+            question_index.clear()
+
+def save_question_cache():
+    """Save the question cache to file (least recently used first)."""
+    try:
+        with question_cache_lock:
+            data = {
+                "version": QUESTION_CACHE_VERSION,
+                "hits": question_cache_stats["hits"],
+                "misses": question_cache_stats["misses"],
+                "entries": [
+                    {k: v for k, v in entry.items() if k != "grams"} for entry in question_cache.values()
+                ]
+            }
+        with open(QUESTION_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Could not save question cache: {e}")
+
+def lookup_question_answer(question_text, model_name, variant):
+    """
+    Return (answer, similarity) for a cached question block (stem and options) that
+    matches question_text, or (None, best similarity). Blocks match when enough
+    trigrams and word pairs are shared in both directions, so extra or changed options
+    don't match, and they have the same numbers and negations ("not", "except"...).
+    """
+    started = time.perf_counter()
+    normalized = normalize_question_text(question_text)
+    grams = text_trigrams(normalized)
+    numbers = set(NUMBER_PATTERN.findall(normalized))
+    negations = NEGATION_WORDS.intersection(normalized.split())
+    pairs = word_pairs(normalized)
+    min_similarity = float(app_config.get("question_cache_similarity", 0.9))
+    with question_cache_lock:
+        shared = {}
+        for gram in grams:
+            for key in question_index.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+        
+        best_key, best_similarity, nearest = None, 0.0, 0.0
+        for key, count in shared.items():
+            entry = question_cache[key]
+            if entry["model"] != model_name or entry["variant"] != variant:
+                continue
+            similarity = count / max(entry["grams"], len(grams))
+            nearest = max(nearest, similarity)
+            if similarity < min_similarity or similarity <= best_similarity:
+                continue
+            if set(NUMBER_PATTERN.findall(entry["question"])) != numbers:
+                continue
+            if NEGATION_WORDS.intersection(entry["question"].split()) != negations:
+                continue
+            question_pairs = word_pairs(entry["question"])
+            if len(question_pairs & pairs) < QUESTION_MIN_WORD_PAIRS * max(len(question_pairs), len(pairs)):
+                continue
+            best_key, best_similarity = key, similarity
+        
+        lookup_ms = (time.perf_counter() - started) * 1000
+        if best_key is None:
+            question_cache_stats["misses"] += 1
+            logger.info(
+                f"Question cache miss (nearest {nearest:.2f}, {lookup_ms:.1f} ms, "
+                f"hit rate {question_cache_hit_rate():.0%} of {sum(question_cache_stats.values())})"
+            )
+            return None, nearest
+        
+        question_cache.move_to_end(best_key)
+        question_cache_stats["hits"] += 1
+        logger.info(
+            f"Question cache hit at similarity {best_similarity:.2f} ({lookup_ms:.1f} ms, "
+            f"hit rate {question_cache_hit_rate():.0%} of {sum(question_cache_stats.values())})"
+        )
+        return question_cache[best_key]["answer"], best_similarity
+
+def store_question_answer(question_text, model_name, variant, answer_text):
+    """Store an answer under its normalized question block, evicting least recently used entries over the limit."""
+    normalized = normalize_question_text(question_text)
+    if len(normalized) < QUESTION_MIN_CHARS:
+        return
+    max_entries = max(1, int(app_config.get("question_cache_max_entries", 500)))
+    key = f"{model_name}|{variant}|{normalized}"
+    with question_cache_lock:
+        if key in question_cache:
+            question_cache[key]["answer"] = answer_text
+            question_cache.move_to_end(key)
+        else:
+            entry = {"key": key, "model": model_name, "variant": variant, "question": normalized, "answer": answer_text}
+            question_cache[key] = entry
+            _index_question(entry)
+        while len(question_cache) > max_entries:
+            _, evicted = question_cache.popitem(last=False)
+            _unindex_question(evicted)
+    schedule_cache_save(save_question_cache)
+
+def start_trace(job):
+    """Start a latency trace for a capture job; stage times are ms since the hotkey press."""
+    job["trace"] = {
+        "id": f"{datetime.now():%Y%m%d-%H%M%S}-{job['generation']}",
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "t0": job["pressed_at"],
+        "stages": {"hotkey_received": 0.0},
+        "fields": {"status": "ok"},
+        "pending": {"worker", "popup"},
+        "written": False,
+    }
+
+def trace_mark(job, stage):
+    """Record the first time a capture job reaches a pipeline stage."""
+    trace = job.get("trace")
+    if trace:
+        trace["stages"].setdefault(stage, round((time.perf_counter() - trace["t0"]) * 1000, 1))
+
+def trace_set(job, **fields):
+    """Attach fields (image size, model, cache status...) to a capture job's trace."""
+    trace = job.get("trace")
+    if trace:
+        trace["fields"].update(fields)
+
+def trace_complete(job, part):
+    """Mark the worker or popup side of a trace done; the record is written when both are."""
+    trace = job.get("trace")
+    if not trace:
+        return
+    with trace_lock:
+        trace["pending"].discard(part)
+        if trace["pending"] or trace["written"]:
+            return
+        trace["written"] = True
+    write_trace_record(trace)
+
+def finish_trace(job, status):
+    """Write a capture job's trace now (cancelled or failed before showing a popup)."""
+    trace = job.get("trace")
+    if not trace:
+        return
+    trace["fields"]["status"] = status
+    with trace_lock:
+        if trace["written"]:
+            return
+        trace["written"] = True
+    write_trace_record(trace)
+
+def write_trace_record(trace):
+    """Append one JSON line per capture to TRACE_PATH."""
+    stages = trace["stages"]
+    record = {
+        "id": trace["id"],
+        "timestamp": trace["timestamp"],
+        **trace["fields"],
+        "stages_ms": stages,
+        "total_ms": max(stages.values()),
+    }
+    try:
+        with trace_lock:
+            with open(TRACE_PATH, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except Exception as e:
+        logger.debug(f"Could not write trace record: {e}")
+    record_latency_sample(record)
+
+def record_latency_sample(record, seeding=False):
+    """Keep the request latencies of a successful capture for deadlines and hedging."""
+    if "race_latency" in record:
+        # Raced or hedged: each request's own latency under its real model, added by
+        # record_racer_latency as it finished (read back from the trace when seeding)
+        if seeding:
+            for model_name, first_ms, total_ms in record["race_latency"]:
+                add_latency_sample(model_name, record.get("stream"), first_ms, total_ms)
+        return
+    stages = record.get("stages_ms", {})
+    if record.get("status") != "ok" or "request_sent" not in stages or "last_byte" not in stages:
+        return
+    add_latency_sample(
+        record.get("model"), record.get("stream"),
+        stages.get("first_byte", stages["last_byte"]) - stages["request_sent"],
+        stages["last_byte"] - stages["request_sent"],
+    )
+
+def add_latency_sample(model_name, streaming, first_ms, total_ms):
+    """Add one request's first-byte and complete ms to its model's latency history."""
+    with latency_lock:
+        samples = latency_history.setdefault((model_name, bool(streaming)), deque(maxlen=LATENCY_HISTORY_SAMPLES))
+        samples.append((first_ms, total_ms))
+
+def load_latency_history():
+    """Seed the latency history from the end of the trace file."""
+    try:
+        if not os.path.exists(TRACE_PATH):
+            return
+        with open(TRACE_PATH, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            offset = max(0, f.tell() - LATENCY_HISTORY_SAMPLES * 1024)
+            f.seek(offset)
+            lines = f.read().decode('utf-8', 'replace').splitlines()
+        if offset:
+            lines = lines[1:]  # Partial line
+        for line in lines:
+            try:
+                record_latency_sample(json.loads(line), seeding=True)
+            except ValueError:
+                continue
+    except Exception as e:
+        logger.warning(f"Could not load latency history: {e}")
+
+def latency_percentile(model_name, streaming, pct, first_byte=False):
+    """Observed request latency percentile in ms (first byte or complete), or None without enough history."""
+    with latency_lock:
+        samples = list(latency_history.get((model_name, bool(streaming)), ()))
+    if len(samples) < LATENCY_MIN_SAMPLES:
+        return None
+    values = sorted(sample[0] if first_byte else sample[1] for sample in samples)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+# Request resilience: deadlines, retries and the circuit breaker
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"DeadlineExceeded", "ServiceUnavailable", "ResourceExhausted", "InternalServerError", "TooManyRequests", "GatewayTimeout"}
+REQUEST_MIN_TIMEOUT_S = 15  # Floor of the history-based deadline
+REQUEST_TIMEOUT_FACTOR = 3  # Deadline = this x observed p99 request time (capped by request_timeout_s)
+RETRY_MAX_DELAY_MS = 8000
+circuit_state = {"failures": 0, "opened_at": None}
+circuit_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling Gemini while the circuit breaker is open."""
+
+
+class RequestCancelled(Exception):
+    """Raised when a capture is superseded while its request is waiting to retry."""
+
+
+def is_retryable_error(error):
+    """True for timeouts, dropped connections, rate limits and server errors."""
+    if isinstance(error, (TimeoutError, ConnectionError, http.client.HTTPException)):
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+def request_deadline(model_name, streaming):
+    """Seconds a request may take: a multiple of the observed p99, capped by request_timeout_s."""
+    cap_s = float(app_config.get("request_timeout_s", 60))
+    p99_ms = latency_percentile(model_name, streaming, 99)
+    if p99_ms is None:
+        return cap_s
+    return min(cap_s, max(REQUEST_MIN_TIMEOUT_S, p99_ms / 1000 * REQUEST_TIMEOUT_FACTOR))
+
+def check_circuit():
+    """Fail fast while the breaker is open; after the cooldown one trial request goes through."""
+    threshold = int(app_config.get("circuit_breaker_failures", 5))
+    cooldown_s = float(app_config.get("circuit_breaker_cooldown_s", 30))
+    with circuit_lock:
+        if not threshold or circuit_state["failures"] < threshold:
+            return
+        remaining = cooldown_s - (time.perf_counter() - circuit_state["opened_at"])
+        if remaining > 0:
+            raise CircuitOpenError(
+                f"Gemini looks unavailable after {circuit_state['failures']} failed requests, "
+                f"trying again in {remaining:.0f} s"
+            )
+        # Half-open: let this request through, hold the rest for another cooldown
+        circuit_state["opened_at"] = time.perf_counter()
+
+def record_request_result(error=None):
+    """Update the circuit breaker with a request outcome (only retryable errors count as failures)."""
+    threshold = int(app_config.get("circuit_breaker_failures", 5))
+    with circuit_lock:
+        if error is None:
+            if circuit_state["failures"] >= threshold > 0:
+                logger.info("Circuit breaker closed - Gemini is answering again")
+            circuit_state["failures"] = 0
+            return
+        if not is_retryable_error(error):
+            return
+        circuit_state["failures"] += 1
+        if circuit_state["failures"] == threshold:
+            circuit_state["opened_at"] = time.perf_counter()
+            logger.warning(f"Circuit breaker open after {threshold} failed requests")
+
+def retry_delay(attempt):
+    """Jittered exponential backoff in seconds for the given retry (1-based)."""
+    base_ms = float(app_config.get("retry_base_ms", 500))
+    delay_ms = min(RETRY_MAX_DELAY_MS, base_ms * 2 ** (attempt - 1))
+    return random.uniform(delay_ms / 2, delay_ms) / 1000
+
+def generate_with_retries(job, client, contents, streaming, deadline, should_stop=None):
+    """
+    Yield the answer text chunk by chunk (a single chunk when not streaming).
+    Each attempt gets the time left until the deadline (a perf_counter value).
+    Retryable errors before the first chunk are retried with jittered exponential
+    backoff; once text has been shown the error is raised. should_stop() is
+    checked before each retry (RequestCancelled).
+    """
+    retries = int(app_config.get("request_retries", 2))
+    attempt = 0
+    while True:
+        check_circuit()
+        received = False
+        try:
+            request_options = {"timeout": max(1.0, deadline - time.perf_counter())}
+            if streaming:
+                for chunk in client.generate_content(contents, stream=True, request_options=request_options):
+                    try:
+                        chunk_text = chunk.text
+                    except ValueError:
+                        # Chunks without text parts (e.g. finish/safety metadata)
+                        continue
+                    if not chunk_text:
+                        continue
+                    if not received:
+                        received = True
+                        record_request_result()
+                    yield chunk_text
+                    if time.perf_counter() > deadline:
+                        raise TimeoutError("Gemini response exceeded the request deadline")
+            else:
+                answer = client.generate_content(contents, request_options=request_options).text
+                received = True
+                record_request_result()
+                yield answer
+            return
+        except Exception as e:
+            if not received:
+                # Mid-stream errors come after the request already counted as a success
+                record_request_result(e)
+            attempt += 1
+            if received or attempt > retries or not is_retryable_error(e):
+                raise
+            delay = retry_delay(attempt)
+            if time.perf_counter() + delay >= deadline:
+                raise
+            logger.warning(f"Gemini request failed ({e}), retry {attempt}/{retries} in {delay * 1000:.0f} ms")
+            job["retries"] = job.get("retries", 0) + 1
+            trace_set(job, retries=job["retries"])
+            time.sleep(delay)
+            if should_stop and should_stop():
+                raise RequestCancelled()
+
+# Lightweight Gemini REST client (api_transport "rest"): calls generateContent
+# directly over pooled keep-alive connections, without importing the SDK
+REST_BASE_URL = "https://generativelanguage.googleapis.com"
+REST_API_VERSION = "v1beta"
+REST_TIMEOUT_S = 60  # Connect/read timeout per request
+REST_IDLE_TIMEOUT_S = 240  # Idle connections older than this are assumed closed by the server
+REST_MAX_IDLE = 4  # Idle connections kept per host
+rest_pools = {}  # base URL -> RestConnectionPool
+rest_pools_lock = threading.Lock()
+
+
+class RestApiError(Exception):
+    """Error response from the Gemini REST API; code is the HTTP status like the SDK's exceptions."""
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class RestResponse:
+    """A generateContent response (or streamed chunk) with the SDK's .text accessor."""
+    def __init__(self, data):
+        self.data = data
+
+    @property
+    def text(self):
+        candidates = self.data.get("candidates") or [{}]
+        parts = candidates[0].get("content", {}).get("parts", [])
+        texts = [part["text"] for part in parts if "text" in part]
+        if not texts:
+            raise ValueError(f"Response has no text (finish reason: {candidates[0].get('finishReason', 'unknown')})")
+        return "".join(texts)
+
+
+class RestConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, reused across requests."""
+    def __init__(self, base_url):
+        parts = urllib.parse.urlsplit(base_url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.idle = []  # (connection, last used), most recent last
+        self.lock = threading.Lock()
+
+    def _connect(self, timeout=REST_TIMEOUT_S):
+        """Open a new connection (TCP and TLS handshake), each step bounded by timeout."""
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        connection = connection_class(self.host, self.port, timeout=timeout)
+        connection.connect()
+        return connection
+
+    def _take_idle(self):
+        """Return the most recently used idle connection that is still fresh, or None."""
+        now = time.monotonic()
+        with self.lock:
+            while self.idle:
+                connection, last_used = self.idle.pop()
+                if now - last_used < REST_IDLE_TIMEOUT_S:
+                    return connection
+                connection.close()
+        return None
+
+    def release(self, connection, response):
+        """Return a connection whose response was fully read to the pool."""
+        if response.will_close:
+            connection.close()
+            return
+        with self.lock:
+            if len(self.idle) < REST_MAX_IDLE:
+                self.idle.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def warm(self):
+        """Open a connection ahead of the next request so it skips the TLS setup."""
+        with self.lock:
+            now = time.monotonic()
+            if any(now - last_used < REST_IDLE_TIMEOUT_S for _, last_used in self.idle):
+                return
+        try:
+            started = time.perf_counter()
+            connection = self._connect()
+            with self.lock:
+                self.idle.append((connection, time.monotonic()))
+            logger.debug(f"Connection to {self.host} warmed in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            logger.debug(f"Could not warm connection to {self.host}: {e}")
+
+    def request(self, method, path, body=None, headers=None, timeout=REST_TIMEOUT_S):
+        """
+        Send a request and return (connection, response) with the status checked.
+        timeout bounds each socket operation. A reused connection the server
+        already closed is retried once on a new one.
+        """
+        while True:
+            connection = self._take_idle()
+            reused = connection is not None
+            try:
+                if not reused:
+                    connection = self._connect(timeout)
+                connection.sock.settimeout(timeout)
+                connection.request(method, self.prefix + path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if not reused:
+                    raise
+                logger.debug(f"Stale keep-alive connection to {self.host}, reconnecting")
+            except Exception:
+                if connection is not None:
+                    connection.close()
+                raise
+        
+        if response.status >= 400:
+            payload = response.read()
+            self.release(connection, response)
+            try:
+                message = json.loads(payload)["error"]["message"]
+            except Exception:
+                message = payload[:200].decode("utf-8", "replace") or response.reason
+            raise RestApiError(response.status, message)
+        return connection, response
+
+
+def get_rest_pool(base_url):
+    """Shared connection pool for a base URL (kept when the model changes)."""
+    with rest_pools_lock:
+        if base_url not in rest_pools:
+            rest_pools[base_url] = RestConnectionPool(base_url)
+        return rest_pools[base_url]
+
+
+def build_rest_request(contents):
+    """Convert generate_content contents (prompt strings, inline blobs, PIL images) to a REST request body."""
+    parts = []
+    for item in contents:
+        if isinstance(item, str):
+            parts.append({"text": item})
+            continue
+        if isinstance(item, Image.Image):
+            item = {"mime_type": "image/png", "data": _encode_image(item, "PNG", 0)}
+        parts.append({"inline_data": {
+            "mime_type": item["mime_type"],
+            "data": base64.b64encode(item["data"]).decode("ascii"),
+        }})
+    return {"contents": [{"role": "user", "parts": parts}]}
+
+
+class RestGenerativeModel:
+    """
+    Drop-in for genai.GenerativeModel's generate_content (plain and streamed)
+    over the REST API, so the SDK and its grpc/protobuf stack are never imported.
+    """
+    def __init__(self, model_name, api_key, base_url=REST_BASE_URL):
+        self.model_name = model_name if "/" in model_name else f"models/{model_name}"
+        self.api_key = api_key
+        self.pool = get_rest_pool(base_url)
+
+    def warm(self):
+        """Pre-open a pooled connection (blocking; run it off the hot path)."""
+        self.pool.warm()
+
+    def generate_content(self, contents, stream=False, request_options=None):
+        body = json.dumps(build_rest_request(contents)).encode("utf-8")
+        headers = {"Content-Type": "application/json", "x-goog-api-key": self.api_key}
+        timeout = (request_options or {}).get("timeout", REST_TIMEOUT_S)
+        if not stream:
+            connection, response = self.pool.request(
+                "POST", f"/{REST_API_VERSION}/{self.model_name}:generateContent", body, headers, timeout)
+            payload = response.read()
+            self.pool.release(connection, response)
+            return RestResponse(json.loads(payload))
+        # Errors surface here, before the first chunk is requested, like the SDK
+        connection, response = self.pool.request(
+            "POST", f"/{REST_API_VERSION}/{self.model_name}:streamGenerateContent?alt=sse", body, headers, timeout)
+        return self._iter_stream(connection, response)
+
+    def _iter_stream(self, connection, response):
+        """Yield one RestResponse per server-sent event."""
+        complete = False
+        try:
+            event = []
+            while True:
+                line = response.readline()
+                if not line:
+                    complete = True
+                    break
+                line = line.strip()
+                if line.startswith(b"data:"):
+                    event.append(line[5:].strip())
+                elif not line and event:
+                    yield RestResponse(json.loads(b"".join(event)))
+                    event = []
+            if event:
+                yield RestResponse(json.loads(b"".join(event)))
+        finally:
+            # A stream abandoned half way (cancelled capture) cannot be reused
+            if complete:
+                self.pool.release(connection, response)
+            else:
+                connection.close()
+
+
+def rest_list_models(api_key, base_url=REST_BASE_URL):
+    """List models over REST, shaped like genai.list_models() entries (name, supported_generation_methods)."""
+    pool = get_rest_pool(base_url)
+    models_list = []
+    page_token = ""
+    while True:
+        query = urllib.parse.urlencode({"pageSize": 1000, **({"pageToken": page_token} if page_token else {})})
+        connection, response = pool.request(
+            "GET", f"/{REST_API_VERSION}/models?{query}", headers={"x-goog-api-key": api_key})
+        payload = json.loads(response.read())
+        pool.release(connection, response)
+        for entry in payload.get("models", []):
+            models_list.append(SimpleNamespace(
+                name=entry.get("name", ""),
+                supported_generation_methods=entry.get("supportedGenerationMethods", []),
+            ))
+        page_token = payload.get("nextPageToken")
+        if not page_token:
+            return models_list
+
+
+def create_model(model_name):
+    """Create the Gemini client for the configured api_transport ("sdk" or "rest")."""
+    if app_config.get("api_transport", "sdk") == "rest":
+        return RestGenerativeModel(model_name, API_KEY, app_config.get("api_base_url", REST_BASE_URL))
+    return load_genai().GenerativeModel(model_name)
+
+
+def warm_model_connection():
+    """Warm the REST client's connection in the background (no-op for the SDK client)."""
+    warm = getattr(model, "warm", None)
+    if warm:
+        threading.Thread(target=warm, name="connection-warmup", daemon=True).start()
+
+# Load saved configuration
+app_config = load_config()
+MAX_HISTORY_ITEMS = app_config.get("max_history", MAX_HISTORY_ITEMS)
+
+# Load API key from config or environment
+API_KEY = app_config.get("api_key", "") or os.environ.get("GEMINI_API_KEY", "")
+
+# Answer history and the answer cache are loaded by the warm-up thread (see warm_up)
+
+def configure_genai():
+    """Configures the Gemini API."""
+    global available_models, API_KEY, model
+    
+    # Reload API key from config in case it was updated
+    API_KEY = app_config.get("api_key", "") or os.environ.get("GEMINI_API_KEY", "")
+    
+    if not API_KEY or API_KEY == "YOUR_GEMINI_API_KEY_HERE":
+        logger.warning("No API key configured. Please set it in Settings (Ctrl+Alt+P).")
+        return None
+    
+    try:
+        if app_config.get("api_transport", "sdk") != "rest":
+            load_genai().configure(api_key=API_KEY)
+        
+        # Refresh the model list in the background if the cached one is stale or for another key
+        refresh_available_models()
+        
+        # Use saved model or default
+        selected_model = app_config.get("model", "models/gemini-3-flash-preview")
+        model = create_model(selected_model)
+        return model
+    except Exception as e:
+        logger.error(f"Failed to configure API: {e}")
+        return None
+
+
+def api_key_fingerprint(api_key):
+    """Short one-way fingerprint of an API key, so the model cache can tell keys apart without storing them."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def load_models_cache():
+    """Load the cached model list so the settings dropdown never waits on the network."""
+    global available_models, models_cache_meta
+    try:
+        if os.path.exists(MODELS_CACHE_PATH):
+            with open(MODELS_CACHE_PATH, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            available_models = data.get("models", [])
+            models_cache_meta = {"fetched_at": data.get("fetched_at", 0), "key": data.get("key", "")}
+    except Exception as e:
+        logger.warning(f"Could not load model cache: {e}")
+
+
+def save_models_cache():
+    """Save the model list with its fetch time and API key fingerprint."""
+    global models_cache_meta
+    models_cache_meta = {"fetched_at": time.time(), "key": api_key_fingerprint(API_KEY)}
+    try:
+        with open(MODELS_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({**models_cache_meta, "models": available_models}, f, indent=2)
+    except Exception as e:
+        logger.error(f"Could not save model cache: {e}")
+
+
+def models_cache_fresh():
+    """True if the cached model list is younger than the TTL and was fetched with the current key."""
+    ttl_s = float(app_config.get("models_cache_ttl_hours", 24)) * 3600
+    return bool(
+        available_models
+        and models_cache_meta.get("key") == api_key_fingerprint(API_KEY)
+        and time.time() - models_cache_meta.get("fetched_at", 0) < ttl_s
+    )
+
+
+def refresh_available_models(force=False, on_done=None):
+    """
+    Refresh the model list in a background thread unless the cache is fresh
+    (force skips that check). on_done runs on the Tk thread once the refresh
+    finishes. Returns True if a refresh is running.
+    """
+    global models_refresh_callbacks
+    if not force and models_cache_fresh():
+        return False
+    with models_refresh_lock:
+        if models_refresh_callbacks is not None:
+            # Join the refresh already in flight
+            if on_done:
+                models_refresh_callbacks.append(on_done)
+            return True
+        models_refresh_callbacks = [on_done] if on_done else []
+    threading.Thread(target=refresh_models_worker, daemon=True).start()
+    return True
+
+
+def refresh_models_worker():
+    """Fetch the model list, cache it, and notify whoever is waiting."""
+    global models_refresh_callbacks
+    started = time.perf_counter()
+    if fetch_available_models():
+        save_models_cache()
+        logger.info(f"Model list refreshed: {len(available_models)} models in {(time.perf_counter() - started) * 1000:.0f} ms")
+    with models_refresh_lock:
+        callbacks, models_refresh_callbacks = models_refresh_callbacks, None
+    for callback in callbacks:
+        root.after(0, callback)
+
+
+def fetch_available_models():
+    """Fetch available models from the API. Returns True on success."""
+    global available_models
+    try:
+        if app_config.get("api_transport", "sdk") == "rest":
+            models_list = rest_list_models(API_KEY, app_config.get("api_base_url", REST_BASE_URL))
+        else:
+            models_list = load_genai().list_models()
+        # Filter for models that support generateContent
+        fetched = []
+        for m in models_list:
+            try:
+                # Check if model supports generateContent
+                if hasattr(m, 'supported_generation_methods'):
+                    methods = [method.name if hasattr(method, 'name') else str(method) 
+                              for method in m.supported_generation_methods]
+                    if 'generateContent' in methods:
+                        model_name = m.name if hasattr(m, 'name') else str(m)
+                        fetched.append(model_name)
+            except Exception:
+                continue
+        
+        # Sort with preferred models first
+        preferred_order = ['gemini-2', 'gemini-1.5', 'gemini-pro']
+        def sort_key(name):
+            for i, pref in enumerate(preferred_order):
                 if pref in name:
                     return (i, name)
             return (len(preferred_order), name)
-        available_models.sort(key=sort_key)
+        fetched.sort(key=sort_key)
+        available_models = fetched
+        return True
     except Exception as e:
         logger.warning(f"Could not fetch models: {e}")
-        # Fallback models
-        available_models = [
-            "models/gemini-2.5-flash",
-            "models/gemini-2.5-pro-preview-05-06",
-            "models/gemini-1.5-flash",
-            "models/gemini-1.5-pro",
-            "models/gemini-pro",
-            "models/gemini-pro-vision"
-        ]
+        if not available_models:
+            # Fallback models (a stale cached list is kept instead)
+            available_models = [
+                "models/gemini-2.5-flash",
+                "models/gemini-2.5-pro-preview-05-06",
+                "models/gemini-1.5-flash",
+                "models/gemini-1.5-pro",
+                "models/gemini-pro",
+                "models/gemini-pro-vision"
+            ]
+        return False
 
 
 def reload_model():
@@ -600,27 +2585,59 @@ def reload_model():
     global model
     selected_model = app_config.get("model", "models/gemini-3-flash-preview")
     try:
-        model = genai.GenerativeModel(selected_model)
+        model = create_model(selected_model)
         logger.info(f"Model changed to: {selected_model}")
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
 
-def show_loading_indicator():
-    """Shows a small blinking logo at the bottom left while Gemini is processing."""
-    global loading_indicator, logo_image, app_config
-    
-    # Close existing indicator if any
-    if loading_indicator and loading_indicator.winfo_exists():
-        loading_indicator.destroy()
+def get_image_asset(path, size, background=None):
+    """
+    Get a decoded, resized PIL image, decoding and resizing each (path, size,
+    background) only once. background flattens transparency onto a color, e.g.
+    a theme's card color. Returns None if the image can't be loaded.
+    """
+    key = (path, size, background)
+    with asset_lock:
+        if key in image_assets:
+            return image_assets[key]
+    try:
+        image = Image.open(path)
+        image = image.convert("RGBA").resize((size, size), Image.Resampling.LANCZOS)
+        if background:
+            flattened = Image.new("RGBA", image.size, background)
+            flattened.alpha_composite(image)
+            image = flattened.convert("RGB")
+    except Exception as e:
+        logger.debug(f"Could not load image {path}: {e}")
+        image = None
+    with asset_lock:
+        image_assets[key] = image
+    return image
+
+def get_photo_asset(path, size, background=None):
+    """Get a cached Tk PhotoImage for an image asset (Tk thread only). Returns None if unavailable."""
+    key = (path, size, background)
+    if key not in photo_assets:
+        image = get_image_asset(path, size, background)
+        if image is None:
+            photo_assets[key] = None
+        else:
+            ImageTk = timed_import("PIL.ImageTk")
+            photo_assets[key] = ImageTk.PhotoImage(image)
+    return photo_assets[key]
+
+def build_loading_indicator():
+    """Build the loading indicator once, withdrawn; show/hide_loading_indicator() reuse it."""
+    global loading_indicator
     
-    # Create loading indicator window
-    loading_indicator = tk.Toplevel()
-    loading_indicator.title("")
-    loading_indicator.overrideredirect(True)
+    # Create loading indicator window (hidden until shown)
+    window = tk.Toplevel()
+    window.withdraw()
+    window.title("")
+    window.overrideredirect(True)
     
     # Get screen dimensions for bottom-left positioning
-    screen_width = loading_indicator.winfo_screenwidth()
-    screen_height = loading_indicator.winfo_screenheight()
+    screen_height = window.winfo_screenheight()
     
     # Small size - 48x48 logo
     indicator_size = 48
@@ -628,119 +2645,178 @@ def show_loading_indicator():
     x_pos = padding
     y_pos = screen_height - indicator_size - padding - 40  # 40px above taskbar
     
-    loading_indicator.geometry(f"{indicator_size}x{indicator_size}+{x_pos}+{y_pos}")
+    window.geometry(f"{indicator_size}x{indicator_size}+{x_pos}+{y_pos}")
     
     # Make it always on top
-    loading_indicator.attributes('-topmost', True)
-    loading_indicator.attributes('-alpha', 0.95)
+    window.attributes('-topmost', True)
+    window.attributes('-alpha', 0.95)
     
     # Apply stealth mode based on settings
     stealth_enabled = app_config.get("stealth_mode", True)
     
     # Make window undetectable (tool window style) - cross-platform with stealth
-    apply_window_style(loading_indicator, 'popup', stealth=stealth_enabled)
+    apply_window_style(window, 'popup', stealth=stealth_enabled)
     
     # Transparent background - cross-platform
-    apply_transparency(loading_indicator, '#000000')
+    apply_transparency(window, '#000000')
     
-    # Load and resize logo
-    try:
-        img = Image.open(LOGO_PATH)
-        img = img.resize((indicator_size, indicator_size), Image.Resampling.LANCZOS)
-        logo_image = ImageTk.PhotoImage(img)
-        
-        logo_label = tk.Label(loading_indicator, image=logo_image, bg='#000000', borderwidth=0)
-        logo_label.pack()
-        
-        # Blinking animation
-        blink_state = [True]
-        def blink():
-            if not loading_indicator or not loading_indicator.winfo_exists():
-                return
-            if blink_state[0]:
-                loading_indicator.attributes('-alpha', 0.3)
-            else:
-                loading_indicator.attributes('-alpha', 0.95)
-            blink_state[0] = not blink_state[0]
-            loading_indicator.after(400, blink)
-        
-        # Start blinking
-        loading_indicator.after(100, blink)
-        
-    except Exception as e:
-        # Fallback to text if logo not found
-        logger.debug(f"Could not load logo: {e}")
-        fallback_label = tk.Label(
-            loading_indicator,
+    # Logo from the asset cache, or a text fallback if it can't be loaded
+    logo_photo = get_photo_asset(LOGO_PATH, indicator_size)
+    if logo_photo is not None:
+        label = tk.Label(window, image=logo_photo, bg='#000000', borderwidth=0)
+        label.pack()
+    else:
+        label = tk.Label(
+            window,
             text="⚡",
             font=(get_system_font(), 24),
             bg='#1a1a1a',
             fg='#fbbf24'
         )
-        fallback_label.pack(expand=True, fill=tk.BOTH)
-        
-        # Blinking for fallback
-        blink_state = [True]
-        def blink():
-            if not loading_indicator or not loading_indicator.winfo_exists():
-                return
-            if blink_state[0]:
-                fallback_label.config(fg='#fbbf24')
-            else:
-                fallback_label.config(fg='#78350f')
-            blink_state[0] = not blink_state[0]
-            loading_indicator.after(400, blink)
-        
-        loading_indicator.after(100, blink)
+        label.pack(expand=True, fill=tk.BOTH)
+    
+    window._uses_logo = logo_photo is not None
+    window._label = label
+    window._stealth = stealth_enabled
+    window._open = False
+    window._blink_on = True
+    window._blink_job = None
+    window._fade_job = None
+    
+    loading_indicator = window
+    return window
 
-def hide_loading_indicator():
-    """Hides and destroys the loading indicator."""
-    global loading_indicator
-    
+def blink_loading_indicator():
+    """Blink the loading indicator while it is shown."""
+    window = loading_indicator
+    if not window or not window.winfo_exists() or not window._open:
+        return
+    if window._uses_logo:
+        window.attributes('-alpha', 0.3 if window._blink_on else 0.95)
+    else:
+        window._label.config(fg='#fbbf24' if window._blink_on else '#78350f')
+    window._blink_on = not window._blink_on
+    window._blink_job = window.after(400, blink_loading_indicator)
+
+def prepare_loading_indicator():
+    """Make sure the reusable loading indicator exists."""
     if loading_indicator and loading_indicator.winfo_exists():
-        # Fade out animation
-        def fade_out(alpha=0.95):
-            if not loading_indicator or not loading_indicator.winfo_exists():
-                return
-            if alpha > 0:
-                alpha -= 0.15
-                loading_indicator.attributes('-alpha', max(0, alpha))
-                loading_indicator.after(20, lambda: fade_out(alpha))
-            else:
-                loading_indicator.destroy()
-        
-        fade_out()
+        if loading_indicator._stealth == app_config.get("stealth_mode", True):
+            return loading_indicator
+        # Stealth setting changed - window styles are applied at build time
+        loading_indicator.destroy()
+    return build_loading_indicator()
+
+def show_loading_indicator():
+    """Shows a small blinking logo at the bottom left while Gemini is processing."""
+    window = prepare_loading_indicator()
+    
+    # Cancel a hide that is still fading out
+    if window._fade_job:
+        window.after_cancel(window._fade_job)
+        window._fade_job = None
+    window.attributes('-alpha', 0.95)
+    window.deiconify()
+    window.lift()
+    
+    if not window._open:
+        window._open = True
+        window._blink_on = True
+        window._blink_job = window.after(100, blink_loading_indicator)
 
-def show_answer_popup(answer_text):
-    """Creates a clean, professional popup window matching the reference design."""
-    global popup_window, app_config
+def hide_loading_indicator(alpha=0.95):
+    """Fades out and withdraws the loading indicator (kept for reuse)."""
+    window = loading_indicator
+    if not window or not window.winfo_exists() or not window._open:
+        return
     
-    # Close existing popup if any
-    if popup_window and popup_window.winfo_exists():
-        popup_window.destroy()
+    # Fade out animation
+    if alpha > 0:
+        alpha -= 0.15
+        window.attributes('-alpha', max(0, alpha))
+        window._fade_job = window.after(20, lambda: hide_loading_indicator(alpha))
+    else:
+        window._fade_job = None
+        window.withdraw()
+        window._open = False
+        if window._blink_job:
+            window.after_cancel(window._blink_job)
+            window._blink_job = None
+
+def draw_rounded_card(canvas, width, height, fill, radius=16):
+    """Draw a rounded-rectangle card background on a canvas (items tagged 'card')."""
+    x1, y1, x2, y2 = 0, 0, width, height
+    canvas.create_arc(x1, y1, x1+radius*2, y1+radius*2, start=90, extent=90, fill=fill, outline=fill, tags='card')
+    canvas.create_arc(x2-radius*2, y1, x2, y1+radius*2, start=0, extent=90, fill=fill, outline=fill, tags='card')
+    canvas.create_arc(x1, y2-radius*2, x1+radius*2, y2, start=180, extent=90, fill=fill, outline=fill, tags='card')
+    canvas.create_arc(x2-radius*2, y2-radius*2, x2, y2, start=270, extent=90, fill=fill, outline=fill, tags='card')
+    canvas.create_rectangle(x1+radius, y1, x2-radius, y2, fill=fill, outline=fill, tags='card')
+    canvas.create_rectangle(x1, y1+radius, x2, y2-radius, fill=fill, outline=fill, tags='card')
+
+def apply_popup_theme(window, theme_name):
+    """Recolor a reusable popup's registered widgets in place (no rebuild)."""
+    theme = THEMES[theme_name]
+    card_bg = theme['card_bg']
+    text_color = theme['text_color']
+    secondary_text = theme['secondary_text']
+    border_color = theme['border_color']
+    light_gray = theme['light_gray']
+    
+    for widget_info in window._themed_widgets:
+        widget = widget_info['widget']
+        widget_type = widget_info['type']
+        
+        if widget_type == 'main_canvas':
+            widget.itemconfig('card', fill=card_bg, outline=card_bg)
+        elif widget_type == 'bg_only':
+            widget.config(bg=card_bg)
+        elif widget_type == 'text':
+            widget.config(bg=card_bg, fg=text_color)
+        elif widget_type == 'secondary':
+            widget.config(bg=card_bg, fg=secondary_text)
+        elif widget_type == 'border':
+            widget.config(bg=border_color)
+        elif widget_type == 'light':
+            widget.config(bg=light_gray)
+        elif widget_type == 'text_area':
+            widget.config(bg=light_gray, fg=text_color, insertbackground=text_color)
+        elif widget_type == 'button_accent':
+            widget.config(bg=theme['accent_color'])
+        elif widget_type == 'button_secondary':
+            widget.config(bg=card_bg, fg=text_color, activebackground=light_gray, activeforeground=text_color)
+        elif widget_type == 'close_btn':
+            widget.config(bg=card_bg, fg=theme['close_btn_fg'])
+        elif widget_type == 'canvas':
+            widget.config(bg=card_bg)
+    window._theme = theme_name
+
+def build_answer_popup():
+    """
+    Build the answer popup once, withdrawn. show_answer_popup() reuses it by
+    swapping text and colors, so nothing is rebuilt once an answer arrives.
+    """
+    global popup_window
     
-    # Get saved position and theme
-    popup_x = app_config.get("popup_x", 200)
-    popup_y = app_config.get("popup_y", 80)
     current_theme = app_config.get("theme", "light")
     theme = THEMES[current_theme]
     stealth_enabled = app_config.get("stealth_mode", True)
     
-    # Create new popup window
-    popup_window = tk.Toplevel()
-    popup_window.title("")
-    popup_window.geometry(f"480x520+{popup_x}+{popup_y}")
-    popup_window.overrideredirect(True)
+    # Create the window hidden; it is only shown by show_answer_popup()
+    window = tk.Toplevel()
+    window.withdraw()
+    window.title("")
+    window.geometry(f"480x520+{app_config.get('popup_x', 200)}+{app_config.get('popup_y', 80)}")
+    window.overrideredirect(True)
     
     # Make it always on top
-    popup_window.attributes('-topmost', True)
-    popup_window.attributes('-alpha', 0.0)
+    window.attributes('-topmost', True)
+    window.attributes('-alpha', 0.98)
     
     # Prevent window from stealing focus
-    popup_window.focus_set = lambda: None
+    window.focus_set = lambda: None
     
     # Make window undetectable - cross-platform with stealth mode
-    apply_window_style(popup_window, 'popup', stealth=stealth_enabled)
+    apply_window_style(window, 'popup', stealth=stealth_enabled)
     
     # Get colors from current theme
     card_bg = theme['card_bg']
@@ -752,23 +2828,12 @@ def show_answer_popup(answer_text):
     light_gray = theme['light_gray']
     
     # Make window transparent for rounded corners - cross-platform
-    apply_transparency(popup_window, '#000000')
-    
-    # Main canvas for rounded corners
-    canvas = tk.Canvas(popup_window, width=480, height=520, bg='#000000', highlightthickness=0)
-    canvas.pack(fill=tk.BOTH, expand=True)
-    
-    # Draw rounded rectangle background
-    radius = 16
-    x1, y1, x2, y2 = 0, 0, 480, 520
+    apply_transparency(window, '#000000')
     
-    # Create rounded rectangle with shadow effect
-    canvas.create_arc(x1, y1, x1+radius*2, y1+radius*2, start=90, extent=90, fill=card_bg, outline=card_bg)
-    canvas.create_arc(x2-radius*2, y1, x2, y1+radius*2, start=0, extent=90, fill=card_bg, outline=card_bg)
-    canvas.create_arc(x1, y2-radius*2, x1+radius*2, y2, start=180, extent=90, fill=card_bg, outline=card_bg)
-    canvas.create_arc(x2-radius*2, y2-radius*2, x2, y2, start=270, extent=90, fill=card_bg, outline=card_bg)
-    canvas.create_rectangle(x1+radius, y1, x2-radius, y2, fill=card_bg, outline=card_bg)
-    canvas.create_rectangle(x1, y1+radius, x2, y2-radius, fill=card_bg, outline=card_bg)
+    # Main canvas for rounded corners
+    canvas = tk.Canvas(window, width=480, height=520, bg='#000000', highlightthickness=0)
+    canvas.pack(fill=tk.BOTH, expand=True)
+    draw_rounded_card(canvas, 480, 520, card_bg)
     
     # Main card frame on top of canvas
     main_card = tk.Frame(canvas, bg=card_bg)
@@ -789,9 +2854,9 @@ def show_answer_popup(answer_text):
         cursor='hand2'
     )
     close_btn.pack(side=tk.RIGHT, padx=16)
-    close_btn.bind('<Enter>', lambda e: close_btn.config(fg=theme['close_btn_hover']))
-    close_btn.bind('<Leave>', lambda e: close_btn.config(fg=theme['close_btn_fg']))
-    close_btn.bind('<Button-1>', lambda e: fade_out_window())
+    close_btn.bind('<Enter>', lambda e: close_btn.config(fg=THEMES[window._theme]['close_btn_hover']))
+    close_btn.bind('<Leave>', lambda e: close_btn.config(fg=THEMES[window._theme]['close_btn_fg']))
+    close_btn.bind('<Button-1>', lambda e: hide_answer_popup())
     
     # Separator
     sep1 = tk.Frame(main_card, bg=border_color, height=1)
@@ -863,13 +2928,6 @@ def show_answer_popup(answer_text):
     )
     text_area.pack(fill=tk.BOTH, expand=True)
     
-    # Insert formatted answer
-    text_area.insert(tk.END, answer_text)
-    text_area.config(state=tk.NORMAL)
-    
-    # Store answer text for theme refresh
-    popup_window._answer_text = answer_text
-    
     # Footer section
     footer_section = tk.Frame(main_card, bg=card_bg)
     footer_section.pack(fill=tk.X, padx=24, pady=(0, 20))
@@ -897,10 +2955,10 @@ def show_answer_popup(answer_text):
     
     # Copy button (primary - dark)
     def copy_to_clipboard():
-        popup_window.clipboard_clear()
-        popup_window.clipboard_append(answer_text)
+        window.clipboard_clear()
+        window.clipboard_append(window._answer_text)
         copy_btn.config(text="✓ Copied")
-        popup_window.after(2000, lambda: copy_btn.config(text="Copy"))
+        window.after(2000, lambda: copy_btn.config(text="Copy"))
     
     copy_btn = tk.Button(
         buttons_frame,
@@ -918,14 +2976,14 @@ def show_answer_popup(answer_text):
         activeforeground='white'
     )
     copy_btn.pack(side=tk.LEFT, padx=(0, 8))
-    copy_btn.bind('<Enter>', lambda e: copy_btn.config(bg=theme['btn_hover']))
-    copy_btn.bind('<Leave>', lambda e: copy_btn.config(bg=accent_color))
+    copy_btn.bind('<Enter>', lambda e: copy_btn.config(bg=THEMES[window._theme]['btn_hover']))
+    copy_btn.bind('<Leave>', lambda e: copy_btn.config(bg=THEMES[window._theme]['accent_color']))
     
     # Close button (secondary - outline style)
     close_main_btn = tk.Button(
         buttons_frame,
         text="Close",
-        command=lambda: fade_out_window(),
+        command=lambda: hide_answer_popup(),
         font=(get_system_font(), 10),
         bg=card_bg,
         fg=text_color,
@@ -938,8 +2996,34 @@ def show_answer_popup(answer_text):
         activeforeground=text_color
     )
     close_main_btn.pack(side=tk.LEFT)
-    close_main_btn.bind('<Enter>', lambda e: close_main_btn.config(bg=light_gray))
-    close_main_btn.bind('<Leave>', lambda e: close_main_btn.config(bg=card_bg))
+    close_main_btn.bind('<Enter>', lambda e: close_main_btn.config(bg=THEMES[window._theme]['light_gray']))
+    close_main_btn.bind('<Leave>', lambda e: close_main_btn.config(bg=THEMES[window._theme]['card_bg']))
+    
+    # Upgrade button (race mode) - packed only while a slower model's answer is on offer
+    def take_upgrade():
+        upgrade = window._upgrade
+        if upgrade:
+            answer_text, on_accept = upgrade
+            show_answer_popup(answer_text)
+            on_accept(answer_text)
+    
+    upgrade_btn = tk.Button(
+        buttons_frame,
+        text="Upgrade",
+        command=take_upgrade,
+        font=(get_system_font(), 10),
+        bg=card_bg,
+        fg=text_color,
+        relief=tk.SOLID,
+        padx=14,
+        pady=8,
+        cursor='hand2',
+        borderwidth=1,
+        activebackground=light_gray,
+        activeforeground=text_color
+    )
+    upgrade_btn.bind('<Enter>', lambda e: upgrade_btn.config(bg=THEMES[window._theme]['light_gray']))
+    upgrade_btn.bind('<Leave>', lambda e: upgrade_btn.config(bg=THEMES[window._theme]['card_bg']))
     
     # ESC hint
     hint_label = tk.Label(
@@ -951,57 +3035,18 @@ def show_answer_popup(answer_text):
     )
     hint_label.pack(side=tk.RIGHT)
     
-    # Animations
-    def fade_in(alpha=0.0):
-        if alpha < 0.98:
-            alpha += 0.1
-            popup_window.attributes('-alpha', alpha)
-            popup_window.after(15, lambda: fade_in(alpha))
-        else:
-            popup_window.attributes('-alpha', 0.98)
-    
-    def save_popup_position():
-        """Save current popup position to config."""
-        if popup_window and popup_window.winfo_exists():
-            app_config["popup_x"] = popup_window.winfo_x()
-            app_config["popup_y"] = popup_window.winfo_y()
-            save_config(app_config)
-    
-    def fade_out_window(alpha=0.98):
-        if not popup_window or not popup_window.winfo_exists():
-            return
-        if alpha > 0:
-            alpha -= 0.12
-            popup_window.attributes('-alpha', alpha)
-            popup_window.after(12, lambda: fade_out_window(alpha))
-        else:
-            save_popup_position()  # Save position before destroying
-            popup_window.destroy()
-    
-    # Status dot pulse
-    pulse_state = [True]
-    def pulse_status():
-        if not popup_window.winfo_exists():
-            return
-        if pulse_state[0]:
-            status_dot.itemconfig(1, fill=theme['pulse_color'])
-        else:
-            status_dot.itemconfig(1, fill=green_accent)
-        pulse_state[0] = not pulse_state[0]
-        popup_window.after(1000, pulse_status)
-    
     # Bind ESC
-    popup_window.bind('<Escape>', lambda e: fade_out_window())
+    window.bind('<Escape>', lambda e: hide_answer_popup())
     
     # Draggable window
     def start_move(event):
-        popup_window.x = event.x
-        popup_window.y = event.y
+        window.x = event.x
+        window.y = event.y
     
     def do_move(event):
-        x = popup_window.winfo_x() + (event.x - popup_window.x)
-        y = popup_window.winfo_y() + (event.y - popup_window.y)
-        popup_window.geometry(f"+{x}+{y}")
+        x = window.winfo_x() + (event.x - window.x)
+        y = window.winfo_y() + (event.y - window.y)
+        window.geometry(f"+{x}+{y}")
     
     def end_move(event):
         """Save position after drag ends."""
@@ -1012,102 +3057,1096 @@ def show_answer_popup(answer_text):
         widget.bind('<B1-Motion>', do_move)
         widget.bind('<ButtonRelease-1>', end_move)
     
-    # Start animations
-    popup_window.after(10, fade_in)
-    popup_window.after(500, pulse_status)
+    # Register widgets recolored by apply_popup_theme()
+    window._themed_widgets = [
+        {'widget': canvas, 'type': 'main_canvas'},
+        {'widget': main_card, 'type': 'bg_only'},
+        {'widget': top_bar, 'type': 'bg_only'},
+        {'widget': close_btn, 'type': 'close_btn'},
+        {'widget': sep1, 'type': 'border'},
+        {'widget': header_section, 'type': 'bg_only'},
+        {'widget': title_row, 'type': 'bg_only'},
+        {'widget': icon_label, 'type': 'text'},
+        {'widget': title_label, 'type': 'text'},
+        {'widget': subtitle_label, 'type': 'secondary'},
+        {'widget': content_section, 'type': 'bg_only'},
+        {'widget': answer_container, 'type': 'border'},
+        {'widget': answer_inner, 'type': 'light'},
+        {'widget': text_area, 'type': 'text_area'},
+        {'widget': footer_section, 'type': 'bg_only'},
+        {'widget': status_frame, 'type': 'bg_only'},
+        {'widget': status_dot, 'type': 'canvas'},
+        {'widget': status_text, 'type': 'secondary'},
+        {'widget': buttons_frame, 'type': 'bg_only'},
+        {'widget': copy_btn, 'type': 'button_accent'},
+        {'widget': close_main_btn, 'type': 'button_secondary'},
+        {'widget': upgrade_btn, 'type': 'button_secondary'},
+        {'widget': hint_label, 'type': 'bg_only'},
+    ]
+    
+    # Store widgets and state for reuse, streaming updates and theme refresh
+    window._theme = current_theme
+    window._stealth = stealth_enabled
+    window._answer_text = ""
+    window._streaming = False
+    window._open = False
+    window._pulse_job = None
+    window._fade_job = None
+    window._text_area = text_area
+    window._status_text = status_text
+    window._status_dot = status_dot
+    window._copy_btn = copy_btn
+    window._upgrade_btn = upgrade_btn
+    window._upgrade = None  # (answer, on_accept) offered by a slower race model
+    
+    popup_window = window
+    return window
+
+def prepare_answer_popup():
+    """Make sure the reusable answer popup exists (called while a request is in flight)."""
+    if popup_window and popup_window.winfo_exists():
+        if popup_window._stealth == app_config.get("stealth_mode", True):
+            return popup_window
+        # Stealth setting changed - window styles are applied at build time
+        popup_window.destroy()
+    return build_answer_popup()
+
+def save_popup_position():
+    """Save current popup position to config."""
+    if popup_window and popup_window.winfo_exists() and popup_window._open:
+        app_config["popup_x"] = popup_window.winfo_x()
+        app_config["popup_y"] = popup_window.winfo_y()
+        save_config(app_config)
+
+def pulse_status():
+    """Blink the answer popup's status dot while it is open."""
+    if not popup_window or not popup_window.winfo_exists() or not popup_window._open:
+        return
+    theme = THEMES[popup_window._theme]
+    popup_window._pulse_on = not getattr(popup_window, '_pulse_on', False)
+    popup_window._status_dot.itemconfig(1, fill=theme['pulse_color'] if popup_window._pulse_on else theme['green_accent'])
+    popup_window._pulse_job = popup_window.after(1000, pulse_status)
+
+def show_answer_popup(answer_text, streaming=False):
+    """
+    Shows the answer in the reusable popup, swapping in the text and theme.
+    streaming: if True, the answer is still arriving - chunks are added with
+    append_answer_text() and finish_answer_popup() marks it complete.
+    """
+    started = time.perf_counter()
+    hide_history_window(fade=False)
+    window = prepare_answer_popup()
+    
+    current_theme = app_config.get("theme", "light")
+    if window._theme != current_theme:
+        apply_popup_theme(window, current_theme)
     
+    # Swap in the new answer
+    text_area = window._text_area
+    text_area.delete('1.0', tk.END)
+    text_area.insert(tk.END, answer_text)
+    text_area.see('1.0')
+    window._answer_text = answer_text
+    window._streaming = streaming
+    window._status_text.config(text="Generating response..." if streaming else "Response generated successfully")
+    window._copy_btn.config(text="Copy")
+    window._upgrade = None
+    window._upgrade_btn.pack_forget()
+    
+    # Cancel a close that is still fading out
+    if window._fade_job:
+        window.after_cancel(window._fade_job)
+        window._fade_job = None
+    window.attributes('-alpha', 0.98)
+    
+    if not window._open:
+        window.geometry(f"+{app_config.get('popup_x', 200)}+{app_config.get('popup_y', 80)}")
+        window._open = True
+        if window._pulse_job:
+            window.after_cancel(window._pulse_job)
+        window._pulse_job = window.after(500, pulse_status)
+    if window.state() == 'withdrawn':
+        window.deiconify()
+    window.lift()
+    
+    logger.debug(f"Answer popup visible in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+def hide_answer_popup(alpha=0.98):
+    """Fade out and withdraw the answer popup (kept for reuse)."""
+    if not popup_window or not popup_window.winfo_exists() or not popup_window._open:
+        return
+    if alpha > 0:
+        alpha -= 0.12
+        popup_window.attributes('-alpha', max(alpha, 0))
+        popup_window._fade_job = popup_window.after(12, lambda: hide_answer_popup(alpha))
+    else:
+        popup_window._fade_job = None
+        save_popup_position()  # Save position before hiding
+        popup_window.withdraw()
+        popup_window._open = False
+        popup_window._streaming = False
+        if popup_window._pulse_job:
+            popup_window.after_cancel(popup_window._pulse_job)
+            popup_window._pulse_job = None
+
+def append_answer_text(chunk_text):
+    """Append a streamed chunk to the open answer popup."""
+    if not popup_window or not popup_window.winfo_exists():
+        return
+    text_area = getattr(popup_window, '_text_area', None)
+    if text_area is None or not popup_window._streaming:
+        return
+    # Follow the stream only if the user hasn't scrolled up
+    at_bottom = text_area.yview()[1] >= 0.999
+    text_area.insert(tk.END, chunk_text)
+    if at_bottom:
+        text_area.see(tk.END)
+    popup_window._answer_text += chunk_text
+
+def finish_answer_popup(answer_text):
+    """Mark a streamed answer popup as complete."""
+    if not popup_window or not popup_window.winfo_exists():
+        return
+    if not getattr(popup_window, '_streaming', False):
+        return
+    popup_window._streaming = False
+    popup_window._answer_text = answer_text
+    if not popup_window._upgrade:
+        popup_window._status_text.config(text="Response generated successfully")
+
+def offer_answer_upgrade(job, answer_text, model_name, on_accept):
+    """Offer a slower race model's answer in the popup while it still shows that capture."""
+    if not popup_window or not popup_window.winfo_exists() or not popup_window._open:
+        return
+    if capture_stats["pressed"] != job["seen_generation"]:
+        # The popup has moved on to a newer capture
+        return
+    popup_window._upgrade = (answer_text, on_accept)
+    popup_window._upgrade_btn.config(text=f"⬆ {model_name.replace('models/', '')}")
+    popup_window._upgrade_btn.pack(side=tk.LEFT, padx=(8, 0))
+    popup_window._status_text.config(text=f"A second answer from {model_name.replace('models/', '')} is ready")
+
+def post_ui_command(command, *args):
+    """Queue command(*args) to run on the Tk thread. Safe from any thread - it never touches Tk."""
+    ui_commands.put((time.perf_counter(), command, args))
+    ui_wake.set()
+
+
+def ui_command(command, *args):
+    """Handler that posts command to the UI queue (for hotkey and tray callbacks)."""
+    return lambda *_: post_ui_command(command, *args)
+
+
+def start_ui_waker():
+    """Bind the <<UICommand>> event to drain_ui_commands and start the thread that generates it."""
+    root.bind("<<UICommand>>", lambda event: drain_ui_commands())
+    threading.Thread(target=ui_waker_loop, name="ui-waker", daemon=True).start()
+
+
+def ui_waker_loop():
+    """
+    Wake the Tk mainloop whenever UI commands are posted. event_generate waits for the
+    Tk thread, so it runs here rather than on the hotkey or tray thread that posted.
+    """
+    while True:
+        ui_wake.wait()
+        ui_wake.clear()
+        try:
+            root.event_generate("<<UICommand>>", when="tail")
+        except Exception as e:
+            # The mainloop isn't running yet (or is shutting down)
+            logger.debug(f"Could not wake the Tk thread: {e}")
+            time.sleep(UI_WAKE_RETRY_S)
+            ui_wake.set()
+
+
+def drain_ui_commands():
+    """Run queued UI commands on the Tk thread and log their dispatch latency."""
+    while True:
+        try:
+            posted_at, command, args = ui_commands.get_nowait()
+        except queue.Empty:
+            break
+        started = time.perf_counter()
+        dispatch_ms = (started - posted_at) * 1000
+        name = getattr(command, "__name__", "command")
+        try:
+            command(*args)
+        except Exception as e:
+            logger.error(f"UI command {name} failed: {e}")
+        run_ms = (time.perf_counter() - started) * 1000
+        if dispatch_ms > UI_DISPATCH_WARN_MS:
+            logger.warning(f"UI command {name} waited {dispatch_ms:.0f} ms for the Tk thread (ran {run_ms:.0f} ms)")
+        else:
+            logger.debug(f"UI command {name}: dispatch {dispatch_ms:.1f} ms, ran {run_ms:.1f} ms")
+
+
+def show_history_entry(entry_id):
+    """Show a saved answer in the answer popup."""
+    show_answer_popup(get_history_answer(entry_id) or "")
+
+
 def analyze_screen():
-    """Captures screen, sends to Gemini, and displays answer in popup."""
-    global app_config, model
+    """Captures the full screen and answers it (hotkey and tray entry point)."""
+    queue_capture()
+
+
+def analyze_region():
+    """
+    Captures a user-selected region of the screen (hotkey and tray entry point).
+    Uses the remembered region directly when "remember_region" is enabled.
+    """
+    if not API_KEY:
+        logger.warning("No API key configured. Opening settings...")
+        root.after(0, show_settings_popup)
+        return
+    
+    last_region = app_config.get("last_region")
+    if app_config.get("remember_region", False) and last_region:
+        queue_capture(region=tuple(last_region))
+        return
+    
+    # Grab the screen before the overlay appears, then crop the selection from it
+    screenshot = capture_screenshot()
+    if screenshot is None:
+        logger.error("Failed to capture screenshot for region selection")
+        return
+    root.after(0, lambda: show_region_selector(screenshot))
+
+
+def forget_capture_region():
+    """Clear the remembered capture region."""
+    app_config["last_region"] = None
+    save_config(app_config)
+    logger.info("Saved capture region cleared")
+
+
+def request_grab(kind):
+    """Capture hotkey callback ("screen" or "region"): timestamp the press and wake the grab thread."""
+    pressed_at = time.perf_counter()
+    if not accept_capture_press(pressed_at):
+        return
+    grab_requests.append((kind, pressed_at))
+    grab_requested.set()
+
+
+def accept_capture_press(pressed_at):
+    """Debounce a capture press: False if it came within capture_debounce_ms of the last accepted one."""
+    global last_capture_press
+    debounce_s = app_config.get("capture_debounce_ms", 300) / 1000
+    with capture_lock:
+        # Coalesce key-repeat and double presses into the first one
+        if pressed_at - last_capture_press < debounce_s:
+            capture_stats["coalesced"] += 1
+            logger.debug(f"Capture press coalesced (coalesced={capture_stats['coalesced']})")
+            return False
+        last_capture_press = pressed_at
+    return True
+
+
+def capture_hotkey(kind):
+    """Return a hotkey handler that grabs the screen first (see request_grab)."""
+    return lambda: request_grab(kind)
+
+
+def start_grab_thread():
+    """Start the thread that grabs the screen for capture hotkey presses."""
+    global grab_thread
+    if grab_thread and grab_thread.is_alive():
+        return
+    grab_thread = threading.Thread(target=grab_worker_loop, name="grab", daemon=True)
+    grab_thread.start()
+
+
+def grab_worker_loop():
+    """Wait for capture presses and grab the pixels before anything else happens."""
+    # Load the capture backend, open this thread's X display and list the monitors up front
+    # so the first press doesn't pay for them
+    get_capture_backend(capture_backend_order()[0])
+    get_monitors()
+    get_cursor_position()
+    while True:
+        grab_requested.wait()
+        grab_requested.clear()
+        while grab_requests:
+            kind, pressed_at = grab_requests.popleft()
+            try:
+                grab_for_press(kind, pressed_at)
+            except Exception as e:
+                logger.error(f"Grab for {kind} capture failed: {e}")
+
+
+def record_hotkey_to_pixels(pressed_at):
+    """Return the ms from a capture press to pixels in hand, warning above the target."""
+    pixels_ms = round((time.perf_counter() - pressed_at) * 1000, 1)
+    if pixels_ms > HOTKEY_TO_PIXELS_TARGET_MS:
+        logger.warning(f"Hotkey to pixels took {pixels_ms:.1f} ms (target {HOTKEY_TO_PIXELS_TARGET_MS} ms)")
+    return pixels_ms
+
+
+def grab_for_press(kind, pressed_at):
+    """Grab the screen for one capture press, then hand it to the region selector or the capture queue."""
+    if not API_KEY:
+        # The entry points open Settings
+        post_ui_command(analyze_region if kind == "region" else analyze_screen)
+        return
+    
+    last_region = app_config.get("last_region")
+    remembered = kind == "region" and app_config.get("remember_region", False) and last_region
+    if kind == "region" and not remembered:
+        # Grab the screen before the overlay appears, then crop the selection from it
+        screenshot = capture_screenshot()
+        record_hotkey_to_pixels(pressed_at)
+        if screenshot is None:
+            logger.error("Failed to capture screenshot for region selection")
+            return
+        post_ui_command(show_region_selector, screenshot)
+        return
+    
+    region = tuple(last_region) if remembered else None
+    bbox = region or resolve_capture_bbox()
+    frame = capture_frame(bbox=bbox, all_screens=True)
+    pixels_ms = record_hotkey_to_pixels(pressed_at) if frame is not None else None
+    queue_capture(region=region, frame=frame, pressed_at=pressed_at, bbox=bbox, pixels_ms=pixels_ms, debounce=False)
+
+
+def show_region_selector(screenshot):
+    """Show a full-screen drag-to-select overlay and queue a capture of the selection."""
+    global region_selector
+    
+    if region_selector and region_selector.winfo_exists():
+        region_selector.destroy()
+    
+    stealth_enabled = app_config.get("stealth_mode", True)
+    
+    region_selector = tk.Toplevel()
+    selector = region_selector
+    selector.title("")
+    selector.overrideredirect(True)
+    
+    screen_width = selector.winfo_screenwidth()
+    screen_height = selector.winfo_screenheight()
+    selector.geometry(f"{screen_width}x{screen_height}+0+0")
+    selector.attributes('-topmost', True)
+    selector.attributes('-alpha', 0.3)
+    
+    # Needs mouse and keyboard input (drag + ESC)
+    apply_window_style(selector, 'tool', stealth=stealth_enabled, allow_input=True)
+    
+    canvas = tk.Canvas(selector, bg='#000000', highlightthickness=0, cursor='crosshair')
+    canvas.pack(fill=tk.BOTH, expand=True)
+    canvas.create_text(
+        screen_width // 2, 40,
+        text="Drag to select the question  •  ESC to cancel",
+        font=(get_system_font(), 14, 'bold'),
+        fill='#ffffff'
+    )
+    
+    # Screen coordinates may be scaled relative to the captured pixels
+    scale_x = screenshot.width / screen_width
+    scale_y = screenshot.height / screen_height
+    drag = {"x": 0, "y": 0, "rect": None}
+    
+    def on_press(event):
+        drag["x"], drag["y"] = event.x, event.y
+        if drag["rect"]:
+            canvas.delete(drag["rect"])
+        drag["rect"] = canvas.create_rectangle(
+            event.x, event.y, event.x, event.y, outline='#3b82f6', width=2, fill='#ffffff'
+        )
     
+    def on_drag(event):
+        if drag["rect"]:
+            canvas.coords(drag["rect"], drag["x"], drag["y"], event.x, event.y)
+    
+    def on_release(event):
+        x1, x2 = sorted((drag["x"], event.x))
+        y1, y2 = sorted((drag["y"], event.y))
+        selector.destroy()
+        if x2 - x1 < 10 or y2 - y1 < 10:
+            logger.info("Region selection too small - cancelled")
+            return
+        
+        region = (int(x1 * scale_x), int(y1 * scale_y), int(x2 * scale_x), int(y2 * scale_y))
+        logger.info(f"Region selected: {region}")
+        if app_config.get("remember_region", False):
+            app_config["last_region"] = list(region)
+            save_config(app_config)
+        cropped = screenshot.crop(region)
+        queue_capture(region=region, frame=CaptureFrame(cropped.size, image=cropped), debounce=False)
+    
+    canvas.bind('<ButtonPress-1>', on_press)
+    canvas.bind('<B1-Motion>', on_drag)
+    canvas.bind('<ButtonRelease-1>', on_release)
+    selector.bind('<Escape>', lambda e: selector.destroy())
+    selector.focus_force()
+
+
+def queue_capture(region=None, frame=None, pressed_at=None, bbox=None, pixels_ms=None, debounce=True):
+    """
+    Queues a screen capture for the capture worker.
+    region: optional (left, top, right, bottom) to capture instead of the full screen
+    frame: optional CaptureFrame already grabbed for this press (cropped to region)
+    pressed_at, bbox, pixels_ms: press time, grabbed area and hotkey-to-pixels ms
+    when the grab thread already took the screenshot
+    debounce: False for presses request_grab already debounced
+    """
     # Check if API key is configured
     if not API_KEY:
         logger.warning("No API key configured. Opening settings...")
         root.after(0, show_settings_popup)
         return
     
-    # Check if model is configured
-    selected_model = app_config.get("model", "models/gemini-3-flash-preview")
-    current_model_name = getattr(model, "model_name", None) or getattr(model, "_model", None)
-    if (not model) or (current_model_name and current_model_name != selected_model):
-        logger.info(f"Model not configured or outdated. Loading: {selected_model}")
-        model = genai.GenerativeModel(selected_model)
-    if not model:
-        logger.error("Failed to configure model. Please check your API key and model.")
-        root.after(0, show_settings_popup)
+    start_capture_worker()
+    
+    if pressed_at is None:
+        pressed_at = time.perf_counter()
+    if debounce and not accept_capture_press(pressed_at):
         return
+    with capture_lock:
+        job = {"generation": capture_stats["pressed"] + 1, "pressed_at": pressed_at, "region": region, "frame": frame}
+        if frame is not None and bbox is not None:
+            job["bbox"] = bbox
+        if pixels_ms is not None:
+            job["pixels_ms"] = pixels_ms
+        capture_stats["pressed"] += 1
+    
+    # Bounded queue - when full, drop the oldest waiting press (latest wins)
+    while True:
+        try:
+            capture_queue.put_nowait(job)
+            break
+        except queue.Full:
+            try:
+                capture_queue.get_nowait()
+                with capture_lock:
+                    capture_stats["dropped"] += 1
+            except queue.Empty:
+                pass
+    
+    logger.info(
+        f"Hotkey detected! Capture queued (depth={capture_queue.qsize()}, "
+        f"dropped={capture_stats['dropped']}, coalesced={capture_stats['coalesced']})"
+    )
     
-    logger.info("Hotkey detected! Capturing screen...")
+    # Re-open the REST connection if it went idle while the screen is captured and encoded
+    warm_model_connection()
     
-    # Show loading indicator on main thread
+    # Show loading indicator on main thread, then build the answer popup
+    # (if needed) while the request is in flight
     root.after(0, show_loading_indicator)
+    root.after(0, prepare_answer_popup)
+
+
+def start_capture_worker():
+    """Start the long-lived capture worker thread if it isn't running."""
+    global capture_queue, capture_worker_thread
+    with capture_lock:
+        if capture_worker_thread and capture_worker_thread.is_alive():
+            return
+        if capture_queue is None:
+            capture_queue = queue.Queue(maxsize=max(1, int(app_config.get("capture_queue_size", 4))))
+        capture_worker_thread = threading.Thread(target=capture_worker_loop, name="capture-worker", daemon=True)
+        capture_worker_thread.start()
+
+
+def capture_worker_loop():
+    """Process queued captures one at a time, always taking the newest press."""
+    while True:
+        job = capture_queue.get()
+        
+        # Anything queued behind this job is newer - latest wins
+        while True:
+            try:
+                job = capture_queue.get_nowait()
+                with capture_lock:
+                    capture_stats["dropped"] += 1
+            except queue.Empty:
+                break
+        
+        logger.debug(
+            f"Capture worker picked press #{job['generation']} "
+            f"(depth={capture_queue.qsize()}, dropped={capture_stats['dropped']})"
+        )
+        try:
+            process_capture_job(job)
+        except Exception as e:
+            logger.error(f"Capture worker error: {e}")
+
+
+def drain_capture_queue():
+    """Remove all waiting presses from the capture queue and return how many there were."""
+    drained = 0
+    while True:
+        try:
+            capture_queue.get_nowait()
+            drained += 1
+        except queue.Empty:
+            return drained
+
+
+def newest_queued_job():
+    """Return the newest press waiting in the capture queue without removing it, or None."""
+    with capture_queue.mutex:
+        return capture_queue.queue[-1] if capture_queue.queue else None
+
+
+def capture_job_superseded(job):
+    """
+    Latest-wins check for the in-flight job, called between pipeline stages.
+    If newer presses arrived, compare the newest one's frame (grabbed at the
+    press) with this request's: on the same screen they join this request,
+    on a different screen this request is cancelled.
+    """
+    latest = capture_stats["pressed"]
+    if latest == job["seen_generation"]:
+        return False
+    job["seen_generation"] = latest
+    
+    newest = newest_queued_job()
+    if newest is not None and newest.get("frame") is not None:
+        # A press for another area (e.g. a region) never matches this screen
+        frame = newest["frame"] if newest.get("bbox") == job["bbox"] else None
+    else:
+        # Tray captures and failed grabs have no frame yet
+        frame = capture_frame(bbox=job["bbox"], all_screens=True)
+    if frame is not None:
+        distance = (compute_image_hash(frame) ^ job["hash"]).bit_count()
+        if distance <= int(app_config.get("answer_cache_distance", 2)):
+            joined = drain_capture_queue()
+            capture_stats["joined"] += joined
+            logger.info(f"{joined} capture press(es) joined the in-flight request (same screen)")
+            if job.get("popup_shown"):
+                # The joined presses re-showed the loading indicator
+                root.after(0, hide_loading_indicator)
+            return False
     
-    def process_and_display():
+    capture_stats["cancelled"] += 1
+    logger.info(f"In-flight request #{job['generation']} superseded by a newer capture (cancelled={capture_stats['cancelled']})")
+    return True
+
+
+def build_prompt(variant, ocr_text=None):
+    """
+    Build the Gemini prompt ("explain" or "brief" variant). With ocr_text the
+    screen's text is embedded and sent instead of the image.
+    """
+    if ocr_text is None:
+        intro = "Analyze this image. Identify the main question, problem, or code snippet present on the screen.\n\n"
+    else:
+        intro = (
+            "Analyze the following text, read from a screen capture with OCR (it may contain recognition errors). "
+            "Identify the main question, problem, or code snippet in it.\n\n"
+            f"SCREEN TEXT:\n{ocr_text}\n\n"
+        )
+    prompt = (
+        intro +
+        "Format your response EXACTLY as follows:\n\n"
+        "📋 QUESTION:\n"
+        "[State the question or problem identified]\n\n"
+        "✅ ANSWER:\n"
+        "[Provide the direct answer. If multiple choice, state the correct option letter and full text]\n\n"
+    )
+    if variant == "explain":
+        prompt += (
+            "💡 EXPLANATION:\n"
+            "[Provide a clear, concise explanation of why this is correct]\n\n"
+            "Keep the response well-organized and easy to read."
+        )
+    else:
+        prompt += "Keep the response brief and to the point."
+    return prompt
+
+
+def prepare_ocr_request(job, screenshot):
+    """
+    Run local OCR and return the text to send instead of the image, or None to
+    send the image (no Tesseract, low confidence, code or diagram).
+    Logs and traces the OCR time and the estimated token saving.
+    """
+    ocr = run_ocr(screenshot)
+    use_text, reason = choose_ocr_text(ocr)
+    image_tokens = estimate_image_tokens(*screenshot.size)
+    if ocr is None:
+        trace_set(job, ocr_result=reason, est_image_tokens=image_tokens)
+        return None
+    job["ocr_text"] = ocr["text"]
+    job["question_text"] = extract_question_block(ocr["lines"])
+    
+    text_tokens = estimate_text_tokens(ocr["text"])
+    trace_set(
+        job,
+        ocr_ms=round(ocr["ms"], 1),
+        ocr_confidence=round(ocr["confidence"], 1),
+        ocr_words=ocr["words"],
+        ocr_result=reason,
+        est_image_tokens=image_tokens,
+        est_text_tokens=text_tokens,
+    )
+    if use_text:
+        logger.info(
+            f"OCR text mode: {ocr['words']} words, confidence {ocr['confidence']:.0f}, "
+            f"OCR {ocr['ms']:.0f} ms, ~{text_tokens} text tokens instead of ~{image_tokens} image tokens"
+        )
+        return ocr["text"]
+    logger.info(
+        f"OCR fallback to image ({reason}): {ocr['words']} words, confidence {ocr['confidence']:.0f}, "
+        f"OCR {ocr['ms']:.0f} ms spent"
+    )
+    return None
+
+
+def get_race_client(selected_model):
+    """Client for the configured race_model, or None when race mode is off or both models are the same."""
+    global race_client
+    if app_config.get("race_mode", "off") not in ("cancel", "upgrade"):
+        return None
+    race_model = app_config.get("race_model", "")
+    if not race_model or race_model == selected_model:
+        return None
+    transport_changed = isinstance(race_client, RestGenerativeModel) != (app_config.get("api_transport", "sdk") == "rest")
+    if race_client is None or transport_changed or getattr(race_client, "model_name", None) != race_model:
+        race_client = create_model(race_model)
+    return race_client
+
+
+def load_race_stats():
+    """Load per-model race wins and latencies from file."""
+    global race_stats
+    try:
+        if os.path.exists(RACE_STATS_PATH):
+            with open(RACE_STATS_PATH, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with race_stats_lock:
+                race_stats = data.get("models", {})
+    except Exception as e:
+        logger.warning(f"Could not load race stats: {e}")
+
+
+def record_race(race):
+    """Add a finished race to the per-model stats, save them and log the standings."""
+    with race_stats_lock:
+        for name in race["ranked"]:
+            result = race["results"][name]
+            stats = race_stats.setdefault(name, {"races": 0, "wins": 0, "errors": 0, "first_ms": [], "total_ms": []})
+            stats["races"] += 1
+            stats["wins"] += name == race["winner"]
+            stats["errors"] += result["error"] is not None
+            for key in ("first_ms", "total_ms"):
+                if result[key] is not None:
+                    stats[key] = (stats[key] + [round(result[key], 1)])[-RACE_LATENCY_SAMPLES:]
+        standings = ", ".join(
+            f"{name}: {stats['wins']}/{stats['races']} wins, first token p50 "
+            f"{sorted(stats['first_ms'])[len(stats['first_ms']) // 2] if stats['first_ms'] else 0:.0f} ms"
+            for name, stats in race_stats.items() if name in race["ranked"]
+        )
+        data = {"models": race_stats}
         try:
-            # 1. Capture the entire screen using cross-platform function
-            screenshot = capture_screenshot()
-            
-            if screenshot is None:
-                raise Exception("Failed to capture screenshot")
-            
-            # 2. visual feedback
-            logger.debug("Screen captured. Sending to Gemini...")
-            
-            # 3. Prepare the prompt based on settings
-            show_explanation = app_config.get("show_explanation", True)
+            with open(RACE_STATS_PATH, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+        except Exception as e:
+            logger.error(f"Could not save race stats: {e}")
+    logger.info(f"Race won by {race['winner'] or 'nobody'} ({standings})")
+
+
+def claim_race(job, race, name):
+    """First racer to answer claims the popup; streamed answers open it right away."""
+    with race["lock"]:
+        if race["winner"] is not None or race["cancelled"]:
+            return False
+        race["winner"] = name
+        race["claimed"].set()
+        if race["streaming"]:
+            # Queued under the lock, so a cancel's hide_answer_popup always runs after it
+            trace_mark(job, "first_byte")
+            root.after(0, hide_loading_indicator)
+            root.after(0, lambda: show_job_popup(job, "", streaming=True))
+            job["popup_shown"] = True
+    return True
+
+
+def run_racer(job, race, name, client, contents, delay_s=0):
+    """
+    One side of a race: request the answer, stream it to the popup if it won,
+    record the outcome. With delay_s (a hedge) the request is only sent if
+    nothing has answered by then; its first_ms and total_ms still count from
+    the start of the race, as the user waited through the delay.
+    """
+    result = race["results"][name]
+    started = time.perf_counter()
+    try:
+        if delay_s:
+            if race["claimed"].wait(delay_s) or race["cancelled"]:
+                result["skipped"] = True
+                return
+            logger.info(f"No first byte after {delay_s * 1000:.0f} ms (p95), sending a hedged request")
+            trace_set(job, hedge_sent_ms=round(delay_s * 1000))
+        result["sent_at"] = time.perf_counter()
+        chunks = []
+        for chunk_text in generate_with_retries(job, client, contents, race["streaming"], race["deadline"],
+                                                should_stop=lambda: race["cancelled"]):
+            if race["cancelled"]:
+                return
+            if result["first_ms"] is None:
+                result["first_at"] = time.perf_counter()
+                result["first_ms"] = (result["first_at"] - started) * 1000
+                claim_race(job, race, name)
+            if race["winner"] == name and race["streaming"]:
+                root.after(0, lambda t=chunk_text: append_answer_text(t))
+            elif race["winner"] != name and race["mode"] == "cancel":
+                # Lost the race - stop reading the slower stream
+                return
+            chunks.append(chunk_text)
+        answer = "".join(chunks)
+        if not answer:
+            raise Exception("Gemini returned an empty response")
+        result["total_ms"] = (time.perf_counter() - started) * 1000
+        result["answer"] = answer
+    except RequestCancelled:
+        pass
+    except Exception as e:
+        result["error"] = e
+        logger.warning(f"Race request to {name} failed: {e}")
+    finally:
+        record_racer_latency(race, name)
+        finish_racer(job, race, name)
+
+
+def record_racer_latency(race, name):
+    """
+    Add a racer's own request latency, from when it was sent, to its model's history
+    (a hedge is the selected model again). A racer that lost is recorded as taking at
+    least as long as it had run, so the model keeps its slow requests; failed, unsent
+    and superseded requests are left out. Each racer is recorded once.
+    """
+    result = race["results"][name]
+    with race["lock"]:
+        if result["recorded"] or result["sent_at"] is None or result["error"] is not None:
+            return
+        if result["answer"] is None and (race["cancelled"] or race["winner"] in (None, name)):
+            return
+        result["recorded"] = True
+    now = time.perf_counter()
+    first_ms = ((result["first_at"] or now) - result["sent_at"]) * 1000
+    total_ms = (now - result["sent_at"]) * 1000
+    add_latency_sample(result["model"], race["streaming"], first_ms, total_ms)
+    race["latency"].append([result["model"], round(first_ms, 1), round(total_ms, 1)])
+
+
+def finish_racer(job, race, name):
+    """Wake the worker once the winner is done (or everyone failed); offer a slower answer as an upgrade."""
+    result = race["results"][name]
+    with race["lock"]:
+        race["pending"] -= 1
+        finished = race["pending"] == 0
+        if name == race["winner"] or finished:
+            race["done"].set()
+        is_upgrade = (
+            race["mode"] == "upgrade" and not race["cancelled"] and name in race["ranked"]
+            and race["winner"] not in (None, name) and result["answer"]
+        )
+    if is_upgrade:
+        root.after(0, lambda: offer_answer_upgrade(job, result["answer"], name, race["on_upgrade"]))
+    if finished and len(race["ranked"]) > 1:
+        record_race(race)
+
+
+def race_request(job, racers, contents, streaming, deadline, mode="cancel", on_upgrade=None):
+    """
+    Send the same request through each (name, client, delay_s) in racers and
+    return (answer, first_token_ms, winner) of the first to answer, or None if
+    the capture was superseded. Racers with a delay are hedges, sent only if
+    nothing has answered by then. The slower request is dropped in "cancel"
+    mode; in "upgrade" mode its answer is offered in the popup and
+    on_upgrade(answer) runs if taken.
+    """
+    race = {
+        "mode": mode,
+        "streaming": streaming,
+        "deadline": deadline,
+        "on_upgrade": on_upgrade,
+        "lock": threading.Lock(),
+        "claimed": threading.Event(),
+        "done": threading.Event(),
+        "winner": None,
+        "cancelled": False,
+        "pending": len(racers),
+        "ranked": [name for name, _, delay_s in racers if not delay_s],  # Models compared in race_stats.json
+        "latency": [],  # [model, first ms, complete ms] of each request, traced as race_latency
+        "results": {
+            name: {
+                "answer": None, "first_ms": None, "total_ms": None, "error": None,
+                "model": racers[0][0] if delay_s else name,  # Hedges duplicate the selected model
+                "sent_at": None, "first_at": None, "recorded": False,
+            }
+            for name, _, delay_s in racers
+        },
+    }
+    trace_set(job, race_latency=race["latency"])
+    for name, client, delay_s in racers:
+        threading.Thread(target=run_racer, args=(job, race, name, client, contents, delay_s), name="race", daemon=True).start()
+    
+    # Superseded checks stay on the worker thread while the racers run
+    while not race["done"].wait(0.05):
+        if capture_job_superseded(job):
+            with race["lock"]:
+                race["cancelled"] = True
+                claimed = race["winner"] is not None
+            if claimed and streaming:
+                # The winner already opened a streaming popup for this capture - don't leave
+                # it showing "Generating response..."
+                root.after(0, hide_answer_popup)
+            return None
+    
+    winner = race["winner"]
+    if mode == "cancel":
+        # Losers still waiting on a slow request took at least this long
+        for name in race["results"]:
+            record_racer_latency(race, name)
+    if winner is None:
+        raise next((result["error"] for result in race["results"].values() if result["error"]),
+                   Exception("Gemini returned no answer"))
+    result = race["results"][winner]
+    if result["error"]:
+        raise result["error"]
+    return result["answer"], result["first_ms"], winner
+
+
+def serve_cached_answer(job, answer_text):
+    """Show a cached answer for a capture job without calling Gemini."""
+    trace_mark(job, "preprocess")
+    if app_config.get("auto_copy", False):
+        root.after(0, lambda: auto_copy_answer(answer_text))
+    root.after(0, hide_loading_indicator)
+    root.after(0, lambda: show_job_popup(job, answer_text))
+    trace_complete(job, "worker")
+
+
+def process_capture_job(job):
+    """Captures screen, sends to Gemini, and displays answer in popup."""
+    global model
+    
+    job["seen_generation"] = job["generation"]
+    start_trace(job)
+    trace_mark(job, "dequeued")
+    
+    try:
+        # The warm-up thread imports and configures genai; a very early press waits for it
+        if not warmup_done.wait(timeout=30):
+            logger.warning("Warm-up still running, continuing without it")
+        
+        # Check if model is configured
+        selected_model = app_config.get("model", "models/gemini-3-flash-preview")
+        current_model_name = getattr(model, "model_name", None) or getattr(model, "_model", None)
+        transport_changed = isinstance(model, RestGenerativeModel) != (app_config.get("api_transport", "sdk") == "rest")
+        if (not model) or transport_changed or (current_model_name and current_model_name != selected_model):
+            logger.info(f"Model not configured or outdated. Loading: {selected_model}")
+            model = create_model(selected_model)
+        if not model:
+            logger.error("Failed to configure model. Please check your API key and model.")
+            root.after(0, hide_loading_indicator)
+            root.after(0, show_settings_popup)
+            finish_trace(job, "no_model")
+            return
+        trace_set(job, model=selected_model)
+        
+        # 1. Capture the target monitor (or selected region) unless the press already grabbed it
+        if "bbox" not in job:
+            job["bbox"] = job.get("region") or resolve_capture_bbox()
+        frame = job.get("frame")
+        if frame is None:
+            frame = capture_frame(bbox=job["bbox"], all_screens=True)
+            job["pixels_ms"] = record_hotkey_to_pixels(job["pressed_at"])
+        trace_mark(job, "capture")
+        if "pixels_ms" in job:
+            trace_set(job, hotkey_to_pixels_ms=job["pixels_ms"])
+        
+        if frame is None:
+            raise Exception("Failed to capture screenshot")
+        trace_set(job, image_size=list(frame.size), bbox=job["bbox"])
+        
+        # 2. Prepare the prompt based on settings
+        show_explanation = app_config.get("show_explanation", True)
+        variant = "explain" if show_explanation else "brief"
+        
+        # 3. Reuse the answer for a near-identical screen if cached
+        cache_enabled = app_config.get("answer_cache_enabled", True)
+        question_cache_enabled = app_config.get("question_cache_enabled", True)
+        image_hash = compute_image_hash(frame)
+        job["hash"] = image_hash
+        if cache_enabled:
+            cached_answer = lookup_cached_answer(image_hash, selected_model, variant)
+            trace_set(job, cache="hit" if cached_answer else "miss")
+            if cached_answer:
+                serve_cached_answer(job, cached_answer)
+                return
+        else:
+            trace_set(job, cache="disabled")
+        
+        # 4. Crop to the text-dense part of the screen (not for regions the user selected)
+        if app_config.get("auto_crop", True) and not job.get("region"):
+            frame = auto_crop_frame(job, frame)
+        # The PIL image is built here, from the (cropped) frame, for OCR and encoding
+        screenshot = frame.image
+        
+        # 5. Send OCR text instead of the image when the screen is plain text,
+        #    otherwise encode the image (format, quality and size budget from config).
+        #    A question already answered (in any font or layout) is served from the question cache.
+        ocr_text = None
+        if app_config.get("ocr_mode", "off") == "auto":
+            ocr_text = prepare_ocr_request(job, screenshot)
+        if question_cache_enabled and job.get("question_text"):
+            cached_answer, similarity = lookup_question_answer(job["question_text"], selected_model, variant)
+            trace_set(job, question_cache="hit" if cached_answer else "miss", question_similarity=round(similarity, 3))
+            if cached_answer:
+                if cache_enabled:
+                    store_cached_answer(image_hash, selected_model, variant, cached_answer)
+                serve_cached_answer(job, cached_answer)
+                return
+        if ocr_text is not None:
+            contents = [build_prompt(variant, ocr_text)]
+            trace_set(job, request_mode="text", upload_bytes=len(contents[0].encode("utf-8")))
+        else:
+            image_part = encode_screenshot(screenshot)
+            contents = [build_prompt(variant), image_part]
+            trace_set(job, request_mode="image")
+            if isinstance(image_part, dict):
+                trace_set(job, upload_bytes=len(image_part["data"]), upload_mime=image_part["mime_type"])
+        trace_mark(job, "preprocess")
+        if capture_job_superseded(job):
+            finish_trace(job, "cancelled")
+            return
+        logger.debug("Screen captured. Sending to Gemini...")
+        
+        # 6. Send to Gemini with a deadline and retries. Race a second model, or hedge with
+        #    a duplicate request if the first byte is later than the observed p95
+        streaming = app_config.get("stream_responses", True)
+        deadline_s = request_deadline(selected_model, streaming)
+        trace_set(job, stream=streaming, deadline_s=round(deadline_s, 1))
+        request_started = time.perf_counter()
+        deadline = request_started + deadline_s
+        first_token_ms = None
+        racers = [(selected_model, model, 0)]
+        race_opponent = get_race_client(selected_model)
+        if race_opponent is not None:
+            racers.append((race_opponent.model_name, race_opponent, 0))
+            trace_set(job, race_models=[name for name, _, _ in racers])
+        if app_config.get("hedge_requests", False):
+            hedge_ms = latency_percentile(selected_model, streaming, 95, first_byte=True)
+            if hedge_ms is not None:
+                racers.append((f"{selected_model} (hedge)", model, hedge_ms / 1000))
+        trace_mark(job, "request_sent")
+        if len(racers) > 1:
+            def accept_upgrade(upgraded_answer):
+                add_to_history(upgraded_answer)
+                if cache_enabled:
+                    store_cached_answer(image_hash, selected_model, variant, upgraded_answer)
+                if app_config.get("auto_copy", False):
+                    auto_copy_answer(upgraded_answer)
             
-            if show_explanation:
-                prompt = (
-                    "Analyze this image. Identify the main question, problem, or code snippet present on the screen.\n\n"
-                    "Format your response EXACTLY as follows:\n\n"
-                    "📋 QUESTION:\n"
-                    "[State the question or problem identified]\n\n"
-                    "✅ ANSWER:\n"
-                    "[Provide the direct answer. If multiple choice, state the correct option letter and full text]\n\n"
-                    "💡 EXPLANATION:\n"
-                    "[Provide a clear, concise explanation of why this is correct]\n\n"
-                    "Keep the response well-organized and easy to read."
-                )
+            race_mode = app_config.get("race_mode", "cancel") if race_opponent is not None else "cancel"
+            raced = race_request(job, racers, contents, streaming, deadline, mode=race_mode, on_upgrade=accept_upgrade)
+            if raced is None:
+                finish_trace(job, "cancelled")
+                return
+            answer, first_token_ms, winner = raced
+            trace_set(job, race_winner=winner)
+            if not streaming:
+                trace_mark(job, "first_byte")
+            trace_mark(job, "last_byte")
+            if streaming:
+                root.after(0, lambda: finish_answer_popup(answer))
             else:
-                prompt = (
-                    "Analyze this image. Identify the main question, problem, or code snippet present on the screen.\n\n"
-                    "Format your response EXACTLY as follows:\n\n"
-                    "📋 QUESTION:\n"
-                    "[State the question or problem identified]\n\n"
-                    "✅ ANSWER:\n"
-                    "[Provide the direct answer. If multiple choice, state the correct option letter and full text]\n\n"
-                    "Keep the response brief and to the point."
-                )
-
-            # 4. Send to Gemini
-            response = model.generate_content([prompt, screenshot])
-            
-            # 5. Hide loading indicator and display result in popup
-            answer = response.text
-            logger.info("Answer received. Displaying popup...")
-            
-            # Add to history
-            add_to_history(answer)
+                root.after(0, hide_loading_indicator)
+                root.after(0, lambda: show_job_popup(job, answer))
+        elif streaming:
+            # Stream: open the popup on the first chunk and append as text arrives
+            chunks = []
+            for chunk_text in generate_with_retries(job, model, contents, True, deadline,
+                                                    should_stop=lambda: capture_job_superseded(job)):
+                if capture_job_superseded(job):
+                    finish_trace(job, "cancelled")
+                    return
+                if first_token_ms is None:
+                    trace_mark(job, "first_byte")
+                    first_token_ms = (time.perf_counter() - request_started) * 1000
+                    logger.info(f"First token received after {first_token_ms:.0f} ms")
+                    root.after(0, hide_loading_indicator)
+                    root.after(0, lambda: show_job_popup(job, "", streaming=True))
+                    job["popup_shown"] = True
+                chunks.append(chunk_text)
+                root.after(0, lambda t=chunk_text: append_answer_text(t))
+            trace_mark(job, "last_byte")
+            answer = "".join(chunks)
+            if not answer:
+                raise Exception("Gemini returned an empty response")
+            root.after(0, lambda: finish_answer_popup(answer))
+        else:
+            answer = "".join(generate_with_retries(job, model, contents, False, deadline,
+                                                   should_stop=lambda: capture_job_superseded(job)))
+            trace_mark(job, "first_byte")
+            trace_mark(job, "last_byte")
+            first_token_ms = (time.perf_counter() - request_started) * 1000
             
-            # Auto-copy if enabled
-            if app_config.get("auto_copy", False):
-                root.after(0, lambda: auto_copy_answer(answer))
+            if capture_job_superseded(job):
+                # Too late to show, but still a valid answer for that screen
+                if cache_enabled:
+                    store_cached_answer(image_hash, selected_model, variant, answer)
+                if question_cache_enabled and job.get("question_text"):
+                    store_question_answer(job["question_text"], selected_model, variant, answer)
+                finish_trace(job, "cancelled")
+                return
             
             # Hide loading indicator and show popup on main thread
             root.after(0, hide_loading_indicator)
-            root.after(50, lambda: show_answer_popup(answer))
-            
-            logger.debug(f"Ready for next query. Press {HOTKEY}...")
+            root.after(0, lambda: show_job_popup(job, answer))
+        
+        # 7. Update history, cache and clipboard once the full answer is in
+        total_ms = (time.perf_counter() - request_started) * 1000
+        logger.info(f"Answer received (first token {first_token_ms:.0f} ms, complete {total_ms:.0f} ms)")
+        
+        add_to_history(answer)
+        trace_mark(job, "history_write")
+        if cache_enabled:
+            store_cached_answer(image_hash, selected_model, variant, answer)
+        if question_cache_enabled and job.get("question_text"):
+            # Keyed on the OCR'd question block (options included), not the model's restated question
+            store_question_answer(job["question_text"], selected_model, variant, answer)
+        
+        # Auto-copy if enabled
+        if app_config.get("auto_copy", False):
+            root.after(0, lambda: auto_copy_answer(answer))
+        
+        trace_complete(job, "worker")
+        logger.debug(f"Ready for next query. Press {HOTKEY}...")
 
-        except Exception as e:
-            error_msg = f"Error: {str(e)}"
-            logger.error(error_msg)
-            # Hide loading indicator and show error
-            root.after(0, hide_loading_indicator)
-            root.after(50, lambda: show_answer_popup(error_msg))
-    
-    # Run analysis in separate thread to avoid blocking
-    threading.Thread(target=process_and_display, daemon=True).start()
+    except RequestCancelled:
+        logger.info(f"Request #{job['generation']} dropped while waiting to retry (superseded)")
+        finish_trace(job, "cancelled")
+    except Exception as e:
+        error_msg = f"Error: {str(e)}"
+        logger.error(error_msg)
+        trace_set(job, status="error", error=str(e))
+        if capture_stats["pressed"] != job["seen_generation"]:
+            # A newer capture is already queued - let it replace this one quietly
+            finish_trace(job, "error")
+            return
+        # Hide loading indicator and show error
+        root.after(0, hide_loading_indicator)
+        root.after(0, lambda: show_job_popup(job, error_msg))
+        trace_complete(job, "worker")
+
+
+def show_job_popup(job, answer_text, streaming=False):
+    """Show the answer popup for a capture job and record when it became visible."""
+    started = time.perf_counter()
+    show_answer_popup(answer_text, streaming=streaming)
+    if popup_window and popup_window.winfo_exists():
+        popup_window.update_idletasks()
+    # Answer in hand -> popup visible (the reused popup only swaps text and colors)
+    trace_set(job, popup_ms=round((time.perf_counter() - started) * 1000, 2))
+    trace_mark(job, "popup_visible")
+    trace_complete(job, "popup")
 
 
 def auto_copy_answer(answer_text):
@@ -1124,6 +4163,14 @@ def quit_application():
     """Gracefully quit the application."""
     global tray_icon, root
 
+    # Write out any queued history entries and pending cache files
+    flush_history()
+    flush_cache_saves()
+
+    # Release the global hotkeys
+    if hotkey_backend:
+        hotkey_backend.stop()
+
     # Stop the tray icon if running
     try:
         if tray_icon:
@@ -1151,18 +4198,21 @@ def quit_application():
     os._exit(0)
 
 def toggle_popup_visibility():
-    """Toggle the visibility of the popup window and loading indicator."""
-    global popup_window, popup_hidden, loading_indicator
+    """Toggle the visibility of the popup windows and loading indicator."""
+    global popup_hidden
     
-    has_popup = popup_window and popup_window.winfo_exists()
-    has_loading = loading_indicator and loading_indicator.winfo_exists()
+    open_windows = [
+        window for window in (popup_window, history_window)
+        if window and window.winfo_exists() and window._open
+    ]
+    has_loading = loading_indicator and loading_indicator.winfo_exists() and loading_indicator._open
     
-    if has_popup or has_loading:
+    if open_windows or has_loading:
         if popup_hidden:
             # Show the windows
-            if has_popup:
-                popup_window.deiconify()
-                popup_window.attributes('-alpha', 0.98)
+            for window in open_windows:
+                window.deiconify()
+                window.attributes('-alpha', 0.98)
             if has_loading:
                 loading_indicator.deiconify()
                 loading_indicator.attributes('-alpha', 0.95)
@@ -1170,8 +4220,8 @@ def toggle_popup_visibility():
             logger.debug("UI shown")
         else:
             # Hide the windows
-            if has_popup:
-                popup_window.withdraw()
+            for window in open_windows:
+                window.withdraw()
             if has_loading:
                 loading_indicator.withdraw()
             popup_hidden = True
@@ -1179,64 +4229,46 @@ def toggle_popup_visibility():
     else:
         logger.debug("No UI elements to hide/show")
 
-def show_history_popup():
-    """Show the history popup with recent answers."""
-    global popup_window, app_config
-    
-    if not answer_history:
-        # Show message if no history
-        show_answer_popup("📚 History is empty\n\nCapture some screens first!\nPress Ctrl+Alt+S to start.")
-        return
-    
-    # Close existing popup if any
-    if popup_window and popup_window.winfo_exists():
-        popup_window.destroy()
+def build_history_window():
+    """
+    Build the history popup once, withdrawn. show_history_popup() reuses it,
+    resetting the search and list instead of rebuilding the widgets.
+    """
+    global history_window
     
-    # Get saved position and theme
-    popup_x = app_config.get("popup_x", 200)
-    popup_y = app_config.get("popup_y", 80)
     current_theme = app_config.get("theme", "light")
     theme = THEMES[current_theme]
     stealth_enabled = app_config.get("stealth_mode", True)
     
-    # Create new popup window
-    popup_window = tk.Toplevel()
-    popup_window.title("")
-    popup_window.geometry(f"400x450+{popup_x}+{popup_y}")
-    popup_window.overrideredirect(True)
+    # Create the window hidden; it is only shown by show_history_popup()
+    window = tk.Toplevel()
+    window.withdraw()
+    window.title("")
+    window.geometry(f"400x450+{app_config.get('popup_x', 200)}+{app_config.get('popup_y', 80)}")
+    window.overrideredirect(True)
     
     # Make it always on top
-    popup_window.attributes('-topmost', True)
-    popup_window.attributes('-alpha', 0.0)
+    window.attributes('-topmost', True)
+    window.attributes('-alpha', 0.98)
     
     # Make window undetectable - cross-platform with stealth mode
-    apply_window_style(popup_window, 'popup', stealth=stealth_enabled)
+    # Allow input so the search box can take keyboard focus
+    apply_window_style(window, 'popup', stealth=stealth_enabled, allow_input=True)
     
     # Get colors from current theme
     card_bg = theme['card_bg']
     text_color = theme['text_color']
     secondary_text = theme['secondary_text']
     border_color = theme['border_color']
-    accent_color = theme['accent_color']
     light_gray = theme['light_gray']
     
     # Make window transparent for rounded corners - cross-platform
-    apply_transparency(popup_window, '#000000')
+    apply_transparency(window, '#000000')
     
     # Main canvas for rounded corners
-    canvas = tk.Canvas(popup_window, width=400, height=450, bg='#000000', highlightthickness=0)
+    canvas = tk.Canvas(window, width=400, height=450, bg='#000000', highlightthickness=0)
     canvas.pack(fill=tk.BOTH, expand=True)
-    
-    # Draw rounded rectangle background
-    radius = 16
-    x1, y1, x2, y2 = 0, 0, 400, 450
-    
-    canvas.create_arc(x1, y1, x1+radius*2, y1+radius*2, start=90, extent=90, fill=card_bg, outline=card_bg)
-    canvas.create_arc(x2-radius*2, y1, x2, y1+radius*2, start=0, extent=90, fill=card_bg, outline=card_bg)
-    canvas.create_arc(x1, y2-radius*2, x1+radius*2, y2, start=180, extent=90, fill=card_bg, outline=card_bg)
-    canvas.create_arc(x2-radius*2, y2-radius*2, x2, y2, start=270, extent=90, fill=card_bg, outline=card_bg)
-    canvas.create_rectangle(x1+radius, y1, x2-radius, y2, fill=card_bg, outline=card_bg)
-    canvas.create_rectangle(x1, y1+radius, x2, y2-radius, fill=card_bg, outline=card_bg)
+    draw_rounded_card(canvas, 400, 450, card_bg)
     
     # Main card frame
     main_card = tk.Frame(canvas, bg=card_bg)
@@ -1257,9 +4289,9 @@ def show_history_popup():
         cursor='hand2'
     )
     close_btn.pack(side=tk.RIGHT, padx=16)
-    close_btn.bind('<Enter>', lambda e: close_btn.config(fg=theme['close_btn_hover']))
-    close_btn.bind('<Leave>', lambda e: close_btn.config(fg=theme['close_btn_fg']))
-    close_btn.bind('<Button-1>', lambda e: fade_out())
+    close_btn.bind('<Enter>', lambda e: close_btn.config(fg=THEMES[window._theme]['close_btn_hover']))
+    close_btn.bind('<Leave>', lambda e: close_btn.config(fg=THEMES[window._theme]['close_btn_fg']))
+    close_btn.bind('<Button-1>', lambda e: hide_history_window())
     
     # Separator
     sep1 = tk.Frame(main_card, bg=border_color, height=1)
@@ -1278,90 +4310,182 @@ def show_history_popup():
     title_label = tk.Label(title_row, text="Recent Answers", font=(get_system_font(), 14, 'bold'), bg=card_bg, fg=text_color)
     title_label.pack(side=tk.LEFT)
     
-    count_label = tk.Label(title_row, text=f"({len(answer_history)})", font=(get_system_font(), 10), bg=card_bg, fg=secondary_text)
+    count_label = tk.Label(title_row, text="", font=(get_system_font(), 10), bg=card_bg, fg=secondary_text)
     count_label.pack(side=tk.LEFT, padx=(8, 0))
     
-    # Scrollable list container
-    list_container = tk.Frame(main_card, bg=card_bg)
-    list_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 12))
+    # Search box (filters as you type)
+    search_frame = tk.Frame(header_section, bg=border_color)
+    search_frame.pack(fill=tk.X, pady=(12, 0))
     
-    # Create canvas for scrolling
-    list_canvas = tk.Canvas(list_container, bg=card_bg, highlightthickness=0)
-    scrollbar = tk.Scrollbar(list_container, orient="vertical", command=list_canvas.yview)
-    scrollable_frame = tk.Frame(list_canvas, bg=card_bg)
+    search_inner = tk.Frame(search_frame, bg=light_gray)
+    search_inner.pack(fill=tk.X, padx=1, pady=1)
     
-    scrollable_frame.bind(
-        "<Configure>",
-        lambda e: list_canvas.configure(scrollregion=list_canvas.bbox("all"))
+    search_icon = tk.Label(search_inner, text="🔍", font=(get_system_font(), 9), bg=light_gray, fg=secondary_text)
+    search_icon.pack(side=tk.LEFT, padx=(10, 0))
+    
+    search_var = tk.StringVar()
+    search_entry = tk.Entry(
+        search_inner,
+        textvariable=search_var,
+        font=(get_system_font(), 10),
+        bg=light_gray,
+        fg=text_color,
+        insertbackground=text_color,
+        relief=tk.FLAT
     )
+    search_entry.pack(fill=tk.X, padx=(6, 12), pady=6)
     
-    list_canvas.create_window((0, 0), window=scrollable_frame, anchor="nw", width=340)
-    list_canvas.configure(yscrollcommand=scrollbar.set)
+    # Virtualized list: one canvas, a small pool of row items recycled while scrolling.
+    # Only visible rows exist; entries are fetched a page at a time as rows come into view.
+    list_container = tk.Frame(main_card, bg=card_bg)
+    list_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 12))
     
+    list_canvas = tk.Canvas(list_container, bg=card_bg, highlightthickness=0, cursor='hand2')
+    scrollbar = tk.Scrollbar(list_container, orient="vertical")
     list_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     
-    # Mouse wheel scrolling
-    def on_mousewheel(event):
-        list_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-    list_canvas.bind_all("<MouseWheel>", on_mousewheel)
-    
-    # Add history items
-    for i, entry in enumerate(answer_history):
-        item_frame = tk.Frame(scrollable_frame, bg=light_gray, cursor='hand2')
-        item_frame.pack(fill=tk.X, pady=(0, 8))
-        
-        # Inner padding
-        inner_frame = tk.Frame(item_frame, bg=light_gray)
-        inner_frame.pack(fill=tk.X, padx=12, pady=10)
-        
-        # Timestamp
-        time_label = tk.Label(
-            inner_frame,
-            text=entry['timestamp'],
-            font=(get_system_font(), 8),
-            bg=light_gray,
-            fg=secondary_text
-        )
-        time_label.pack(anchor='w')
-        
-        # Preview
-        preview_label = tk.Label(
-            inner_frame,
-            text=entry['preview'],
-            font=(get_system_font(), 10),
-            bg=light_gray,
-            fg=text_color,
-            anchor='w',
-            justify='left'
-        )
-        preview_label.pack(anchor='w', pady=(4, 0))
+    row_stride = HISTORY_ROW_HEIGHT + HISTORY_ROW_GAP
+    view = {"query": "", "total": 0, "count": 0, "pages": {}, "scroll": 0, "hover": None, "pending": None}
+    row_pool = []  # (background, timestamp text, preview text) canvas items
+    
+    def get_entry(index):
+        page = index // HISTORY_PAGE_SIZE
+        if page not in view["pages"]:
+            view["pages"][page] = get_history_page(offset=page * HISTORY_PAGE_SIZE, query=view["query"])
+        entries = view["pages"][page]
+        offset = index % HISTORY_PAGE_SIZE
+        return entries[offset] if offset < len(entries) else None
+    
+    def render_rows():
+        row_theme = THEMES[window._theme]
+        viewport = max(1, list_canvas.winfo_height())
+        width = max(1, list_canvas.winfo_width())
+        content = view["total"] * row_stride
+        view["scroll"] = max(0, min(view["scroll"], content - viewport))
+        
+        # Grow the pool to cover the viewport (plus one partially visible row)
+        while len(row_pool) < viewport // row_stride + 2:
+            row_pool.append((
+                list_canvas.create_rectangle(0, 0, 0, 0, outline=''),
+                list_canvas.create_text(12, 0, anchor='nw', font=(get_system_font(), 8)),
+                list_canvas.create_text(12, 0, anchor='nw', font=(get_system_font(), 10)),
+            ))
         
-        # Click handler
-        answer_text = entry['answer']
-        def make_click_handler(text):
-            return lambda e: (popup_window.destroy(), root.after(50, lambda: show_answer_popup(text)))
+        first = view["scroll"] // row_stride
+        for slot, (background, time_item, preview_item) in enumerate(row_pool):
+            index = first + slot
+            entry = get_entry(index) if index < view["total"] else None
+            if entry is None:
+                for item in (background, time_item, preview_item):
+                    list_canvas.itemconfigure(item, state='hidden')
+                continue
+            y = index * row_stride - view["scroll"]
+            list_canvas.coords(background, 0, y, width, y + HISTORY_ROW_HEIGHT)
+            list_canvas.coords(time_item, 12, y + 10)
+            list_canvas.coords(preview_item, 12, y + 28)
+            hovered = index == view["hover"]
+            list_canvas.itemconfigure(background, state='normal',
+                                      fill=row_theme['border_color'] if hovered else row_theme['light_gray'])
+            list_canvas.itemconfigure(time_item, state='normal', text=entry['timestamp'],
+                                      fill=row_theme['secondary_text'])
+            list_canvas.itemconfigure(preview_item, state='normal', text=entry['preview'],
+                                      fill=row_theme['text_color'])
         
-        for widget in [item_frame, inner_frame, time_label, preview_label]:
-            widget.bind('<Button-1>', make_click_handler(answer_text))
-            widget.bind('<Enter>', lambda e, f=item_frame: f.config(bg=border_color) or [w.config(bg=border_color) for w in f.winfo_children()] or [w.config(bg=border_color) for c in f.winfo_children() for w in c.winfo_children()])
-            widget.bind('<Leave>', lambda e, f=item_frame: f.config(bg=light_gray) or [w.config(bg=light_gray) for w in f.winfo_children()] or [w.config(bg=light_gray) for c in f.winfo_children() for w in c.winfo_children()])
+        if content > viewport:
+            scrollbar.set(view["scroll"] / content, (view["scroll"] + viewport) / content)
+        else:
+            scrollbar.set(0, 1)
+    
+    def scroll_to(pixels):
+        view["scroll"] = int(pixels)
+        render_rows()
+    
+    def on_scrollbar(action, amount, unit=None):
+        viewport = max(1, list_canvas.winfo_height())
+        if action == 'moveto':
+            scroll_to(float(amount) * view["total"] * row_stride)
+        elif action == 'scroll':
+            step = viewport if unit == 'pages' else row_stride
+            scroll_to(view["scroll"] + int(amount) * step)
+    
+    scrollbar.configure(command=on_scrollbar)
+    
+    # Mouse wheel scrolling (bound while the window is open)
+    def on_mousewheel(event):
+        scroll_to(view["scroll"] - int(event.delta / 120) * row_stride)
+    
+    # One delegated handler set for every row: hover, leave and click
+    def row_at(y):
+        index, within = divmod(view["scroll"] + y, row_stride)
+        if within < HISTORY_ROW_HEIGHT and index < view["total"]:
+            return index
+        return None
+    
+    def set_hover(index):
+        if index != view["hover"]:
+            view["hover"] = index
+            render_rows()
+    
+    def on_row_click(event):
+        index = row_at(event.y)
+        entry = get_entry(index) if index is not None else None
+        if entry:
+            hide_history_window(fade=False)
+            show_answer_popup(get_history_answer(entry['id']) or "")
+    
+    list_canvas.bind('<Motion>', lambda e: set_hover(row_at(e.y)))
+    list_canvas.bind('<Leave>', lambda e: set_hover(None))
+    list_canvas.bind('<Button-1>', on_row_click)
+    list_canvas.bind('<Configure>', lambda e: render_rows())
+    
+    def update_count_label():
+        if view["query"]:
+            count_label.config(text=f"({view['total']} found)")
+        else:
+            count_label.config(text=f"({view['count']})")
+    
+    def run_search():
+        view["pending"] = None
+        query = search_var.get().strip()
+        if query == view["query"]:
+            return
+        view.update(query=query, pages={}, scroll=0, hover=None)
+        view["total"] = get_history_count(query) if query else view["count"]
+        render_rows()
+        update_count_label()
+    
+    def on_search_key(event):
+        # Debounce: search once typing pauses
+        if view["pending"]:
+            window.after_cancel(view["pending"])
+        view["pending"] = window.after(HISTORY_SEARCH_DEBOUNCE_MS, run_search)
+    
+    search_entry.bind('<KeyRelease>', on_search_key)
+    
+    def reset_list(history_count):
+        """Clear the search and show the newest entries (called on every open)."""
+        if view["pending"]:
+            window.after_cancel(view["pending"])
+        search_var.set("")
+        view.update(query="", total=history_count, count=history_count, pages={}, scroll=0, hover=None, pending=None)
+        render_rows()
+        update_count_label()
+        list_canvas.bind_all("<MouseWheel>", on_mousewheel)
     
     # Footer with clear button
     footer = tk.Frame(main_card, bg=card_bg)
     footer.pack(fill=tk.X, padx=20, pady=(0, 16))
     
-    def clear_history():
-        global answer_history
-        answer_history = []
-        save_history()
+    def on_clear_history():
+        clear_history()
         # pystray dynamically rebuilds menu, no explicit update needed
-        fade_out()
+        hide_history_window()
     
     clear_btn = tk.Button(
         footer,
         text="Clear History",
-        command=clear_history,
+        command=on_clear_history,
         font=(get_system_font(), 9),
         bg=card_bg,
         fg=secondary_text,
@@ -1376,52 +4500,114 @@ def show_history_popup():
     hint_label = tk.Label(footer, text="Click to view", font=(get_system_font(), 9), bg=card_bg, fg='#9ca3af')
     hint_label.pack(side=tk.RIGHT)
     
-    # Animations
-    def fade_in(alpha=0.0):
-        if not popup_window or not popup_window.winfo_exists():
-            return
-        if alpha < 0.98:
-            alpha += 0.1
-            popup_window.attributes('-alpha', alpha)
-            popup_window.after(15, lambda: fade_in(alpha))
-        else:
-            popup_window.attributes('-alpha', 0.98)
-    
-    def fade_out(alpha=0.98):
-        if not popup_window or not popup_window.winfo_exists():
-            return
-        if alpha > 0:
-            alpha -= 0.12
-            popup_window.attributes('-alpha', alpha)
-            popup_window.after(12, lambda: fade_out(alpha))
-        else:
-            try:
-                list_canvas.unbind_all("<MouseWheel>")
-            except Exception:
-                pass
-            popup_window.destroy()
-    
-    popup_window.bind('<Escape>', lambda e: fade_out())
+    window.bind('<Escape>', lambda e: hide_history_window())
     
     # Draggable
     def start_move(event):
-        popup_window.x = event.x
-        popup_window.y = event.y
+        window.x = event.x
+        window.y = event.y
     
     def do_move(event):
-        x = popup_window.winfo_x() + (event.x - popup_window.x)
-        y = popup_window.winfo_y() + (event.y - popup_window.y)
-        popup_window.geometry(f"+{x}+{y}")
+        x = window.winfo_x() + (event.x - window.x)
+        y = window.winfo_y() + (event.y - window.y)
+        window.geometry(f"+{x}+{y}")
     
     for widget in [top_bar, header_section, title_row, title_label]:
         widget.bind('<Button-1>', start_move)
         widget.bind('<B1-Motion>', do_move)
     
-    popup_window.after(10, fade_in)
+    # Register widgets recolored by apply_popup_theme()
+    window._themed_widgets = [
+        {'widget': canvas, 'type': 'main_canvas'},
+        {'widget': main_card, 'type': 'bg_only'},
+        {'widget': top_bar, 'type': 'bg_only'},
+        {'widget': close_btn, 'type': 'close_btn'},
+        {'widget': sep1, 'type': 'border'},
+        {'widget': header_section, 'type': 'bg_only'},
+        {'widget': title_row, 'type': 'bg_only'},
+        {'widget': icon_label, 'type': 'text'},
+        {'widget': title_label, 'type': 'text'},
+        {'widget': count_label, 'type': 'secondary'},
+        {'widget': search_frame, 'type': 'border'},
+        {'widget': search_inner, 'type': 'light'},
+        {'widget': search_icon, 'type': 'light'},
+        {'widget': search_entry, 'type': 'text_area'},
+        {'widget': list_container, 'type': 'bg_only'},
+        {'widget': list_canvas, 'type': 'canvas'},
+        {'widget': footer, 'type': 'bg_only'},
+        {'widget': clear_btn, 'type': 'secondary'},
+        {'widget': hint_label, 'type': 'bg_only'},
+    ]
+    
+    window._theme = current_theme
+    window._stealth = stealth_enabled
+    window._open = False
+    window._fade_job = None
+    window._reset_list = reset_list
+    window._render_rows = render_rows
+    window._search_entry = search_entry
+    window._list_canvas = list_canvas
+    
+    history_window = window
+    return window
+
+def show_history_popup():
+    """Show the history popup with recent answers."""
+    started = time.perf_counter()
+    history_count = get_history_count()
+    if not history_count:
+        # Show message if no history
+        show_answer_popup("📚 History is empty\n\nCapture some screens first!\nPress Ctrl+Alt+S to start.")
+        return
+    
+    # The answer popup and history popup share the same spot
+    hide_answer_popup()
+    
+    window = history_window
+    if window and window.winfo_exists() and window._stealth != app_config.get("stealth_mode", True):
+        # Stealth setting changed - window styles are applied at build time
+        window.destroy()
+        window = None
+    if not window or not window.winfo_exists():
+        window = build_history_window()
+    
+    current_theme = app_config.get("theme", "light")
+    if window._theme != current_theme:
+        apply_popup_theme(window, current_theme)
+    
+    if window._fade_job:
+        window.after_cancel(window._fade_job)
+        window._fade_job = None
+    if not window._open:
+        window.geometry(f"+{app_config.get('popup_x', 200)}+{app_config.get('popup_y', 80)}")
+    window.attributes('-alpha', 0.98)
+    window.deiconify()
+    window.lift()
+    window._open = True
+    window._reset_list(history_count)
+    window.after(20, window._search_entry.focus_force)
+    logger.debug(f"History popup shown in {(time.perf_counter() - started) * 1000:.1f} ms ({history_count} entries)")
+
+def hide_history_window(alpha=0.98, fade=True):
+    """Fade out and withdraw the history popup (kept for reuse)."""
+    if not history_window or not history_window.winfo_exists() or not history_window._open:
+        return
+    if fade and alpha > 0:
+        alpha -= 0.12
+        history_window.attributes('-alpha', max(alpha, 0))
+        history_window._fade_job = history_window.after(12, lambda: hide_history_window(alpha))
+    else:
+        history_window._fade_job = None
+        try:
+            history_window._list_canvas.unbind_all("<MouseWheel>")
+        except Exception:
+            pass
+        history_window.withdraw()
+        history_window._open = False
 
 def toggle_theme():
     """Toggle between dark and light themes."""
-    global app_config, popup_window
+    global app_config
     
     current_theme = app_config.get("theme", "light")
     new_theme = "dark" if current_theme == "light" else "light"
@@ -1431,16 +4617,12 @@ def toggle_theme():
     theme_icon = "🌙" if new_theme == "dark" else "☀️"
     logger.info(f"Theme switched to {new_theme} mode {theme_icon}")
     
-    # If popup is open, refresh it with the new theme
-    if popup_window and popup_window.winfo_exists():
-        # Store current answer text and position before destroying
-        try:
-            # Find the text widget to get current content
-            answer_text = getattr(popup_window, '_answer_text', None)
-            if answer_text:
-                show_answer_popup(answer_text)
-        except Exception:
-            pass
+    # Recolor open popups in place; closed ones pick the theme up when next shown
+    for window in (popup_window, history_window):
+        if window and window.winfo_exists() and window._open:
+            apply_popup_theme(window, new_theme)
+            if window is history_window:
+                window._render_rows()
 
 
 def show_settings_popup():
@@ -1483,6 +4665,7 @@ def show_settings_popup():
 
     # Widgets that participate in theme updates
     themed_widgets = []
+    theme_refreshers = []  # Callbacks for widgets with state-dependent colors
     
     # Make window transparent for rounded corners - cross-platform
     apply_transparency(settings_window, '#000000')
@@ -1821,12 +5004,15 @@ def show_settings_popup():
     
     populate_models()
     
-    # Refresh models button
+    # Refresh models button (the fetch runs in the background, the list updates when it lands)
+    def on_models_refreshed():
+        if refresh_btn.winfo_exists():
+            populate_models()
+            refresh_btn.config(text="🔄")
+    
     def refresh_models():
         refresh_btn.config(text="⏳")
-        settings_window.update()
-        fetch_available_models()
-        settings_window.after(1500, lambda: (populate_models(), refresh_btn.config(text="🔄")))
+        refresh_available_models(force=True, on_done=on_models_refreshed)
     
     refresh_btn = tk.Label(
         model_header,
@@ -1841,6 +5027,10 @@ def show_settings_popup():
     refresh_btn.bind('<Enter>', lambda e: refresh_btn.config(fg=text_color))
     refresh_btn.bind('<Leave>', lambda e: refresh_btn.config(fg=secondary_text))
     
+    # Show the cached list now; update it if the cache has expired
+    if API_KEY and refresh_available_models(on_done=on_models_refreshed):
+        refresh_btn.config(text="⏳")
+    
     dropdown_visible = [False]
     
     def toggle_dropdown(e=None):
@@ -1979,6 +5169,9 @@ def show_settings_popup():
                 widget.config(bg=light_gray, fg=text_color)
             elif widget_type == 'close_btn':
                 widget.config(bg=card_bg, fg=new_theme['close_btn_fg'])
+        
+        for refresh in theme_refreshers:
+            refresh()
     
     def create_theme_button(parent, text, value, icon):
         btn_frame = tk.Frame(parent, bg=accent_color if theme_var.get() == value else light_gray, cursor='hand2')
@@ -2068,6 +5261,8 @@ def show_settings_popup():
     show_explanation_var = tk.BooleanVar(value=app_config.get("show_explanation", True))
     compact_mode_var = tk.BooleanVar(value=app_config.get("compact_mode", False))
     stealth_mode_var = tk.BooleanVar(value=app_config.get("stealth_mode", True))
+    remember_region_var = tk.BooleanVar(value=app_config.get("remember_region", False))
+    ocr_mode_var = tk.BooleanVar(value=app_config.get("ocr_mode", "off") == "auto")
     
     def create_checkbox(parent, text, variable, description=""):
         cb_frame = tk.Frame(parent, bg=card_bg)
@@ -2138,6 +5333,94 @@ def show_settings_popup():
     create_checkbox(options_section, "Show detailed explanations", show_explanation_var, "Include step-by-step explanations in answers")
     create_checkbox(options_section, "Compact mode", compact_mode_var, "Use smaller popup windows")
     create_checkbox(options_section, "🔒 Stealth mode (hide from screen share)", stealth_mode_var, "Hide windows from screen capture, sharing, and proctoring software")
+    create_checkbox(options_section, "Remember capture region", remember_region_var, f"Reuse the last region selected with {REGION_HOTKEY.title()}")
+    create_checkbox(options_section, "Send text instead of screenshots", ocr_mode_var, "Read plain-text questions with local OCR (Tesseract); code and diagrams still send the image")
+    
+    # === CAPTURE TARGET SECTION ===
+    capture_section = tk.Frame(content_frame, bg=card_bg)
+    capture_section.pack(fill=tk.X, pady=(0, 20))
+    
+    capture_header = tk.Frame(capture_section, bg=card_bg)
+    capture_header.pack(fill=tk.X)
+    
+    capture_icon = tk.Label(capture_header, text="🖥️", font=(get_system_font(), 12), bg=card_bg, fg=text_color)
+    capture_icon.pack(side=tk.LEFT)
+    
+    capture_title = tk.Label(capture_header, text="Capture Target", font=(get_system_font(), 11, 'bold'), bg=card_bg, fg=text_color)
+    capture_title.pack(side=tk.LEFT, padx=(6, 0))
+    
+    monitor_count = max(1, len(get_monitors(refresh=True)))
+    capture_desc = tk.Label(
+        capture_section,
+        text=f"Which screen to send ({monitor_count} monitor{'s' if monitor_count != 1 else ''} detected)",
+        font=(get_system_font(), 9),
+        bg=card_bg,
+        fg=secondary_text
+    )
+    capture_desc.pack(anchor='w', pady=(4, 8))
+    
+    capture_target_var = tk.StringVar(value=app_config.get("capture_target", "cursor"))
+    capture_target_row = tk.Frame(capture_section, bg=card_bg)
+    capture_target_row.pack(fill=tk.X)
+    
+    capture_target_buttons = {}
+    
+    def refresh_capture_target_buttons():
+        current = THEMES[app_config.get("theme", "light")]
+        for value, btn in capture_target_buttons.items():
+            if value == capture_target_var.get():
+                btn.config(bg=current['accent_color'], fg='white')
+            else:
+                btn.config(bg=current['light_gray'], fg=current['text_color'])
+    
+    def select_capture_target(value):
+        capture_target_var.set(value)
+        refresh_capture_target_buttons()
+    
+    for value, label in (("cursor", "Under cursor"), ("focused", "Focused window"), ("fixed", "Fixed"), ("all", "All screens")):
+        target_btn = tk.Label(capture_target_row, text=label, font=(get_system_font(), 9), padx=8, pady=6, cursor='hand2')
+        target_btn.pack(side=tk.LEFT, padx=(0, 6))
+        target_btn.bind('<Button-1>', lambda e, v=value: select_capture_target(v))
+        capture_target_buttons[value] = target_btn
+    refresh_capture_target_buttons()
+    theme_refreshers.append(refresh_capture_target_buttons)
+    
+    monitor_row = tk.Frame(capture_section, bg=card_bg)
+    monitor_row.pack(fill=tk.X, pady=(10, 0))
+    
+    capture_monitor_var = tk.IntVar(value=min(app_config.get("capture_monitor", 0), monitor_count - 1))
+    
+    monitor_label = tk.Label(monitor_row, text="Fixed monitor:", font=(get_system_font(), 10), bg=card_bg, fg=text_color)
+    monitor_label.pack(side=tk.LEFT)
+    
+    monitor_spinbox = tk.Spinbox(
+        monitor_row,
+        from_=0,
+        to=monitor_count - 1,
+        textvariable=capture_monitor_var,
+        width=5,
+        font=(get_system_font(), 10),
+        bg=light_gray,
+        fg=text_color,
+        buttonbackground=light_gray,
+        relief=tk.FLAT,
+        highlightthickness=1,
+        highlightbackground=border_color
+    )
+    monitor_spinbox.pack(side=tk.LEFT, padx=(10, 0))
+    
+    # Register capture section widgets
+    themed_widgets.extend([
+        {'widget': capture_section, 'type': 'bg_only'},
+        {'widget': capture_header, 'type': 'bg_only'},
+        {'widget': capture_icon, 'type': 'text'},
+        {'widget': capture_title, 'type': 'text'},
+        {'widget': capture_desc, 'type': 'secondary'},
+        {'widget': capture_target_row, 'type': 'bg_only'},
+        {'widget': monitor_row, 'type': 'bg_only'},
+        {'widget': monitor_label, 'type': 'text'},
+        {'widget': monitor_spinbox, 'type': 'spinbox'},
+    ])
     
     # === HISTORY LIMIT SECTION ===
     history_section = tk.Frame(content_frame, bg=card_bg)
@@ -2155,17 +5438,18 @@ def show_settings_popup():
     history_row = tk.Frame(history_section, bg=card_bg)
     history_row.pack(fill=tk.X, pady=(10, 0))
     
-    max_history_var = tk.IntVar(value=app_config.get("max_history", 10))
+    max_history_var = tk.IntVar(value=app_config.get("max_history", MAX_HISTORY_ITEMS))
     
     history_label = tk.Label(history_row, text="Maximum items:", font=(get_system_font(), 10), bg=card_bg, fg=text_color)
     history_label.pack(side=tk.LEFT)
     
     history_spinbox = tk.Spinbox(
         history_row,
-        from_=5,
-        to=50,
+        from_=10,
+        to=10000,
+        increment=10,
         textvariable=max_history_var,
-        width=5,
+        width=6,
         font=(get_system_font(), 10),
         bg=light_gray,
         fg=text_color,
@@ -2207,10 +5491,17 @@ def show_settings_popup():
         app_config["show_explanation"] = show_explanation_var.get()
         app_config["compact_mode"] = compact_mode_var.get()
         app_config["stealth_mode"] = stealth_mode_var.get()
+        app_config["remember_region"] = remember_region_var.get()
+        if not remember_region_var.get():
+            app_config["last_region"] = None
+        app_config["ocr_mode"] = "auto" if ocr_mode_var.get() else "off"
         app_config["max_history"] = max_history_var.get()
+        app_config["capture_target"] = capture_target_var.get()
+        app_config["capture_monitor"] = capture_monitor_var.get()
         
-        # Update MAX_HISTORY_ITEMS
+        # Update MAX_HISTORY_ITEMS and trim history if the limit was lowered
         MAX_HISTORY_ITEMS = max_history_var.get()
+        prune_history()
         
         # Save to file
         save_config(app_config)
@@ -2338,38 +5629,50 @@ def create_tray_icon():
     """Creates and returns the system tray icon with menu."""
     global tray_icon
     
-    # Load the icon image
-    try:
-        icon_image = Image.open(LOGO_PATH)
-        icon_image = icon_image.resize((64, 64), Image.Resampling.LANCZOS)
-    except Exception:
+    pystray = timed_import("pystray")
+    
+    # Load the icon image (shared asset cache)
+    icon_image = get_image_asset(LOGO_PATH, 64)
+    if icon_image is None:
         # Create a simple fallback icon if logo not found
         icon_image = Image.new('RGB', (64, 64), color='#fbbf24')
     
     def on_capture(icon, item):
         """Trigger screen capture from tray menu."""
-        root.after(0, analyze_screen)
+        post_ui_command(analyze_screen)
+    
+    def on_capture_region(icon, item):
+        """Trigger region capture from tray menu."""
+        post_ui_command(analyze_region)
+    
+    def on_forget_region(icon, item):
+        """Clear the remembered capture region from tray menu."""
+        post_ui_command(forget_capture_region)
+    
+    def has_saved_region():
+        """Check if a capture region is remembered."""
+        return bool(app_config.get("remember_region", False) and app_config.get("last_region"))
     
     def on_toggle_theme(icon, item):
         """Toggle theme from tray menu."""
-        root.after(0, toggle_theme)
+        post_ui_command(toggle_theme)
         icon.update_menu()
     
     def on_hide_ui(icon, item):
         """Toggle UI visibility from tray menu."""
-        root.after(0, toggle_popup_visibility)
+        post_ui_command(toggle_popup_visibility)
     
     def on_show_history(icon, item):
         """Show history popup from tray menu."""
-        root.after(0, show_history_popup)
+        post_ui_command(show_history_popup)
     
     def on_show_settings(icon, item):
         """Show settings popup from tray menu."""
-        root.after(0, show_settings_popup)
+        post_ui_command(show_settings_popup)
     
     def on_quit(icon, item):
         """Quit from tray menu."""
-        root.after(0, quit_application)
+        post_ui_command(quit_application)
     
     def is_dark_theme():
         """Check if dark theme is active."""
@@ -2377,19 +5680,21 @@ def create_tray_icon():
     
     def get_history_items():
         """Generate history submenu items."""
-        if not answer_history:
+        recent = get_history_page(limit=5)  # Show last 5 in tray
+        if not recent:
             return [pystray.MenuItem("No history yet", None, enabled=False)]
         
         items = []
-        for i, entry in enumerate(answer_history[:5]):  # Show last 5 in tray
+        for i, entry in enumerate(recent):
             preview = entry['preview'][:30] + "..." if len(entry['preview']) > 30 else entry['preview']
-            def make_handler(text):
-                return lambda icon, item: root.after(0, lambda: show_answer_popup(text))
-            items.append(pystray.MenuItem(preview, make_handler(entry['answer'])))
+            def make_handler(entry_id):
+                return ui_command(show_history_entry, entry_id)
+            items.append(pystray.MenuItem(preview, make_handler(entry['id'])))
         
-        if len(answer_history) > 5:
+        history_count = get_history_count()
+        if history_count > 5:
             items.append(pystray.Menu.SEPARATOR)
-            items.append(pystray.MenuItem(f"View all ({len(answer_history)})...", lambda icon, item: root.after(0, show_history_popup)))
+            items.append(pystray.MenuItem(f"View all ({history_count})...", ui_command(show_history_popup)))
         
         return items
     
@@ -2400,6 +5705,15 @@ def create_tray_icon():
             on_capture,
             default=True  # Double-click action
         ),
+        pystray.MenuItem(
+            f"Capture Region ({REGION_HOTKEY})",
+            on_capture_region
+        ),
+        pystray.MenuItem(
+            "Forget Saved Region",
+            on_forget_region,
+            visible=lambda item: has_saved_region()
+        ),
         pystray.Menu.SEPARATOR,
         pystray.MenuItem(
             "Recent Answers",
@@ -2443,8 +5757,350 @@ def create_tray_icon():
 
 def run_tray_icon():
     """Run the system tray icon in a separate thread."""
+    started = time.perf_counter()
     icon = create_tray_icon()
-    icon.run()
+    
+    def on_ready(icon):
+        icon.visible = True
+        ended = time.perf_counter()
+        startup_timings["phases"].append(("tray_visible", (ended - started) * 1000, (ended - PROCESS_STARTED) * 1000))
+    
+    icon.run(setup=on_ready)
+
+
+def warm_up():
+    """
+    Background warm-up after the UI is live: load history and caches, import
+    and configure genai, and preload PIL.ImageTk so the first capture is fast.
+    """
+    global model
+    started = time.perf_counter()
+    try:
+        with startup_phase("load_history"):
+            load_history()
+            load_answer_cache()
+            load_question_cache()
+            load_models_cache()
+            load_race_stats()
+            load_latency_history()
+        with startup_phase("probe_capture"):
+            probe_capture_backends()
+        if app_config.get("api_transport", "sdk") != "rest":
+            with startup_phase("import_genai"):
+                load_genai()
+        with startup_phase("configure_genai"):
+            model = configure_genai()
+        warm_model_connection()
+        with startup_phase("import_imagetk"):
+            timed_import("PIL.ImageTk")
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+    finally:
+        ended = time.perf_counter()
+        startup_timings["phases"].append(("warmup_total", (ended - started) * 1000, (ended - PROCESS_STARTED) * 1000))
+        warmup_done.set()
+        # Pre-build the loading indicator and answer popup on the Tk thread so the
+        # first capture shows them instantly
+        root.after(0, prepare_loading_indicator)
+        root.after(0, prepare_answer_popup)
+
+
+def print_startup_report():
+    """Print per-phase and per-import startup timings (--startup-report)."""
+    lines = ["", f"{APP_NAME} {APP_VERSION} startup report", "=" * 60]
+    lines.append(f"{'Phase':<24}{'Duration (ms)':>16}{'Done at (ms)':>16}")
+    for name, duration_ms, done_at_ms in startup_timings["phases"]:
+        lines.append(f"{name:<24}{duration_ms:>16.1f}{done_at_ms:>16.1f}")
+    lines.append("")
+    lines.append(f"{'Import':<40}{'Duration (ms)':>16}")
+    for name, duration_ms in sorted(startup_timings["imports"], key=lambda item: -item[1]):
+        lines.append(f"{name:<40}{duration_ms:>16.1f}")
+    lines.append("=" * 60)
+    report = "\n".join(lines)
+    print(report, flush=True)
+    logger.info(report)
+
+
+# Global hotkeys: registered natively where possible so only the configured
+# chords reach the app (RegisterHotKey on Windows, XGrabKey on X11). The
+# keyboard package hooks every keystroke on the system and is the fallback.
+HOTKEY_KEY_ALIASES = {"esc": "escape", "return": "enter", "del": "delete", "ins": "insert",
+                      "pgup": "page up", "pgdn": "page down", "windows": "win", "super": "win",
+                      "cmd": "win", "control": "ctrl", "option": "alt"}
+HOTKEY_MODIFIERS = ("ctrl", "alt", "shift", "win")
+WIN_MODIFIER_FLAGS = {"alt": 0x0001, "ctrl": 0x0002, "shift": 0x0004, "win": 0x0008}  # MOD_*
+WIN_MOD_NOREPEAT = 0x4000  # Holding the chord doesn't fire repeatedly
+WIN_WM_HOTKEY = 0x0312
+WIN_WM_QUIT = 0x0012
+WIN_VIRTUAL_KEYS = {"space": 0x20, "enter": 0x0D, "tab": 0x09, "escape": 0x1B, "backspace": 0x08,
+                    "delete": 0x2E, "insert": 0x2D, "home": 0x24, "end": 0x23, "page up": 0x21,
+                    "page down": 0x22, "left": 0x25, "up": 0x26, "right": 0x27, "down": 0x28,
+                    "print screen": 0x2C, "pause": 0x13}
+X11_KEYSYMS = {"enter": "Return", "escape": "Escape", "tab": "Tab", "space": "space",
+               "backspace": "BackSpace", "delete": "Delete", "insert": "Insert", "home": "Home",
+               "end": "End", "page up": "Prior", "page down": "Next", "left": "Left", "up": "Up",
+               "right": "Right", "down": "Down", "print screen": "Print", "pause": "Pause"}
+HOTKEY_POLL_S = 0.25  # How often the X11 event thread checks for shutdown while idle
+
+
+class HotkeyError(Exception):
+    """A hotkey backend is unavailable or could not register a chord."""
+
+
+def parse_hotkey(chord):
+    """Split a chord like "ctrl+alt+s" into (frozenset of modifiers, key name)."""
+    parts = [HOTKEY_KEY_ALIASES.get(p.strip().lower(), p.strip().lower()) for p in chord.split("+")]
+    modifiers = frozenset(p for p in parts if p in HOTKEY_MODIFIERS)
+    keys = [p for p in parts if p not in HOTKEY_MODIFIERS]
+    if len(keys) != 1:
+        raise HotkeyError(f"Hotkey {chord!r} must have exactly one non-modifier key")
+    return modifiers, keys[0]
+
+
+def windows_virtual_key(key):
+    """Windows virtual-key code for a parsed key name, or None."""
+    if len(key) == 1 and key.isalnum():
+        return ord(key.upper())
+    if re.fullmatch(r"f([1-9]|1[0-9]|2[0-4])", key):
+        return 0x70 + int(key[1:]) - 1  # VK_F1..VK_F24
+    return WIN_VIRTUAL_KEYS.get(key)
+
+
+def x11_keysym_name(key):
+    """X11 keysym name for a parsed key name ("s", "F9", "Return")."""
+    if re.fullmatch(r"f\d+", key):
+        return key.upper()
+    return X11_KEYSYMS.get(key, key)
+
+
+class KeyboardHotkeyBackend:
+    """Fallback: the keyboard package's global hook (sees every keystroke; needs root on Linux)."""
+    name = "keyboard"
+
+    def __init__(self):
+        if IS_LINUX and not check_linux_permissions():
+            raise HotkeyError("the keyboard package needs root or read access to /dev/input")
+        self.keyboard = timed_import("keyboard")
+
+    def register(self, bindings):
+        """Register {chord: callback}; callbacks run on the keyboard hook thread."""
+        for chord, callback in bindings.items():
+            self.keyboard.add_hotkey(chord, callback)
+
+    def stop(self):
+        try:
+            self.keyboard.unhook_all_hotkeys()
+        except Exception as e:
+            logger.warning(f"Failed to remove keyboard hotkeys: {e}")
+
+
+class WindowsHotkeyBackend:
+    """RegisterHotKey: Windows posts WM_HOTKEY for the registered chords only."""
+    name = "win32"
+
+    def __init__(self):
+        if not (IS_WINDOWS and ctypes):
+            raise HotkeyError("RegisterHotKey needs Windows")
+        self.thread = None
+        self.thread_id = None
+
+    def register(self, bindings):
+        """Register {chord: callback}; callbacks run on the hotkey message thread."""
+        keys = []
+        for chord in bindings:
+            modifiers, key = parse_hotkey(chord)
+            vk = windows_virtual_key(key)
+            if not vk:
+                raise HotkeyError(f"No virtual-key code for {key!r} in {chord!r}")
+            flags = WIN_MOD_NOREPEAT
+            for modifier in modifiers:
+                flags |= WIN_MODIFIER_FLAGS[modifier]
+            keys.append((chord, flags, vk, bindings[chord]))
+
+        # Hotkeys belong to the thread that registered them, so register and pump messages on one thread
+        ready = threading.Event()
+        failures = []
+        self.thread = threading.Thread(target=self._run, args=(keys, ready, failures),
+                                       name="hotkeys-win32", daemon=True)
+        self.thread.start()
+        ready.wait(5)
+        if failures:
+            self.stop()
+            raise HotkeyError(f"RegisterHotKey failed for {', '.join(failures)} (already in use?)")
+
+    def _run(self, keys, ready, failures):
+        user32 = ctypes.windll.user32
+        self.thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        callbacks = {}
+        for hotkey_id, (chord, flags, vk, callback) in enumerate(keys, start=1):
+            if user32.RegisterHotKey(None, hotkey_id, flags, vk):
+                callbacks[hotkey_id] = callback
+            else:
+                failures.append(chord)
+        ready.set()
+        try:
+            msg = ctypes.wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                if msg.message == WIN_WM_HOTKEY and msg.wParam in callbacks:
+                    try:
+                        callbacks[msg.wParam]()
+                    except Exception as e:
+                        logger.error(f"Hotkey callback failed: {e}")
+        finally:
+            for hotkey_id in callbacks:
+                user32.UnregisterHotKey(None, hotkey_id)
+
+    def stop(self):
+        if self.thread_id:
+            ctypes.windll.user32.PostThreadMessageW(self.thread_id, WIN_WM_QUIT, 0, 0)
+
+
+class X11HotkeyBackend:
+    """XGrabKey on the root window: the X server delivers the grabbed chords only."""
+    name = "xlib"
+
+    def __init__(self):
+        if not IS_LINUX or not os.environ.get("DISPLAY"):
+            raise HotkeyError("XGrabKey needs an X11 display")
+        if os.environ.get("XDG_SESSION_TYPE") == "wayland":
+            # Grabs through XWayland only fire while an X11 window has focus
+            raise HotkeyError("XGrabKey doesn't see global keys under Wayland")
+        try:
+            self.xlib = SimpleNamespace(X=timed_import("Xlib.X"), XK=timed_import("Xlib.XK"),
+                                        display=timed_import("Xlib.display"), error=timed_import("Xlib.error"))
+            self.display = self.xlib.display.Display()
+        except Exception as e:
+            raise HotkeyError(f"Cannot open the X display with python-xlib: {e}")
+        self.root = self.display.screen().root
+        self.running = False
+        self.thread = None
+        self.grabs = []  # (keycode, modifier mask)
+
+    def _ignored_masks(self):
+        """Lock-modifier combinations grabbed too, so Caps/Num Lock don't break the chords."""
+        X = self.xlib.X
+        num_lock = 0
+        num_lock_code = self.display.keysym_to_keycode(self.xlib.XK.string_to_keysym("Num_Lock"))
+        for index, keycodes in enumerate(self.display.get_modifier_mapping()):
+            if num_lock_code and num_lock_code in keycodes:
+                num_lock = 1 << index
+        return {0, X.LockMask, num_lock, X.LockMask | num_lock}
+
+    def register(self, bindings):
+        """Register {chord: callback}; callbacks run on the X event thread."""
+        X, XK = self.xlib.X, self.xlib.XK
+        modifier_masks = {"ctrl": X.ControlMask, "alt": X.Mod1Mask, "shift": X.ShiftMask, "win": X.Mod4Mask}
+        self.ignored = self._ignored_masks()
+        self.callbacks = {}
+        errors = []
+
+        def on_error(*args):
+            errors.append(args[0] if args else None)
+
+        for chord, callback in bindings.items():
+            modifiers, key = parse_hotkey(chord)
+            keysym = XK.string_to_keysym(x11_keysym_name(key))
+            keycode = self.display.keysym_to_keycode(keysym) if keysym else 0
+            if not keycode:
+                raise HotkeyError(f"No X keycode for {key!r} in {chord!r}")
+            mask = 0
+            for modifier in modifiers:
+                mask |= modifier_masks[modifier]
+            self.callbacks[(keycode, mask)] = callback
+            for extra in self.ignored:
+                self.root.grab_key(keycode, mask | extra, True, X.GrabModeAsync, X.GrabModeAsync, onerror=on_error)
+                self.grabs.append((keycode, mask | extra))
+        self.display.sync()
+        if errors:
+            self.stop()
+            raise HotkeyError(f"XGrabKey failed for {len(errors)} grab(s) - chord already taken by another app?")
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="hotkeys-xlib", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        X = self.xlib.X
+        strip = 0
+        for mask in self.ignored:
+            strip |= mask
+        # X11 has no MOD_NOREPEAT: holding a chord auto-repeats it, either as presses with no
+        # release in between (detectable auto-repeat) or as release/press pairs sharing one
+        # timestamp. Only the first press of a hold fires the callback.
+        held = set()  # Grabbed keycodes currently down
+        last_release = {}  # keycode -> server time of its last release
+        while self.running:
+            # select() with a timeout so stop() is noticed without a blocking next_event()
+            try:
+                readable, _, _ = select.select([self.display], [], [], HOTKEY_POLL_S)
+                if not readable:
+                    continue
+                while self.running and self.display.pending_events():
+                    event = self.display.next_event()
+                    if event.type == X.KeyRelease:
+                        held.discard(event.detail)
+                        last_release[event.detail] = event.time
+                        continue
+                    if event.type != X.KeyPress:
+                        continue
+                    repeat = event.detail in held or last_release.get(event.detail) == event.time
+                    held.add(event.detail)
+                    if repeat:
+                        continue
+                    callback = self.callbacks.get((event.detail, event.state & ~strip & 0xFF))
+                    if callback:
+                        try:
+                            callback()
+                        except Exception as e:
+                            logger.error(f"Hotkey callback failed: {e}")
+            except Exception as e:
+                if self.running:
+                    logger.error(f"X11 hotkey thread stopped: {e}")
+                break
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(HOTKEY_POLL_S * 4)
+        try:
+            for keycode, mask in self.grabs:
+                self.root.ungrab_key(keycode, mask)
+            self.display.sync()
+            self.display.close()
+        except Exception as e:
+            logger.warning(f"Failed to release X11 key grabs: {e}")
+        self.grabs = []
+
+
+HOTKEY_BACKENDS = {"win32": WindowsHotkeyBackend, "xlib": X11HotkeyBackend, "keyboard": KeyboardHotkeyBackend}
+
+
+def hotkey_backend_order(setting):
+    """Backends to try, in order, for the "hotkey_backend" setting."""
+    native = "win32" if IS_WINDOWS else "xlib"
+    if setting == "keyboard":
+        return ["keyboard"]
+    if setting == "native":
+        return [native]
+    if setting in HOTKEY_BACKENDS:
+        return [setting]
+    return [native, "keyboard"]  # auto
+
+
+def start_hotkeys(bindings):
+    """Register {chord: callback} with the first backend that works; returns it, or None if none did."""
+    global hotkey_backend
+    for name in hotkey_backend_order(app_config.get("hotkey_backend", "auto")):
+        try:
+            backend = HOTKEY_BACKENDS[name]()
+            backend.register(bindings)
+        except Exception as e:
+            logger.warning(f"Hotkey backend {name} unavailable: {e}")
+            continue
+        hotkey_backend = backend
+        logger.info(f"Registered {len(bindings)} hotkeys with the {name} backend")
+        return backend
+    return None
 
 
 # Hide console window (Windows only, no-op on other platforms)
@@ -2492,17 +6148,45 @@ def check_linux_permissions():
 
 # Main Execution
 if __name__ == "__main__":
-    # Check Linux permissions before initializing keyboard
-    if IS_LINUX and not check_linux_permissions():
+    startup_report = "--startup-report" in sys.argv
+    startup_timings["phases"].append(("module_import", (time.perf_counter() - PROCESS_STARTED) * 1000, (time.perf_counter() - PROCESS_STARTED) * 1000))
+    
+    # Create hidden root window for tkinter
+    with startup_phase("tk_root"):
+        root = tk.Tk()
+        root.withdraw()  # Hide the main window
+        start_ui_waker()
+    
+    # Add the hotkey listeners
+    with startup_phase("hotkeys"):
+        # Callbacks run on the backend's thread. Capture chords wake the grab thread so
+        # the screen is grabbed first; everything else is posted to the Tk thread
+        start_grab_thread()
+        active_hotkeys = start_hotkeys({
+            HOTKEY: capture_hotkey("screen"),
+            REGION_HOTKEY: capture_hotkey("region"),
+            HIDE_HOTKEY: ui_command(toggle_popup_visibility),
+            THEME_HOTKEY: ui_command(toggle_theme),
+            HISTORY_HOTKEY: ui_command(show_history_popup),
+            SETTINGS_HOTKEY: ui_command(show_settings_popup),
+            QUIT_HOTKEY: ui_command(quit_application),
+        })
+    
+    # No backend: on Linux that means no X11 display for XGrabKey and no access for keyboard
+    if active_hotkeys is None:
         print("")
         print("=" * 60)
-        print("  ElAnswer - Root Permission Required on Linux")
+        print("  ElAnswer - Global Hotkeys Unavailable")
         print("=" * 60)
         print("")
-        print("  The 'keyboard' library requires root access to capture")
-        print("  global hotkeys on Linux.")
+        print("  Global hotkeys need an X11 session (XGrabKey) or, for the")
+        print("  'keyboard' library fallback, root access.")
+        print("")
+        print("  On X11, install python-xlib:")
         print("")
-        print("  Please run ElAnswer with sudo:")
+        print("    pip install python-xlib")
+        print("")
+        print("  Otherwise run ElAnswer with sudo:")
         print("")
         print("    sudo ./ElAnswer")
         print("")
@@ -2514,29 +6198,28 @@ if __name__ == "__main__":
         print("=" * 60)
         sys.exit(1)
     
-    model = configure_genai()
-    
-    # Create hidden root window for tkinter
-    root = tk.Tk()
-    root.withdraw()  # Hide the main window
-    
-    # Add the hotkey listeners
-    keyboard.add_hotkey(HOTKEY, analyze_screen)
-    keyboard.add_hotkey(HIDE_HOTKEY, toggle_popup_visibility)
-    keyboard.add_hotkey(THEME_HOTKEY, toggle_theme)
-    keyboard.add_hotkey(HISTORY_HOTKEY, show_history_popup)
-    keyboard.add_hotkey(SETTINGS_HOTKEY, show_settings_popup)
-    keyboard.add_hotkey(QUIT_HOTKEY, quit_application)
-    
     # Start system tray icon in separate thread
     tray_thread = threading.Thread(target=run_tray_icon, daemon=True)
     tray_thread.start()
     
-    # Hide console window (runs minimized in system tray)
-    hide_console()
+    # Load history and the heavy AI modules in the background
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
     
-    # If no API key is set, show settings on first run
-    if not API_KEY:
+    # Hide console window (runs minimized in system tray)
+    if not startup_report:
+        hide_console()
+    
+    if startup_report:
+        # Print the report once warm-up has finished, then exit
+        def report_when_ready():
+            if not warmup_done.is_set():
+                root.after(50, report_when_ready)
+                return
+            print_startup_report()
+            quit_application()
+        root.after(50, report_when_ready)
+    elif not API_KEY:
+        # If no API key is set, show settings on first run
         logger.warning("No API key found. Opening settings...")
         root.after(500, show_settings_popup)
     
@@ -2544,4 +6227,4 @@ if __name__ == "__main__":
     try:
         root.mainloop()
     except KeyboardInterrupt:
-        quit_application()
\ No newline at end of file
+        quit_application()